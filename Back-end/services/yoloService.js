@@ -2,27 +2,124 @@ const axios = require('axios');
 const FormData = require('form-data');
 const fs = require('fs');
 const path = require('path');
+const YOLOSocketClient = require('./yoloSocketClient');
 
 class YOLOService {
   constructor() {
     this.baseURL = process.env.YOLO_SERVICE_URL || 'http://localhost:8000';
     this.timeout = parseInt(process.env.YOLO_SERVICE_TIMEOUT) || 30000; // 30 seconds default
+    // Unix socket of a YOLO service on the same host; detection requests use it
+    // while it is reachable and fall back to HTTP when it isn't
+    this.socketClient = process.env.YOLO_SERVICE_SOCKET
+      ? new YOLOSocketClient(process.env.YOLO_SERVICE_SOCKET, { timeout: this.timeout })
+      : null;
   }
 
-  async detectObjects(imagePath) {
+  // Camera options for distance estimates: deviceId selects a profile stored
+  // with putCameraProfile(); camera sends one inline (and stores it for deviceId).
+  // clientId (default: deviceId) names the end user whose consecutive frames the
+  // service may answer from its near-duplicate cache; every request from this
+  // back end has the same address, so without it all users share one history.
+  appendCameraOptions(formData, { deviceId, camera, clientId } = {}) {
+    if (clientId) {
+      formData.append('client_id', clientId);
+    }
+    if (deviceId) {
+      formData.append('device_id', deviceId);
+    }
+    if (camera) {
+      formData.append('camera', JSON.stringify(camera));
+    }
+  }
+
+  async detectObjects(imagePath, options = {}) {
     try {
       // Check if file exists
       if (!fs.existsSync(imagePath)) {
         throw new Error(`Image file not found: ${imagePath}`);
       }
 
-      // Create form data
+      const data = (await this.detectOverSocket(imagePath, options)) || (await this.detectOverHttp(imagePath, options));
+
+      // Transform response to match our schema
+      const detections = this.transformDetections(data);
+
+      return {
+        detections: detections,
+        processingTime: data.processing_time || 0,
+        modelVersion: data.model_version || 'unknown'
+      };
+    } catch (error) {
+      if (error.code === 'ECONNREFUSED') {
+        throw new Error(`Cannot connect to YOLO service at ${this.baseURL}. Make sure the Python service is running.`);
+      }
+      if (error.code === 'ETIMEDOUT') {
+        throw new Error('YOLO service request timed out. The image might be too large or the service is overloaded.');
+      }
+      if (error.response) {
+        throw new Error(`YOLO service error: ${error.response.data?.error || error.response.statusText}`);
+      }
+      throw new Error(`Failed to communicate with YOLO service: ${error.message}`);
+    }
+  }
+
+  // /detect result over the Unix socket, or null when the socket can't be reached
+  async detectOverSocket(imagePath, { deviceId, camera, clientId } = {}) {
+    if (!this.socketClient) {
+      return null;
+    }
+    const image = await fs.promises.readFile(imagePath);
+    let response;
+    try {
+      response = await this.socketClient.request({ op: 'detect', client_id: clientId, device_id: deviceId, camera }, image);
+    } catch (error) {
+      if (YOLOSocketClient.isConnectionError(error)) {
+        return null;
+      }
+      throw error;
+    }
+    if (response.status !== 200) {
+      throw new Error(`YOLO service error: ${response.body.error || response.status}`);
+    }
+    return response.body;
+  }
+
+  async detectOverHttp(imagePath, options = {}) {
+    // Create form data
+    const formData = new FormData();
+    formData.append('image', fs.createReadStream(imagePath));
+    this.appendCameraOptions(formData, options);
+
+    // Make request to Python YOLO service
+    const response = await axios.post(
+      `${this.baseURL}/detect`,
+      formData,
+      {
+        headers: formData.getHeaders(),
+        timeout: this.timeout,
+        maxContentLength: Infinity,
+        maxBodyLength: Infinity
+      }
+    );
+    return response.data;
+  }
+
+  async detectObjectsBatch(imagePaths, options = {}) {
+    try {
+      const missing = imagePaths.find(imagePath => !fs.existsSync(imagePath));
+      if (missing) {
+        throw new Error(`Image file not found: ${missing}`);
+      }
+
+      // One request for all images; the service runs them as one model batch
       const formData = new FormData();
-      formData.append('image', fs.createReadStream(imagePath));
+      imagePaths.forEach(imagePath => {
+        formData.append('images', fs.createReadStream(imagePath), path.basename(imagePath));
+      });
+      this.appendCameraOptions(formData, options);
 
-      // Make request to Python YOLO service
       const response = await axios.post(
-        `${this.baseURL}/detect`,
+        `${this.baseURL}/detect-batch`,
         formData,
         {
           headers: formData.getHeaders(),
@@ -32,21 +129,37 @@ class YOLOService {
         }
       );
 
-      // Transform response to match our schema
-      const detections = this.transformDetections(response.data);
-
-      return {
-        detections: detections,
-        processingTime: response.data.processing_time || 0,
-        modelVersion: response.data.model_version || 'unknown'
-      };
+      // Results are in upload order; unreadable images carry an error instead of detections
+      return response.data.results.map((result, index) => ({
+        imagePath: imagePaths[index],
+        error: result.error || null,
+        detections: result.error ? [] : this.transformDetections(result),
+        processingTime: result.processing_time || 0,
+        cached: Boolean(result.cached)
+      }));
     } catch (error) {
       if (error.code === 'ECONNREFUSED') {
         throw new Error(`Cannot connect to YOLO service at ${this.baseURL}. Make sure the Python service is running.`);
       }
       if (error.code === 'ETIMEDOUT') {
-        throw new Error('YOLO service request timed out. The image might be too large or the service is overloaded.');
+        throw new Error('YOLO service batch request timed out. Try sending fewer images per batch.');
+      }
+      if (error.response) {
+        throw new Error(`YOLO service error: ${error.response.data?.error || error.response.statusText}`);
       }
+      throw new Error(`Failed to communicate with YOLO service: ${error.message}`);
+    }
+  }
+
+  async putCameraProfile(deviceId, camera) {
+    try {
+      const response = await axios.put(
+        `${this.baseURL}/camera-profile/${encodeURIComponent(deviceId)}`,
+        camera,
+        { timeout: 5000 }
+      );
+      return response.data.camera;
+    } catch (error) {
       if (error.response) {
         throw new Error(`YOLO service error: ${error.response.data?.error || error.response.statusText}`);
       }
@@ -0,0 +1,120 @@
+const net = require('net');
+
+// Client for the YOLO service's Unix socket transport (yolo-service/local_transport.py).
+// Frames are length-prefixed instead of multipart-encoded:
+//   request:  u32 header length | u32 payload length | JSON header | image bytes
+//   response: u32 body length   | u32 status         | JSON body
+// Requests are pipelined over one connection and answered in order.
+const PREFIX_BYTES = 8;
+
+// Errors that mean the socket isn't usable (service down, not on this host,
+// restarted); callers fall back to HTTP on these
+const CONNECTION_ERRORS = new Set(['ENOENT', 'ECONNREFUSED', 'ECONNRESET', 'EPIPE', 'EACCES', 'ENOTSOCK']);
+
+class YOLOSocketClient {
+  constructor(socketPath, { timeout = 30000 } = {}) {
+    this.socketPath = socketPath;
+    this.timeout = timeout;
+    this.socket = null;
+    this.connecting = null;
+    this.pending = [];
+    this.buffer = Buffer.alloc(0);
+  }
+
+  static isConnectionError(error) {
+    return CONNECTION_ERRORS.has(error.code);
+  }
+
+  connect() {
+    if (this.socket) {
+      return Promise.resolve(this.socket);
+    }
+    if (!this.connecting) {
+      this.connecting = new Promise((resolve, reject) => {
+        const socket = net.createConnection(this.socketPath);
+        socket.once('connect', () => {
+          socket.removeListener('error', reject);
+          socket.on('data', chunk => this.onData(chunk));
+          socket.on('error', error => this.fail(socket, error));
+          socket.on('close', () => this.fail(socket, Object.assign(new Error('YOLO socket closed'), { code: 'ECONNRESET' })));
+          this.socket = socket;
+          this.connecting = null;
+          resolve(socket);
+        });
+        socket.once('error', error => {
+          this.connecting = null;
+          reject(error);
+        });
+      });
+    }
+    return this.connecting;
+  }
+
+  // Resolves with { status, body } once the service answers
+  async request(header, payload = Buffer.alloc(0)) {
+    const socket = await this.connect();
+    const headerBytes = Buffer.from(JSON.stringify(header));
+    const prefix = Buffer.alloc(PREFIX_BYTES);
+    prefix.writeUInt32BE(headerBytes.length, 0);
+    prefix.writeUInt32BE(payload.length, 4);
+
+    return new Promise((resolve, reject) => {
+      const entry = { resolve, reject, timer: null };
+      // Responses come back in order, so a late one can't be skipped; drop the connection
+      entry.timer = setTimeout(() => {
+        this.fail(socket, Object.assign(new Error('YOLO socket request timed out'), { code: 'ETIMEDOUT' }));
+      }, this.timeout);
+      this.pending.push(entry);
+      socket.write(Buffer.concat([prefix, headerBytes]));
+      socket.write(payload);
+    });
+  }
+
+  onData(chunk) {
+    this.buffer = this.buffer.length ? Buffer.concat([this.buffer, chunk]) : chunk;
+    while (this.buffer.length >= PREFIX_BYTES) {
+      const length = this.buffer.readUInt32BE(0);
+      if (this.buffer.length < PREFIX_BYTES + length) {
+        break;
+      }
+      const status = this.buffer.readUInt32BE(4);
+      const body = this.buffer.subarray(PREFIX_BYTES, PREFIX_BYTES + length);
+      this.buffer = this.buffer.subarray(PREFIX_BYTES + length);
+
+      const entry = this.pending.shift();
+      if (!entry) {
+        continue;
+      }
+      clearTimeout(entry.timer);
+      try {
+        entry.resolve({ status, body: JSON.parse(body.toString('utf8')) });
+      } catch (error) {
+        entry.reject(error);
+      }
+    }
+  }
+
+  // Reject everything in flight and forget the connection; the next request reconnects
+  fail(socket, error) {
+    if (socket !== this.socket) {
+      return;
+    }
+    this.socket = null;
+    this.buffer = Buffer.alloc(0);
+    socket.destroy();
+    const pending = this.pending;
+    this.pending = [];
+    pending.forEach(entry => {
+      clearTimeout(entry.timer);
+      entry.reject(error);
+    });
+  }
+
+  close() {
+    if (this.socket) {
+      this.socket.end();
+    }
+  }
+}
+
+module.exports = YOLOSocketClient;
@@ -2,83 +2,112 @@
 Color Matcher - Find the nearest color match from a CSV file of RGB values
 """
 
-import csv
-import math
-from typing import Tuple, Dict, List
+import os
+import sys
+from typing import Tuple, Dict, List, Optional, Sequence, Union
 
+import numpy as np
 
-def load_color_database(csv_path: str = 'colors.csv') -> List[Dict]:
+# The vectorized color index lives with the YOLO service so both share one
+# implementation.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'yolo-service'))
+
+from color_index import (  # noqa: E402
+    COLOR_METRICS, ColorIndex, as_color_index, ciede2000, rgb_to_lab, validate_metric,
+)
+
+
+def load_color_database(csv_path: str = 'colors.csv', cache_dir: Optional[str] = None) -> ColorIndex:
     """
     Load the color database from CSV file.
     
     Args:
         csv_path: Path to the CSV file containing color data
+        cache_dir: Directory for the compiled palette; later loads memory-map
+            it instead of parsing the CSV
         
     Returns:
-        List of dictionaries with color information
+        ColorIndex over the palette. Iterating it yields dictionaries with
+        color information (id, name, hex, r, g, b).
     """
-    colors = []
-    with open(csv_path, 'r', encoding='utf-8') as file:
-        reader = csv.reader(file)
-        for row in reader:
-            if len(row) >= 6:
-                colors.append({
-                    'id': row[0],
-                    'name': row[1],
-                    'hex': row[2],
-                    'r': int(row[3]),
-                    'g': int(row[4]),
-                    'b': int(row[5])
-                })
-    return colors
-
-
-def calculate_rgb_distance(rgb1: Tuple[int, int, int], rgb2: Tuple[int, int, int]) -> float:
+    return ColorIndex.load(csv_path, cache_dir)
+
+
+def calculate_rgb_distance(rgb1: Tuple[int, int, int], rgb2: Tuple[int, int, int],
+                           metric: str = 'rgb') -> float:
     """
-    Calculate Euclidean distance between two RGB values.
+    Calculate the distance between two RGB values.
     
     Args:
         rgb1: First RGB tuple (R, G, B)
         rgb2: Second RGB tuple (R, G, B)
+        metric: 'rgb' (Euclidean in sRGB), 'lab76' (Euclidean in CIELAB)
+            or 'ciede2000'
         
     Returns:
-        Euclidean distance between the two colors
+        Distance between the two colors in the units of the metric
     """
-    return math.sqrt(sum((a - b) ** 2 for a, b in zip(rgb1, rgb2)))
+    validate_metric(metric)
+    if metric == 'rgb':
+        return float(np.linalg.norm(np.subtract(rgb1, rgb2, dtype=np.float64)))
+    lab1, lab2 = rgb_to_lab([rgb1, rgb2])
+    if metric == 'lab76':
+        return float(np.linalg.norm(lab1 - lab2))
+    return float(ciede2000(lab1, lab2))
+
+
+def _match_result(color_db: ColorIndex, index: int, distance: float,
+                  rgb_input: Tuple[int, int, int]) -> Dict:
+    color = color_db.record(index)
+    return {
+        'id': color['id'],
+        'name': color['name'],
+        'hex': color['hex'],
+        'rgb': (color['r'], color['g'], color['b']),
+        'distance': distance,
+        'input_rgb': rgb_input
+    }
 
 
 def find_nearest_color(rgb_input: Tuple[int, int, int], 
-                       color_db: List[Dict]) -> Dict:
+                       color_db: Union[ColorIndex, List[Dict]],
+                       metric: str = 'rgb') -> Dict:
     """
     Find the nearest color match for a given RGB input.
     
     Args:
         rgb_input: RGB tuple (R, G, B) with values 0-255
-        color_db: List of dictionaries containing color database
+        color_db: ColorIndex (or list of color dictionaries) to search
+        metric: Distance metric, one of COLOR_METRICS
         
     Returns:
         Dictionary with matched color information and distance
     """
-    min_distance = float('inf')
-    nearest_color = None
+    color_db = as_color_index(color_db)
+    index, distance = color_db.nearest(rgb_input, metric)
+    return _match_result(color_db, index, distance, rgb_input)
+
+
+def find_nearest_colors(rgb_inputs: Sequence[Tuple[int, int, int]],
+                        color_db: Union[ColorIndex, List[Dict]],
+                        metric: str = 'rgb') -> List[Dict]:
+    """
+    Find the nearest color match for many RGB inputs in one vectorized call.
     
-    # Calculate distance to each color in the database
-    for color in color_db:
-        rgb_db = (color['r'], color['g'], color['b'])
-        distance = calculate_rgb_distance(rgb_input, rgb_db)
+    Args:
+        rgb_inputs: Sequence of RGB tuples (R, G, B) with values 0-255
+        color_db: ColorIndex (or list of color dictionaries) to search
+        metric: Distance metric, one of COLOR_METRICS
         
-        if distance < min_distance:
-            min_distance = distance
-            nearest_color = color
-    
-    return {
-        'id': nearest_color['id'],
-        'name': nearest_color['name'],
-        'hex': nearest_color['hex'],
-        'rgb': (nearest_color['r'], nearest_color['g'], nearest_color['b']),
-        'distance': min_distance,
-        'input_rgb': rgb_input
-    }
+    Returns:
+        List of match dictionaries, in the same order as the inputs
+    """
+    color_db = as_color_index(color_db)
+    indices, distances = color_db.nearest_batch(rgb_inputs, metric)
+    return [
+        _match_result(color_db, int(i), float(d), tuple(rgb))
+        for i, d, rgb in zip(indices, distances, rgb_inputs)
+    ]
 
 
 def main():
@@ -105,6 +134,9 @@ def main():
         print(f"  Hex: {result['hex']}")
         print(f"  RGB: {result['rgb']}")
         print(f"  Distance: {result['distance']:.2f}")
+        for metric in COLOR_METRICS[1:]:
+            perceptual = find_nearest_color(rgb, color_db, metric)
+            print(f"  {metric}: {perceptual['name']} (dE {perceptual['distance']:.2f})")
         print()
 
 
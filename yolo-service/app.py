@@ -1,155 +1,94 @@
 # Optimized YOLO Service with GPU Support and Batch Processing
 
-import io
-import os
-import csv
+import json
 import math
+import os
 import gc
 import time
-import hashlib
-from typing import Any, Dict, List, Tuple
 from collections import deque
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
+import numpy as np
 from PIL import Image
-from ultralytics import YOLO
+from werkzeug.exceptions import RequestEntityTooLarge
 
-# Try to import PyTorch for GPU support
+from backends import MODEL_BACKENDS, backend_for_model
+from batching import MicroBatcher
+from camera import DEFAULT_PROFILE, CameraProfile, CameraProfileStore
+from cache import ImageCache, PerceptualCache
+from color_index import COLOR_METRICS, ColorIndex
+from color_sampling import MAX_DOMINANT, SAMPLE_MAX_SIDE, parse_regions, summarize_region
+from color_stream import ColorSession, parse_rgb
+from detector import TORCH_AVAILABLE, OptimizedYOLOService, import_frameworks
+from memory import MemoryManager, current_rss_bytes
+from decode import decode_image, decode_regions
+from local_transport import LocalTransportServer
+from logs import configure_logging, get_logger
+from metrics import CONTENT_TYPE, Registry, Timings, timed
+from pipeline import (calculate_distance, describe_detections, detect_encoded_batch,
+                      detect_traffic_lights as run_pipeline, scale_boxes)
+from startup import ModelLoader, ModelNotReadyError, StartupTimeline
+from tiling import tile_grid
+from tracking import StreamSessionStore
+from traffic_color import analyze_traffic_light_colors, classify_lights
+from uploads import BatchTooLargeError, archive_kind, read_archive, read_image
+from workers import InferencePool, PoolFullError, boxes_task, describe_task, detect_batch_task, detect_task
+
+# WebSocket streaming is optional; the HTTP session endpoints always work
 try:
-    import torch
-    TORCH_AVAILABLE = True
+    from flask_sock import Sock
+    SOCK_AVAILABLE = True
 except ImportError:
-    TORCH_AVAILABLE = False
-    print("Warning: PyTorch not available. Running in CPU-only mode.")
-
-
-class ImageCache:
-    """Simple LRU cache for detection results"""
-    def __init__(self, max_size=100):
-        self.cache = {}
-        self.max_size = max_size
-        self.access_order = deque()
-    
-    def get_hash(self, image_bytes):
-        return hashlib.md5(image_bytes).hexdigest()
-    
-    def get(self, image_bytes):
-        key = self.get_hash(image_bytes)
-        if key in self.cache:
-            # Update access order
-            self.access_order.remove(key)
-            self.access_order.append(key)
-            print(f"Cache hit for {key[:8]}...")
-            return self.cache[key]
-        return None
-    
-    def set(self, image_bytes, result):
-        key = self.get_hash(image_bytes)
-        
-        # Remove oldest if cache is full
-        if len(self.cache) >= self.max_size:
-            oldest = self.access_order.popleft()
-            del self.cache[oldest]
-        
-        self.cache[key] = result
-        self.access_order.append(key)
-        print(f"Cached result for {key[:8]}...")
+    SOCK_AVAILABLE = False
 
+configure_logging()
+log = get_logger("app")
+# torch and ultralytics aren't imported yet: the model loads in the background
+startup_timeline = StartupTimeline()
 
-class OptimizedYOLOService:
-    """YOLO Service with GPU support and optimization"""
-    
-    def __init__(self, model_path='yolov8n.pt'):
-        self.device = self._get_device()
-        print(f"Initializing YOLO model on device: {self.device}")
-        
-        self.model = YOLO(model_path)
-        if TORCH_AVAILABLE:
-            self.model.to(self.device)
-        
-        self.model_names = self.model.names
-        print(f"Model loaded successfully. Classes: {len(self.model_names)}")
-    
-    def _get_device(self):
-        """Determine the best device to use"""
-        if not TORCH_AVAILABLE:
-            return 'cpu'
-        
-        if torch.cuda.is_available():
-            print(f"CUDA available: {torch.cuda.get_device_name(0)}")
-            return 'cuda'
-        elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
-            print("MPS (Apple Silicon) available")
-            return 'mps'
-        else:
-            print("No GPU available, using CPU")
-            return 'cpu'
-    
-    def detect(self, image, conf=0.15):
-        """Perform detection with memory optimization"""
-        with torch.no_grad() if TORCH_AVAILABLE else nullcontext():
-            results = self.model(image, verbose=False, conf=conf, device=self.device)
-        return results
-    
-    def cleanup_memory(self):
-        """Force garbage collection and clear GPU cache"""
-        gc.collect()
-        if TORCH_AVAILABLE and torch.cuda.is_available():
-            torch.cuda.empty_cache()
-
-
-def nullcontext():
-    """Context manager for non-PyTorch environments"""
-    class _NullContext:
-        def __enter__(self):
-            return self
-        def __exit__(self, exc_type, exc_val, exc_tb):
-            return False
-    return _NullContext()
-
-
-def load_color_database(csv_path: str = 'colors.csv') -> List[Dict]:
-    """Load the color database from CSV file."""
-    colors = []
+
+def load_color_database(csv_path: str = 'colors.csv', lut_bits: Optional[int] = None,
+                        cache_dir: Optional[str] = None, lut_metric: str = 'rgb') -> ColorIndex:
+    """
+    Load the color database from CSV file into a vectorized color index.
+
+    With a ``cache_dir`` the palette is compiled there on first start and
+    memory-mapped afterwards (see ColorIndex.load). When ``lut_bits`` is set
+    (5, 6 or 8), a dense RGB -> color lookup table for ``lut_metric`` is
+    memory-mapped from ``cache_dir`` or built there on a background thread.
+    Queries use the palette search until the table is ready.
+    """
     try:
         if not os.path.exists(csv_path):
-            print(f"Warning: Color database not found at {csv_path}")
-            return []
-        with open(csv_path, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if len(row) >= 6:
-                    colors.append({
-                        'name': row[1],
-                        'r': int(row[3]),
-                        'g': int(row[4]),
-                        'b': int(row[5])
-                    })
-        print(f"Loaded {len(colors)} colors from database")
+            log.warning("color database not found", path=csv_path)
+            return ColorIndex.empty()
+        start = time.perf_counter()
+        colors = ColorIndex.load(csv_path, cache_dir)
+        log.info("color database loaded", colors=len(colors),
+                 compiled=isinstance(colors.rgb, np.memmap), load_ms=round((time.perf_counter() - start) * 1000, 2))
+        if lut_bits:
+            try:
+                colors.enable_lookup_table(lut_bits, cache_dir, metric=lut_metric)
+                log.info("color lookup table loading in background", bits=lut_bits, metric=lut_metric)
+            except ValueError as e:
+                log.warning("color lookup table disabled", error=str(e))
+        return colors
     except Exception as e:
-        print(f"Error loading color database: {e}")
-    return colors
+        log.error("color database failed to load", path=csv_path, error=str(e))
+    return ColorIndex.empty()
 
 
-def find_nearest_color(rgb_input: Tuple[int, int, int], color_db: List[Dict]) -> str:
-    """Find the nearest color match using Euclidean distance."""
-    if not color_db:
+def find_nearest_color(rgb_input: Tuple[int, int, int], color_db: ColorIndex,
+                       metric: str = 'rgb') -> str:
+    """Find the nearest color match using the given distance metric (see COLOR_METRICS)."""
+    if not len(color_db):
         return 'unknown'
-        
-    min_distance = float('inf')
-    nearest_name = 'unknown'
-    
-    for color in color_db:
-        distance = math.sqrt(
-            (rgb_input[0] - color['r'])**2 + 
-            (rgb_input[1] - color['g'])**2 + 
-            (rgb_input[2] - color['b'])**2
-        )
-        if distance < min_distance:
-            min_distance = distance
-            nearest_name = color['name'].lower()
+
+    index, _ = color_db.nearest(rgb_input, metric)
+    nearest_name = color_db.names[index].lower()
             
     # Map specific shades back to standard traffic light colors
     if any(word in nearest_name for word in ['red', 'crimson', 'scarlet', 'maroon']):
@@ -162,153 +101,530 @@ def find_nearest_color(rgb_input: Tuple[int, int, int], color_db: List[Dict]) ->
     return 'unknown'
 
 
-def analyze_traffic_light_color(image: Image.Image, box: Dict[str, float], color_db: List[Dict]) -> str:
-    """
-    Analyze the color of a detected traffic light using HSV color space 
-    to better handle light sources and contrast against the dark casing.
+# Initialize Flask app
+app = Flask(__name__)
+CORS(app)
+sock = Sock(app) if SOCK_AVAILABLE else None
+# flask_sock takes over the raw connection, which only some WSGI servers
+# hand out (werkzeug, gunicorn, eventlet, gevent); serve.py turns this off
+# under waitress, and /ws/stream then answers 501
+websocket_enabled = SOCK_AVAILABLE
+
+# Initialize YOLO service. YOLO_MODEL_PATH may also name an export (e.g.
+# an INT8 model from quantize.py), which then picks the backend.
+YOLO_MODEL_PATH = os.environ.get("YOLO_MODEL_PATH", "yolov8n.pt")
+YOLO_BACKEND = os.environ.get("YOLO_BACKEND", "torch")
+if YOLO_BACKEND not in MODEL_BACKENDS:
+    log.warning("unknown YOLO_BACKEND, using 'torch'", backend=YOLO_BACKEND)
+    YOLO_BACKEND = "torch"
+if backend_for_model(YOLO_MODEL_PATH, YOLO_BACKEND) != YOLO_BACKEND:
+    log.info("backend set by model file", model=YOLO_MODEL_PATH, backend=backend_for_model(YOLO_MODEL_PATH))
+    YOLO_BACKEND = backend_for_model(YOLO_MODEL_PATH)
+YOLO_INTRA_OP_THREADS = int(os.environ.get("YOLO_INTRA_OP_THREADS", "0")) or None
+
+# Inference input size, and whether to restrict inference to traffic lights
+YOLO_IMGSZ = int(os.environ.get("YOLO_IMGSZ", "640"))
+YOLO_CLASS_FILTER = os.environ.get("YOLO_CLASS_FILTER", "1") != "0"
+
+# Adaptive mode: low-resolution pass first, then re-detect small or
+# low-confidence traffic lights on zoomed-in crops
+YOLO_ADAPTIVE = os.environ.get("YOLO_ADAPTIVE", "0") == "1"
+YOLO_ADAPTIVE_LOW_IMGSZ = int(os.environ.get("YOLO_ADAPTIVE_LOW_IMGSZ", "320"))
+YOLO_ADAPTIVE_ROI_IMGSZ = int(os.environ.get("YOLO_ADAPTIVE_ROI_IMGSZ", "320"))
+YOLO_ADAPTIVE_SMALL_PX = float(os.environ.get("YOLO_ADAPTIVE_SMALL_PX", "24"))
+YOLO_ADAPTIVE_REFINE_CONF = float(os.environ.get("YOLO_ADAPTIVE_REFINE_CONF", "0.35"))
+
+YOLO_MODEL_OPTIONS = dict(
+    model_path=YOLO_MODEL_PATH,
+    backend=YOLO_BACKEND,
+    imgsz=YOLO_IMGSZ,
+    class_filter=YOLO_CLASS_FILTER,
+)
+YOLO_ADAPTIVE_OPTIONS = dict(
+    low_imgsz=YOLO_ADAPTIVE_LOW_IMGSZ,
+    roi_imgsz=YOLO_ADAPTIVE_ROI_IMGSZ,
+    small_px=YOLO_ADAPTIVE_SMALL_PX,
+    refine_conf=YOLO_ADAPTIVE_REFINE_CONF,
+) if YOLO_ADAPTIVE else None
+
+# Tiled mode (see tiling.py): the frame, or its upper YOLO_TILE_TOP
+# fraction, is cut into a YOLO_TILES grid ("COLSxROWS") of tiles sharing
+# YOLO_TILE_OVERLAP of their size, run at full input size in one batch
+# together with the whole frame (unless YOLO_TILE_FULL_FRAME=0), so distant
+# lights in high-resolution frames get more pixels. Replaces adaptive mode.
+YOLO_TILED = os.environ.get("YOLO_TILED", "0") == "1"
+YOLO_TILED_OPTIONS = dict(
+    tiles=tuple(int(v) for v in os.environ.get("YOLO_TILES", "3x2").lower().split("x")),
+    overlap=float(os.environ.get("YOLO_TILE_OVERLAP", "0.2")),
+    top=float(os.environ.get("YOLO_TILE_TOP", "1.0")),
+    full_frame=os.environ.get("YOLO_TILE_FULL_FRAME", "1") != "0",
+) if YOLO_TILED else None
+if YOLO_TILED_OPTIONS is not None:
+    tile_grid((1280, 720), *YOLO_TILED_OPTIONS["tiles"], overlap=YOLO_TILED_OPTIONS["overlap"],
+              top=YOLO_TILED_OPTIONS["top"])  # fail at startup on a bad grid
+
+# Warm-up: YOLO_WARMUP_RUNS passes over synthetic frames, one per
+# YOLO_WARMUP_SIZES entry ("WxH", comma-separated; another aspect ratio
+# letterboxes to another input shape), plus one batch of YOLO_WARMUP_BATCH
+# frames per pass when it is above 1 (e.g. DETECT_BATCH_SIZE).
+YOLO_WARMUP_RUNS = int(os.environ.get("YOLO_WARMUP_RUNS", "1"))
+YOLO_WARMUP_SIZES = [tuple(int(v) for v in size.lower().split("x"))
+                     for size in os.environ.get("YOLO_WARMUP_SIZES", "640x480").split(",") if size.strip()]
+YOLO_WARMUP_BATCH = int(os.environ.get("YOLO_WARMUP_BATCH", "0"))
+if YOLO_TILED_OPTIONS is not None:
+    # Warm up the shape of a tile batch too
+    cols, rows = YOLO_TILED_OPTIONS["tiles"]
+    YOLO_WARMUP_BATCH = max(YOLO_WARMUP_BATCH, cols * rows + YOLO_TILED_OPTIONS["full_frame"])
+
+# YOLO_WORKERS > 0 runs inference and color analysis in that many worker
+# processes, each with its own model; request threads only parse, check
+# caches and encode JSON. Requests beyond the workers plus
+# YOLO_WORKER_QUEUE waiting ones get a 429.
+YOLO_WORKERS = int(os.environ.get("YOLO_WORKERS", "0"))
+if YOLO_WORKERS > 0 and __name__ == "__main__":
+    # Spawned workers re-import the main module; app.py must not be it
+    raise SystemExit("YOLO_WORKERS needs the production server: run `python serve.py`")
+
+
+# The model (or the worker pool) loads on a background thread, so the
+# server answers /health straight away; /ready and the model endpoints
+# answer 503 until it is loaded and warmed up. YOLO_BACKGROUND_LOAD=0 loads
+# it while app.py is imported instead. Both are set by load_model().
+YOLO_BACKGROUND_LOAD = os.environ.get("YOLO_BACKGROUND_LOAD", "1") != "0"
+yolo_service: Optional[OptimizedYOLOService] = None
+inference_pool: Optional[InferencePool] = None
+
+# JPEG uploads are decoded at reduced resolution when the consumer needs
+# less: the detector only needs its input size (full resolution in adaptive
+# and tiled modes, whose zoomed-in crops need it), /detect-color only enough pixels to
+# average the center region. DECODE_DRAFT=0 always decodes at full size.
+DECODE_DRAFT = os.environ.get("DECODE_DRAFT", "1") != "0"
+DECODE_MIN_SIZE = YOLO_IMGSZ if DECODE_DRAFT and not YOLO_ADAPTIVE and not YOLO_TILED else None
+COLOR_SAMPLE_MIN_PX = 16
+# Decode size for the perceptual hash when workers do the full decode
+PERCEPTUAL_DECODE_SIZE = 256 if DECODE_DRAFT else None
+
+# Default metric for /detect-color when the request doesn't name one
+DEFAULT_COLOR_METRIC = os.environ.get("COLOR_METRIC", "rgb")
+if DEFAULT_COLOR_METRIC not in COLOR_METRICS:
+    log.warning("unknown COLOR_METRIC, using 'rgb'", metric=DEFAULT_COLOR_METRIC)
+    DEFAULT_COLOR_METRIC = "rgb"
+
+# Initialize color database. The palette is compiled to memory-mapped arrays
+# in COLOR_LUT_CACHE_DIR (rebuilt when colors.csv changes), so workers share
+# one read-only copy of it and of the lookup table.
+with startup_timeline.phase("color_db"):
+    color_db = load_color_database(
+        'colors.csv',
+        lut_bits=int(os.environ.get("COLOR_LUT_BITS", "0")) or None,
+        cache_dir=os.environ.get("COLOR_LUT_CACHE_DIR", ".cache"),
+        lut_metric=DEFAULT_COLOR_METRIC,
+    )
+
+# Initialize cache
+image_cache = ImageCache(
+    max_size=int(os.environ.get("CACHE_MAX_ENTRIES", "100")),
+    max_bytes=int(os.environ.get("CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    ttl_s=float(os.environ.get("CACHE_TTL_S", "300")) or None,
+)
+
+# Near-duplicate cache for consecutive camera frames from the same client.
+# A negative PERCEPTUAL_CACHE_THRESHOLD disables it. Clients are told apart
+# by X-Client-Id / client_id, then device_id, then the remote address; a
+# proxy such as the Node back end must forward a per-user ID, or all its
+# users share one history (see client_key()).
+PERCEPTUAL_CACHE_THRESHOLD = int(os.environ.get("PERCEPTUAL_CACHE_THRESHOLD", "2"))
+perceptual_cache = (
+    PerceptualCache(
+        threshold=PERCEPTUAL_CACHE_THRESHOLD,
+        hash_size=int(os.environ.get("PERCEPTUAL_CACHE_HASH_SIZE", "16")),
+        history=int(os.environ.get("PERCEPTUAL_CACHE_HISTORY", "4")),
+        ttl_s=float(os.environ.get("PERCEPTUAL_CACHE_TTL_S", "2")),
+    )
+    if PERCEPTUAL_CACHE_THRESHOLD >= 0 else None
+)
+
+# Coalesce concurrent /detect requests into batched forward passes.
+# DETECT_BATCH_SIZE=1 disables batching. A lone request at low load is
+# dispatched at once; DETECT_BATCH_WAIT_MS only applies under concurrency.
+DETECT_BATCH_SIZE = int(os.environ.get("DETECT_BATCH_SIZE", "8"))
+DETECT_BATCH_WAIT_MS = float(os.environ.get("DETECT_BATCH_WAIT_MS", "10"))
+detect_batcher: Optional[MicroBatcher] = None
+
+# /detect-batch takes up to DETECT_BATCH_MAX_IMAGES images per request,
+# decodes them on DETECT_BATCH_DECODE_THREADS threads and runs them through
+# the model DETECT_BATCH_CHUNK_SIZE at a time (spread over the workers when
+# YOLO_WORKERS > 0).
+DETECT_BATCH_MAX_IMAGES = int(os.environ.get("DETECT_BATCH_MAX_IMAGES", "64"))
+# Uncompressed size limits per image and per batch; archive members are
+# checked by their declared size before they are inflated. Request bodies
+# on any endpoint are capped at MAX_REQUEST_BYTES (413 past it).
+DETECT_BATCH_MAX_IMAGE_BYTES = int(os.environ.get("DETECT_BATCH_MAX_IMAGE_BYTES", str(32 * 1024 * 1024)))
+DETECT_BATCH_MAX_BYTES = int(os.environ.get("DETECT_BATCH_MAX_BYTES", str(256 * 1024 * 1024)))
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_REQUEST_BYTES", str(DETECT_BATCH_MAX_BYTES)))
+DETECT_BATCH_CHUNK_SIZE = int(os.environ.get("DETECT_BATCH_CHUNK_SIZE", "16"))
+decode_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("DETECT_BATCH_DECODE_THREADS", "0")) or min(4, os.cpu_count() or 1),
+    thread_name_prefix="decode",
+)
+
+
+# Memory cleanup runs on a background thread when RSS / CUDA memory crosses
+# a watermark (0 disables a watermark) or every MEMORY_GC_INTERVAL_S seconds.
+memory_manager = MemoryManager(
+    collect=lambda: yolo_service.cleanup_memory() if yolo_service is not None else gc.collect(),
+    rss_high_mb=float(os.environ.get("MEMORY_RSS_HIGH_MB", "3072")),
+    cuda_high_mb=float(os.environ.get("MEMORY_CUDA_HIGH_MB", "0")),
+    cuda_memory=lambda: yolo_service.cuda_memory_allocated() if yolo_service is not None else None,
+    interval_s=float(os.environ.get("MEMORY_GC_INTERVAL_S", "300")),
+)
+memory_manager.start()
+
+# Palette and module state are long-lived; moving them out of the
+# collector's generations keeps full collections short. load_model() does
+# the same for the model.
+gc.collect()
+gc.freeze()
+
+# Distances use the camera profile sent with a request ('camera' field,
+# JSON), else the one stored for its device ID ('device_id' field or
+# X-Device-Id header; see /camera-profile), else CAMERA_PROFILE (same JSON)
+# or a 650 px focal length at 1280x720.
+DEFAULT_CAMERA = (CameraProfile.parse(os.environ["CAMERA_PROFILE"]) if os.environ.get("CAMERA_PROFILE")
+                  else DEFAULT_PROFILE)
+camera_profiles = CameraProfileStore(
+    max_profiles=int(os.environ.get("CAMERA_PROFILE_MAX", "1024")),
+    ttl_s=float(os.environ.get("CAMERA_PROFILE_TTL_S", str(7 * 24 * 3600))),
+)
+
+# Per-client state for /stream sessions
+stream_sessions = StreamSessionStore(
+    max_sessions=int(os.environ.get("STREAM_MAX_SESSIONS", "256")),
+    idle_timeout_s=float(os.environ.get("STREAM_IDLE_TIMEOUT_S", "60")),
+)
+STREAM_DETECT_EVERY = int(os.environ.get("STREAM_DETECT_EVERY", "5"))
+STREAM_SMOOTHING_WINDOW = int(os.environ.get("STREAM_SMOOTHING_WINDOW", "5"))
+
+# Per-client state for /color-stream sessions (see color_stream.py)
+color_sessions = StreamSessionStore(
+    max_sessions=int(os.environ.get("COLOR_STREAM_MAX_SESSIONS", "1024")),
+    idle_timeout_s=float(os.environ.get("COLOR_STREAM_IDLE_TIMEOUT_S", "60")),
+    session_class=ColorSession,
+)
+COLOR_STREAM_ALPHA = float(os.environ.get("COLOR_STREAM_ALPHA", "0.3"))
+COLOR_STREAM_HISTORY = int(os.environ.get("COLOR_STREAM_HISTORY", "5"))
+
+# Prometheus metrics at /metrics: per-stage and per-request latency
+# histograms, plus cache, queue and device state read at scrape time.
+# Responses carry per-stage milliseconds under "timings" when the request
+# asks (?timings=1, a timings=1 form field or an "X-Timings: 1" header) or
+# RESPONSE_TIMINGS=1.
+RESPONSE_TIMINGS = os.environ.get("RESPONSE_TIMINGS", "0") == "1"
+
+# Unix socket for the back end on the same host (see local_transport.py);
+# off unless LOCAL_SOCKET is a path. LOCAL_SOCKET_MODE is octal.
+LOCAL_SOCKET = os.environ.get("LOCAL_SOCKET", "")
+LOCAL_SOCKET_MODE = int(os.environ.get("LOCAL_SOCKET_MODE", "660"), 8)
+LOCAL_SOCKET_MAX_BYTES = int(os.environ.get("LOCAL_SOCKET_MAX_BYTES", str(32 * 1024 * 1024)))
+registry = Registry()
+stage_seconds = registry.histogram(
+    "yolo_stage_seconds", "Time spent in each request stage", ("endpoint", "stage"))
+request_seconds = registry.histogram(
+    "yolo_request_seconds", "Request handling time, excluding network I/O", ("endpoint",))
+requests_total = registry.counter("yolo_requests_total", "Requests handled", ("endpoint", "status"))
+gc_pause_seconds = registry.histogram(
+    "yolo_gc_pause_seconds", "Pause of each memory cleanup (gc plus device cache flush)", ("reason",))
+memory_manager.on_collect = lambda reason, pause: gc_pause_seconds.observe(pause, reason)
+
+
+def cache_stat(key: str):
+    """Scrape-time reader for one stats() field of the exact and perceptual caches."""
+    def read() -> Dict[Tuple[str, ...], float]:
+        values = {("exact",): image_cache.stats()[key]}
+        if perceptual_cache is not None:
+            values[("perceptual",)] = perceptual_cache.stats()[key]
+        return values
+    return read
+
+
+registry.gauge("yolo_cache_entries", "Entries in the result cache", lambda: len(image_cache))
+registry.gauge("yolo_cache_bytes", "Serialized size of the result cache", lambda: image_cache.stats()["bytes"])
+registry.counter_from("yolo_cache_hits_total", "Cache hits", cache_stat("hits"), ("cache",))
+registry.counter_from("yolo_cache_misses_total", "Cache misses", cache_stat("misses"), ("cache",))
+registry.counter_from("yolo_cache_evictions_total", "Result cache evictions",
+                      lambda: image_cache.stats()["evictions"])
+registry.gauge("yolo_batch_queue_depth", "Frames waiting for the micro-batcher",
+               lambda: detect_batcher.stats()["queue_depth"] if detect_batcher is not None else None)
+registry.counter_from("yolo_batches_total", "Batched forward passes",
+                      lambda: detect_batcher.stats()["batches"] if detect_batcher is not None else None)
+registry.counter_from("yolo_batch_items_total", "Frames run through the micro-batcher",
+                      lambda: detect_batcher.stats()["items"] if detect_batcher is not None else None)
+registry.gauge("yolo_pool_in_flight", "Requests running on or waiting for an inference worker",
+               lambda: inference_pool.stats()["in_flight"] if inference_pool is not None else None)
+registry.gauge("yolo_pool_queued", "Requests waiting for an inference worker",
+               lambda: inference_pool.stats()["queued"] if inference_pool is not None else None)
+registry.counter_from("yolo_pool_rejected_total", "Requests rejected with 429",
+                      lambda: inference_pool.stats()["rejected"] if inference_pool is not None else None)
+registry.gauge("yolo_stream_sessions", "Open stream sessions", lambda: len(stream_sessions))
+registry.gauge("yolo_color_sessions", "Open color stream sessions", lambda: len(color_sessions))
+registry.gauge("yolo_camera_profiles", "Stored device camera profiles", lambda: len(camera_profiles))
+registry.counter_from("yolo_gc_collections_total", "Memory cleanups run, by what triggered them",
+                      lambda: {(reason,): n for reason, n in memory_manager.collection_counts().items()},
+                      ("reason",))
+registry.gauge("yolo_resident_memory_bytes", "Resident set size of the web process", current_rss_bytes)
+registry.gauge("yolo_cuda_memory_allocated_bytes", "CUDA memory allocated by the model",
+               lambda: yolo_service.cuda_memory_allocated() if yolo_service is not None else None)
+registry.gauge("yolo_color_lut_ready", "1 once the color lookup table is loaded",
+               lambda: float(color_db.lookup_table_status()["state"] == "ready"))
+registry.gauge("yolo_device_info", "Inference device and backend",
+               lambda: {(model_device(), YOLO_BACKEND): 1.0} if model_loader.ready else None,
+               ("device", "backend"))
+registry.gauge("yolo_model_ready", "1 once the model is loaded and warmed up", lambda: float(model_loader.ready))
+registry.gauge("yolo_startup_phase_seconds", "Duration of each startup phase",
+               lambda: {(name,): s for name, s in startup_timeline.durations().items()}, ("phase",))
+registry.gauge("yolo_startup_milestone_seconds", "Seconds from process start to each startup milestone",
+               lambda: {(name,): s for name, s in startup_timeline.marks().items()}, ("milestone",))
+
+
+def load_model() -> None:
+    """Load the model (or start the inference workers) and warm it up; runs once, on model_loader."""
+    global yolo_service, inference_pool, detect_batcher
+    warmup = dict(runs=YOLO_WARMUP_RUNS, sizes=YOLO_WARMUP_SIZES, batch=YOLO_WARMUP_BATCH)
+    if YOLO_WORKERS > 0:
+        log.info("starting inference workers", workers=YOLO_WORKERS)
+        with startup_timeline.phase("workers"):
+            pool = InferencePool(
+                YOLO_WORKERS,
+                YOLO_MODEL_OPTIONS,
+                adaptive=YOLO_ADAPTIVE_OPTIONS,
+                tiled=YOLO_TILED_OPTIONS,
+                threads=YOLO_INTRA_OP_THREADS,
+                max_queue=int(os.environ["YOLO_WORKER_QUEUE"]) if os.environ.get("YOLO_WORKER_QUEUE") else None,
+                warmup=warmup,
+                pin_cores=os.environ.get("YOLO_WORKER_PIN_CORES", "0") == "1",
+            )
+            try:
+                startup_s = pool.start()
+            except BaseException:
+                pool.close()
+                raise
+        log.info("inference workers ready", startup_s=round(startup_s, 2),
+                 threads_per_worker=pool.threads, device=pool.device)
+        inference_pool = pool
+    else:
+        log.info("loading YOLO model", model=YOLO_MODEL_OPTIONS["model_path"], backend=YOLO_BACKEND)
+        with startup_timeline.phase("frameworks"):
+            import_frameworks()
+        with startup_timeline.phase("model_load"):
+            service = OptimizedYOLOService(threads=YOLO_INTRA_OP_THREADS, **YOLO_MODEL_OPTIONS)
+        with startup_timeline.phase("warmup"):
+            warmup_time = service.warmup(**warmup)
+        log.info("model warm-up finished", warmup_s=round(warmup_time, 2), runs=YOLO_WARMUP_RUNS,
+                 sizes=",".join(f"{w}x{h}" for w, h in YOLO_WARMUP_SIZES))
+        if DETECT_BATCH_SIZE > 1:
+            detect_batcher = MicroBatcher(service.detect_batch, DETECT_BATCH_SIZE, DETECT_BATCH_WAIT_MS,
+                                          name='detect-batcher')
+        yolo_service = service
+    gc.collect()
+    gc.freeze()
+
+
+model_loader = ModelLoader(load_model, startup_timeline, background=YOLO_BACKGROUND_LOAD)
+
+
+def model_device() -> Optional[str]:
+    """Inference device, or None while the model is loading."""
+    if yolo_service is not None:
+        return yolo_service.device
+    if inference_pool is not None:
+        return inference_pool.device
+    return None
+
+
+def run_detection(image: Image.Image, conf: float = 0.15, imgsz: Optional[int] = None):
+    """Run detection through the micro-batcher when enabled."""
+    if detect_batcher is not None:
+        return detect_batcher.run(image, conf=conf, imgsz=imgsz)
+    return yolo_service.detect(image, conf=conf, imgsz=imgsz)
+
+
+def detect_traffic_lights(image: Image.Image, conf: float = 0.15) -> List[Dict[str, Any]]:
+    """Traffic-light boxes for one frame, using adaptive resolution or tiles when enabled."""
+    return run_pipeline(yolo_service, image, conf=conf, adaptive=YOLO_ADAPTIVE_OPTIONS, run=run_detection,
+                        tiled=YOLO_TILED_OPTIONS)
+
+
+def run_in_pool(timings: Timings, task, *args: Any) -> Tuple[Any, ...]:
+    """Run a worker task whose last return value is its stage times, and record them."""
+    start = time.perf_counter()
+    *result, stages = inference_pool.run(task, *args)
+    timings.merge(stages)
+    # Whatever the worker didn't account for was spent queued or in transit
+    timings.add("queue", max(0.0, time.perf_counter() - start - sum(stages.values())))
+    return tuple(result)
+
+
+def observe_stages(endpoint: str, timings: Timings) -> None:
+    for stage, seconds in timings.stages.items():
+        stage_seconds.observe(seconds, endpoint, stage)
+
+
+def respond(result: Dict[str, Any], status: int = 200) -> Any:
+    """JSON response; adds stage timings when asked for and times the encoding as 'serialize'."""
+    timings = g.timings
+    if RESPONSE_TIMINGS or request.values.get("timings") == "1" or request.headers.get("X-Timings") == "1":
+        result["timings"] = timings.as_ms()
+    with timings.stage("serialize"):
+        response = jsonify(result)
+    return response, status
+
+
+def device_camera(device_id: Optional[str]) -> CameraProfile:
+    """The stored profile of ``device_id``, or the default one."""
+    return (camera_profiles.get(device_id) if device_id else None) or DEFAULT_CAMERA
+
+
+def client_key() -> str:
     """
-    x1, y1, x2, y2 = int(box['x1']), int(box['y1']), int(box['x2']), int(box['y2'])
-    width, height = image.size
-    x1, y1 = max(0, x1), max(0, y1)
-    x2, y2 = min(width, x2), min(height, y2)
-    
-    if x2 <= x1 or y2 <= y1:
-        return 'unknown'
-    
-    traffic_light_region = image.crop((x1, y1, x2, y2))
-    
-    # Convert to HSV for better color segmentation
-    img_hsv = traffic_light_region.convert('HSV')
-    img_array = np.array(img_hsv)
-    
-    h, w = img_array.shape[:2]
-    section_height = h // 3
-    
-    # Define sections
-    sections = [
-        ("red", img_array[0:section_height, :]),            # Top
-        ("yellow", img_array[section_height:2*section_height, :]), # Middle
-        ("green", img_array[2*section_height:, :])           # Bottom
-    ]
-    
-    max_score = 0
-    detected_color = 'unknown'
-    
-    for color_name, section in sections:
-        if section.size == 0: continue
-        
-        # Extract channels
-        h_channel = section[:, :, 0]
-        s_channel = section[:, :, 1]
-        v_channel = section[:, :, 2]
-        
-        # Create masks for standard traffic light colors in HSV (0-255 scale in PIL)
-        # H: 0-255 (where 0 is 0deg, 255 is 360deg)
-        # Red: H < 20 or H > 235
-        # Yellow: H 20-50
-        # Green: H 50-120
-        
-        if color_name == 'red':
-            mask = ((h_channel < 25) | (h_channel > 230)) & (s_channel > 50) & (v_channel > 60)
-        elif color_name == 'yellow':
-            mask = (h_channel >= 20) & (h_channel <= 60) & (s_channel > 50) & (v_channel > 60)
-        elif color_name == 'green':
-            mask = (h_channel >= 40) & (h_channel <= 130) & (s_channel > 50) & (v_channel > 60)
-            
-        # Calculate "score" as number of matching pixels * their brightness
-        # This favors bright, colorful blobs (the light) over dark background
-        matching_pixels = section[mask]
-        
-        if matching_pixels.size > 0:
-            # Score is sum of brightness of matching pixels
-            score = np.sum(matching_pixels[:, 2])
-            
-            # Normalize by section size to filter noise
-            normalized_score = score / (section.shape[0] * section.shape[1])
-            
-            if normalized_score > max_score and normalized_score > 5: # Threshold
-                max_score = normalized_score
-                detected_color = color_name
-
-    # Fallback: if no color detected via HSV, look at simple max brightness position
-    if detected_color == 'unknown':
-        img_gray = traffic_light_region.convert('L')
-        gray_array = np.array(img_gray)
-        
-        brightness_scores = []
-        for i in range(3):
-            sec = gray_array[i*section_height : (i+1)*section_height, :]
-            if sec.size > 0:
-                # Use max brightness instead of mean to find the "bulb"
-                brightness_scores.append(np.max(sec))
-            else:
-                brightness_scores.append(0)
-        
-        best_section = np.argmax(brightness_scores)
-        max_val = brightness_scores[best_section]
-        
-        # If the brighest spot is actually bright (scale 0-255)
-        if max_val > 150:
-            if best_section == 0: return 'red'
-            if best_section == 1: return 'yellow'
-            if best_section == 2: return 'green'
+    Whose frame history a /detect request joins in the perceptual cache.
 
-    return detected_color
+    The remote address is only a last resort: behind the back end or any
+    other proxy it is the same for every user.
+    """
+    return (request.headers.get("X-Client-Id") or request.values.get("client_id")
+            or request.headers.get("X-Device-Id") or request.values.get("device_id")
+            or request.remote_addr or "")
 
 
-def calculate_distance(box: Dict[str, float]) -> float:
+def request_camera(options: Optional[Any] = None, device_id: Optional[str] = None) -> CameraProfile:
     """
-    Estimate distance to the traffic light based on bounding box height.
-    Using a typical traffic light height of 0.8m and an assumed focal length.
+    Camera profile for this request. A 'camera' field is used (and stored
+    for the device when a device ID comes with it); otherwise the device's
+    stored profile. ``device_id`` is the fallback when the request names none.
+
+    Raises:
+        ValueError: The 'camera' field isn't a valid profile
     """
-    # Realistic height of a traffic light (main unit) in meters
-    REAL_HEIGHT_M = 0.8
-    # Estimated focal length in pixels (standard for 720p/1080p cameras)
-    FOCAL_LENGTH_PX = 650 
-    
-    pixel_height = box['y2'] - box['y1']
-    if pixel_height <= 0:
-        return 0.0
-    
-    # Distance = (Real Height * Focal Length) / Pixel Height
-    distance = (REAL_HEIGHT_M * FOCAL_LENGTH_PX) / pixel_height
-    return round(distance, 1)
+    options = request.values if options is None else options
+    device_id = request.headers.get("X-Device-Id") or options.get("device_id") or device_id
+    if options.get("camera"):
+        camera = CameraProfile.parse(options["camera"])
+        if device_id:
+            camera_profiles.set(device_id, camera)
+        return camera
+    return device_camera(device_id)
 
 
-# Initialize Flask app
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
+def camera_cache_key(key: str, camera: CameraProfile) -> str:
+    """Results hold distances, so they are cached per camera profile."""
+    return key if camera is DEFAULT_CAMERA else f"{key}:{camera.key}"
 
-# Initialize YOLO service
-print("Loading YOLO model...")
-yolo_service = OptimizedYOLOService(os.environ.get("YOLO_MODEL_PATH", "yolov8n.pt"))
 
-# Initialize color database
-color_db = load_color_database('colors.csv')
+def invalid_image(endpoint: str, error: Exception) -> Any:
+    log.warning("invalid image", endpoint=endpoint, error=str(error))
+    return jsonify({"error": f"Invalid image: {str(error)}"}), 400
 
-# Initialize cache
-image_cache = ImageCache(max_size=100)
+
+# Endpoints that run the model; they answer 503 until it is ready
+MODEL_ENDPOINTS = {"detect", "detect_batch", "stream_frame", "stream_websocket"}
+
+
+@app.before_request
+def start_timings() -> None:
+    g.timings = Timings()
+
+
+@app.before_request
+def require_model() -> Any:
+    if request.endpoint == "stream_websocket" and not websocket_enabled:
+        return jsonify({"error": "WebSocket streaming is not supported by this server; "
+                                 "use the /stream HTTP session endpoints"}), 501
+    if request.endpoint in MODEL_ENDPOINTS:
+        model_loader.require()
+    return None
+
+
+@app.after_request
+def record_request(response: Any) -> Any:
+    # WebSocket frames are recorded one by one; the connection itself isn't a request
+    endpoint = request.endpoint or "unmatched"
+    timings = g.get("timings")
+    if timings is not None and endpoint != "stream_websocket":
+        observe_stages(endpoint, timings)
+        request_seconds.observe(timings.elapsed(), endpoint)
+        requests_total.inc(endpoint, str(response.status_code))
+    return response
+
+
+@app.errorhandler(PoolFullError)
+def pool_full(e: PoolFullError) -> Any:
+    """Back-pressure: tell clients to retry instead of queueing without limit."""
+    log.warning("request rejected, inference workers busy", endpoint=request.endpoint)
+    return jsonify({"error": "Server busy, retry later"}), 429, {"Retry-After": "1"}
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e: RequestEntityTooLarge) -> Any:
+    return jsonify({"error": f"Request body over {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+
+
+@app.errorhandler(ModelNotReadyError)
+def model_not_ready(e: ModelNotReadyError) -> Any:
+    return jsonify({"error": "Model is not ready yet, retry later", "state": model_loader.state}), 503, {
+        "Retry-After": "5"}
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics() -> Any:
+    """Prometheus metrics in the text exposition format"""
+    return registry.render(), 200, {"Content-Type": CONTENT_TYPE}
 
 
 @app.route("/health", methods=["GET"])
 def health() -> Any:
-    """Health check endpoint"""
+    """Liveness check: answers while the model loads, 503 only if it failed to load"""
+    failed = model_loader.state == "failed"
+    device = model_device()
     return jsonify({
-        "status": "ok",
-        "device": yolo_service.device,
+        "status": "failed" if failed else "ok",
+        "ready": model_loader.ready,
+        "model": model_loader.status(),
+        "startup": startup_timeline.as_dict(),
+        "device": device,
+        "backend": YOLO_BACKEND,
+        "model_path": YOLO_MODEL_PATH,
+        "workers": inference_pool.stats() if inference_pool is not None else {"enabled": False},
         "db_size": len(color_db),
-        "cache_size": len(image_cache.cache),
+        "color_lut": color_db.lookup_table_status(),
+        "cache_size": len(image_cache),
+        "cache": image_cache.stats(),
+        "perceptual_cache": perceptual_cache.stats() if perceptual_cache is not None else {"enabled": False},
+        "batching": detect_batcher.stats() if detect_batcher is not None else {"enabled": False},
+        "stream_sessions": len(stream_sessions),
+        "color_sessions": len(color_sessions),
+        "camera_profiles": len(camera_profiles),
+        "memory": memory_manager.stats(),
+        "websocket_available": websocket_enabled,
         "torch_available": TORCH_AVAILABLE,
-        "cuda_available": TORCH_AVAILABLE and torch.cuda.is_available() if TORCH_AVAILABLE else False,
-    }), 200
+        "cuda_available": device == "cuda",
+    }), 503 if failed else 200
+
+
+@app.route("/ready", methods=["GET"])
+def ready() -> Any:
+    """Readiness check: 200 once the model is loaded and warmed up, 503 until then"""
+    return jsonify({
+        "ready": model_loader.ready,
+        **model_loader.status(),
+        "startup": startup_timeline.as_dict(),
+    }), 200 if model_loader.ready else 503
 
 
 @app.route("/detect", methods=["POST"])
 def detect() -> Any:
     """Detection endpoint with caching and optimization"""
-    start_time = time.time()
-    
+    timings = g.timings
+
     if "image" not in request.files:
         return jsonify({"error": "Missing file field 'image'"}), 400
 
@@ -316,76 +632,263 @@ def detect() -> Any:
     if not file_storage.filename:
         return jsonify({"error": "Empty filename"}), 400
 
-    image_bytes = file_storage.read()
-    
+    with timings.stage("read"):
+        image_bytes = file_storage.read()
+    try:
+        camera = request_camera()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        return respond(detect_image(image_bytes, camera, client_key(), timings))
+    except OSError as e:
+        return invalid_image("detect", e)
+
+
+def detect_image(image_bytes: bytes, camera: CameraProfile, client_id: str, timings: Timings) -> Dict[str, Any]:
+    """
+    /detect result for one encoded image: from the result cache, from a
+    near-identical recent frame of ``client_id``, or from the model.
+
+    Raises:
+        OSError: The image can't be read
+        PoolFullError: Every inference worker is busy
+    """
     # Check cache first
-    cached_result = image_cache.get(image_bytes)
-    if cached_result:
+    with timings.stage("hash"):
+        cache_key = camera_cache_key(image_cache.key(image_bytes), camera)
+    with timings.stage("cache"):
+        cached_result = image_cache.get(cache_key)
+    if cached_result is not None:
         cached_result['cached'] = True
-        cached_result['processing_time'] = time.time() - start_time
-        return jsonify(cached_result), 200
-    
-    try:
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    except Exception as e:
-        return jsonify({"error": f"Invalid image: {str(e)}"}), 400
+        cached_result['decode_time'] = 0.0
+        cached_result['processing_time'] = timings.elapsed()
+        return cached_result
+
+    # With worker processes the frame is only decoded here for the
+    # perceptual hash, at a fraction of its size
+    frame = None
+    if inference_pool is None or perceptual_cache is not None:
+        try:
+            with timings.stage("decode"):
+                frame = decode_image(image_bytes, DECODE_MIN_SIZE if inference_pool is None else PERCEPTUAL_DECODE_SIZE)
+        except OSError:
+            raise
+        except Exception as e:
+            raise OSError(str(e)) from e
+
+    # Reuse detections from a near-identical recent frame of the same client
+    with timed(timings if perceptual_cache is not None else None, "hash"):
+        phash = perceptual_cache.hash(frame.image) if perceptual_cache is not None else None
+    if phash is not None:
+        with timings.stage("cache"):
+            near_hit = perceptual_cache.get(client_id, phash, frame.original_size)
+        if near_hit is not None:
+            # Reuse the boxes but re-classify colors on this frame: a signal
+            # change is too small to move the hash, but must be reported.
+            boxes, hash_distance = near_hit
+            if inference_pool is not None:
+                detections, = run_in_pool(timings, describe_task, image_bytes, boxes, DECODE_MIN_SIZE, camera)
+            else:
+                detections = describe_detections(frame.image, boxes, frame.scale, timings, camera)
+            return {
+                "count": len(detections),
+                "detections": detections,
+                "processing_time": timings.elapsed(),
+                "decode_time": timings.stages.get("decode", 0.0),
+                "cached": False,
+                "perceptual_hit": True,
+                "perceptual_distance": hash_distance,
+            }
 
     # Lower confidence to 0.15 to ensure we don't miss smaller objects
-    results = yolo_service.detect(image, conf=0.15)
-
-    detections: List[Dict[str, Any]] = []
-    for result in results:
-        if result.boxes is None:
-            continue
-
-        for coords, conf, cls_id in zip(result.boxes.xyxy.tolist(), 
-                                        result.boxes.conf.tolist(), 
-                                        result.boxes.cls.tolist()):
-            class_name = yolo_service.model_names.get(int(cls_id), str(cls_id))
-            if class_name != "traffic light":
-                continue
-
-            x1, y1, x2, y2 = map(float, coords)
-            box = {"x1": x1, "y1": y1, "x2": x2, "y2": y2}
-            
-            # Analyze color using the dataset
-            color = analyze_traffic_light_color(image, box, color_db)
-            
-            # Estimate distance
-            distance = calculate_distance(box)
-            
-            detections.append({
-                "box": box,
-                "confidence": float(conf),
-                "class_id": int(cls_id),
-                "class_name": class_name,
-                "color": color,
-                "distance": distance,
-            })
-
-    processing_time = time.time() - start_time
-    
+    if inference_pool is not None:
+        boxes, detections = run_in_pool(timings, detect_task, image_bytes, 0.15, DECODE_MIN_SIZE, camera)
+    else:
+        with timings.stage("inference"):
+            boxes = detect_traffic_lights(frame.image, conf=0.15)
+        detections = describe_detections(frame.image, boxes, frame.scale, timings, camera)
+
     result = {
         "count": len(detections),
         "detections": detections,
-        "processing_time": processing_time,
+        "processing_time": timings.elapsed(),
+        "decode_time": timings.stages.get("decode", 0.0),
         "cached": False,
+        "perceptual_hit": False,
     }
-    
+
     # Cache the result
-    image_cache.set(image_bytes, result)
-    
-    # Cleanup memory
-    yolo_service.cleanup_memory()
-    
-    return jsonify(result), 200
+    with timings.stage("cache"):
+        image_cache.set(cache_key, result)
+        if phash is not None:
+            perceptual_cache.set(client_id, phash, boxes, frame.original_size)
+
+    return result
+
+
+def read_batch_uploads() -> List[Tuple[str, bytes]]:
+    """(name, bytes) per image of a /detect-batch request: multipart files, or a tar/zip archive."""
+    kind = archive_kind(mimetype=request.mimetype)
+    if kind is not None:
+        return read_archive(request.stream, kind, DETECT_BATCH_MAX_IMAGES,
+                            DETECT_BATCH_MAX_IMAGE_BYTES, DETECT_BATCH_MAX_BYTES)
+
+    uploads: List[Tuple[str, bytes]] = []
+    total_bytes = 0
+    for field, file_storage in request.files.items(multi=True):
+        remaining = DETECT_BATCH_MAX_BYTES - total_bytes
+        kind = archive_kind(file_storage.filename, file_storage.mimetype)
+        if kind is not None:
+            items = read_archive(file_storage.stream, kind, DETECT_BATCH_MAX_IMAGES - len(uploads),
+                                 DETECT_BATCH_MAX_IMAGE_BYTES, remaining)
+        else:
+            if len(uploads) >= DETECT_BATCH_MAX_IMAGES:
+                raise BatchTooLargeError(f"more than {DETECT_BATCH_MAX_IMAGES} images in request")
+            name = file_storage.filename or field
+            items = [(name, read_image(file_storage.stream, name, DETECT_BATCH_MAX_IMAGE_BYTES, remaining))]
+        uploads.extend(items)
+        total_bytes += sum(len(data) for _, data in items)
+    return uploads
+
+
+def run_batch_chunks(chunks: List[List[Tuple[int, str, bytes]]], timings: Timings,
+                     camera: CameraProfile) -> Iterator[Tuple[List[Tuple[int, str, bytes]], List[Dict[str, Any]]]]:
+    """Run (index, cache key, bytes) chunks through the model, yielding each chunk with its results."""
+    if inference_pool is None:
+        for chunk in chunks:
+            yield chunk, detect_encoded_batch(
+                yolo_service, [data for _, _, data in chunk], 0.15, DECODE_MIN_SIZE,
+                adaptive=YOLO_ADAPTIVE_OPTIONS, executor=decode_executor, timings=timings, camera=camera,
+                tiled=YOLO_TILED_OPTIONS)
+        return
+
+    # Keep up to one chunk per worker in flight. If other requests hold the
+    # rest of the pool's queue, wait for our own chunks before submitting more.
+    waiting = deque(chunks)
+    in_flight: deque = deque()
+    while waiting or in_flight:
+        while waiting and len(in_flight) < inference_pool.workers:
+            try:
+                future = inference_pool.submit(
+                    detect_batch_task, [data for _, _, data in waiting[0]], 0.15, DECODE_MIN_SIZE, camera)
+            except PoolFullError:
+                if not in_flight:
+                    raise
+                break
+            in_flight.append((waiting.popleft(), future))
+        chunk, future = in_flight.popleft()
+        results, stages = future.result()
+        timings.merge(stages)
+        yield chunk, results
+
+
+def detect_uploads(uploads: List[Tuple[str, bytes]], timings: Timings,
+                   camera: CameraProfile) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(index, /detect-style result) for each upload, cache hits first, then as chunks finish."""
+    pending: List[Tuple[int, str, bytes]] = []
+    for index, (_, image_bytes) in enumerate(uploads):
+        with timings.stage("hash"):
+            cache_key = camera_cache_key(image_cache.key(image_bytes), camera)
+        with timings.stage("cache"):
+            cached_result = image_cache.get(cache_key)
+        if cached_result is not None:
+            cached_result["cached"] = True
+            yield index, cached_result
+        else:
+            pending.append((index, cache_key, image_bytes))
+
+    chunk_size = max(1, DETECT_BATCH_CHUNK_SIZE)
+    if inference_pool is not None:
+        # Small batches are split so every worker gets a share
+        chunk_size = min(chunk_size, math.ceil(len(pending) / inference_pool.workers) or 1)
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    for chunk, results in run_batch_chunks(chunks, timings, camera):
+        for (index, cache_key, _), result in zip(chunk, results):
+            if "error" not in result:
+                result.update(cached=False, perceptual_hit=False, processing_time=timings.elapsed())
+                with timings.stage("cache"):
+                    image_cache.set(cache_key, result)
+            yield index, result
+
+
+@app.route("/detect-batch", methods=["POST"])
+def detect_batch() -> Any:
+    """
+    Detection for many images in one request.
+
+    Send the images as multipart file fields, or one tar/zip archive as a
+    file field or as the request body. Results come back in upload order;
+    with ?stream=1 they are sent as newline-delimited JSON, one line per
+    image as soon as it is done, followed by a summary line.
+    """
+    timings = g.timings
+    try:
+        with timings.stage("read"):
+            uploads = read_batch_uploads()
+        camera = request_camera()
+    except BatchTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not uploads:
+        return jsonify({"error": "No images: send multipart files or a tar/zip archive"}), 400
+
+    def entry(index: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {"index": index, "filename": uploads[index][0], **result}
+
+    if request.args.get("stream") == "1":
+        # Streamed work happens after the view returns, so it is timed and
+        # recorded separately from the request itself
+        stream_timings = Timings()
+
+        def generate() -> Iterator[str]:
+            errors = 0
+            for index, result in detect_uploads(uploads, stream_timings, camera):
+                errors += "error" in result
+                yield json.dumps(entry(index, result)) + "\n"
+            observe_stages("detect_batch", stream_timings)
+            yield json.dumps({"done": True, "count": len(uploads), "errors": errors,
+                              "processing_time": timings.elapsed()}) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(uploads)
+    for index, result in detect_uploads(uploads, timings, camera):
+        results[index] = entry(index, result)
+    return respond({
+        "count": len(results),
+        "errors": sum("error" in r for r in results),
+        "results": results,
+        "processing_time": timings.elapsed(),
+    })
+
+
+def color_entry(rgb: Tuple[int, int, int], index: int) -> Dict[str, Any]:
+    red, green, blue = rgb
+    return {
+        "color_name": color_db.names[index] if index >= 0 else "Unknown",
+        "rgb": {"r": red, "g": green, "b": blue},
+        "hex": f"#{red:02x}{green:02x}{blue:02x}",
+    }
 
 
 @app.route("/detect-color", methods=["POST"])
 def detect_color() -> Any:
-    """General color detection endpoint for live color detection"""
-    start_time = time.time()
-    
+    """
+    General color detection endpoint for live color detection
+
+    By default the center of the frame is averaged. ``rois`` (JSON list of
+    [x1, y1, x2, y2]) and/or ``points`` (JSON list of [x, y], sampled over a
+    square of half-side ``radius``) select regions instead, in pixels or,
+    with ``coords=relative``, fractions of the image; each region then gets
+    its mean color and its ``k`` (default 3) dominant colors. ``k`` also
+    adds dominant colors to the center sample. With ``signal=1`` each region
+    is also read as a traffic light housing framed by the client, giving
+    the lit section's color and the section scores as for /detect.
+    """
+    timings = g.timings
+
     if "image" not in request.files:
         return jsonify({"error": "Missing file field 'image'"}), 400
 
@@ -393,64 +896,385 @@ def detect_color() -> Any:
     if not file_storage.filename:
         return jsonify({"error": "Empty filename"}), 400
 
-    image_bytes = file_storage.read()
-    
+    metric = request.values.get("metric", DEFAULT_COLOR_METRIC)
+    if metric not in COLOR_METRICS:
+        return jsonify({"error": f"Invalid metric '{metric}'. Use one of: {', '.join(COLOR_METRICS)}"}), 400
+
+    rois, points = request.values.get("rois"), request.values.get("points")
+    sample_regions = bool(rois or points)
+    signal = request.values.get("signal") == "1"
     try:
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-    except Exception as e:
-        return jsonify({"error": f"Invalid image: {str(e)}"}), 400
+        k = min(MAX_DOMINANT, max(0, int(request.values.get("k", "3" if sample_regions else "0"))))
+        radius = float(request.values["radius"]) if request.values.get("radius") else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid sampling options: {str(e)}"}), 400
+
+    with timings.stage("read"):
+        image_bytes = file_storage.read()
 
     # Get center region for color detection
-    width, height = image.size
-    center_x, center_y = width // 2, height // 2
-    sample_size = min(width, height) // 10  # 10% of image size
-    
-    x1 = max(0, center_x - sample_size)
-    y1 = max(0, center_y - sample_size)
-    x2 = min(width, center_x + sample_size)
-    y2 = min(height, center_y + sample_size)
-    
-    # Extract center region
-    center_region = image.crop((x1, y1, x2, y2))
-    
-    # Convert to numpy array and calculate average color
-    img_array = np.array(center_region)
-    avg_color = img_array.mean(axis=(0, 1)).astype(int)
-    r, g, b = int(avg_color[0]), int(avg_color[1]), int(avg_color[2])
-    
-    # Find nearest color from database
-    if color_db:
-        min_distance = float('inf')
-        color_name = 'Unknown'
-        
-        for color in color_db:
-            distance = math.sqrt(
-                (r - color['r'])**2 + 
-                (g - color['g'])**2 + 
-                (b - color['b'])**2
-            )
-            if distance < min_distance:
-                min_distance = distance
-                color_name = color['name']
+    def center_square(width: int, height: int) -> Tuple[int, int, int, int]:
+        center_x, center_y = width // 2, height // 2
+        sample_size = min(width, height) // 10  # 10% of image size
+        return (max(0, center_x - sample_size), max(0, center_y - sample_size),
+                min(width, center_x + sample_size), min(height, center_y + sample_size))
+
+    kinds: List[str] = []
+
+    def requested_regions(width: int, height: int) -> List[Tuple[int, int, int, int]]:
+        if not sample_regions:
+            return [center_square(width, height)]
+        regions = parse_regions(rois, points, width, height,
+                                relative=request.values.get("coords") == "relative", radius=radius)
+        kinds.extend(kind for kind, _ in regions)
+        return [box for _, box in regions]
+
+    # Decode only as much resolution as the regions need: a few pixels for
+    # a mean, enough for clustering when dominant colors are asked for
+    min_side = (SAMPLE_MAX_SIDE if k else COLOR_SAMPLE_MIN_PX) if DECODE_DRAFT else None
+    try:
+        with timings.stage("decode"):
+            crops, boxes, decode_time = decode_regions(image_bytes, requested_regions, min_side)
+    except OSError as e:
+        return invalid_image("detect_color", e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with timings.stage("color"):
+        summaries = [summarize_region(crop, k) for crop in crops]
+        means = [tuple(int(v) for v in mean.astype(int)) for mean, _, _ in summaries]
+        dominant = [[tuple(int(v) for v in c) for c in np.rint(centers)] for _, centers, _ in summaries]
+        signals = classify_lights([np.asarray(crop) for crop in crops]) if signal else None
+
+        # Name every mean and dominant color in one lookup
+        samples = [rgb for mean, colors in zip(means, dominant) for rgb in (mean, *colors)]
+        indices = iter(color_db.nearest_batch(samples, metric)[0].tolist())
+        regions = []
+        for kind, box, mean, colors, (_, _, shares) in zip(kinds or ["center"], boxes, means, dominant, summaries):
+            region = color_entry(mean, next(indices))
+            if k:
+                region["dominant"] = [{**color_entry(rgb, next(indices)), "share": round(float(share), 4)}
+                                      for rgb, share in zip(colors, shares)]
+            if signals is not None:
+                region["signal"], region["signal_scores"] = signals[len(regions)]
+            if sample_regions:
+                x1, y1, x2, y2 = box
+                region = {"kind": kind, "box": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}, **region}
+            regions.append(region)
+
+    if sample_regions:
+        result = {"count": len(regions), "regions": regions}
     else:
-        color_name = "Unknown"
+        result = regions[0]
+    result.update({
+        "metric": metric,
+        "processing_time": timings.elapsed(),
+        "decode_time": decode_time,
+    })
 
-    
-    processing_time = time.time() - start_time
-    
-    result = {
-        "color_name": color_name,
-        "rgb": {"r": r, "g": g, "b": b},
-        "hex": f"#{r:02x}{g:02x}{b:02x}",
-        "processing_time": processing_time
-    }
-    
-    return jsonify(result), 200
+    return respond(result)
+
+
+@app.route("/color-stream", methods=["POST"])
+def create_color_stream() -> Any:
+    """Start a live color session. Samples are then posted to /color-stream/<session_id>/sample."""
+    options = request.get_json(silent=True) or request.values
+    metric = options.get("metric", DEFAULT_COLOR_METRIC)
+    if metric not in COLOR_METRICS:
+        return jsonify({"error": f"Invalid metric '{metric}'. Use one of: {', '.join(COLOR_METRICS)}"}), 400
+    try:
+        session = color_sessions.create(
+            alpha=float(options.get("alpha", COLOR_STREAM_ALPHA)),
+            history=int(options.get("history", COLOR_STREAM_HISTORY)),
+            metric=metric,
+            lookup_tolerance=float(options.get("lookup_tolerance", 2.0)),
+            device_id=request.headers.get("X-Device-Id") or options.get("device_id"),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid color stream options: {str(e)}"}), 400
+    return jsonify(session.info()), 201
+
+
+@app.route("/color-stream/<session_id>/sample", methods=["POST"])
+def color_stream_sample(session_id: str) -> Any:
+    """
+    Add one sample to a live color session: an ``image`` file holding just
+    the watched region (averaged whole), its mean as ``rgb`` ([r, g, b]),
+    or ``delta``, the change of that mean since the previous sample.
+
+    Answers 204 with no body while the reported color is unchanged, and
+    the new color (as /detect-color) when it changes.
+    """
+    session = color_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired color stream session"}), 404
+    timings = g.timings
+    options = request.get_json(silent=True) or request.values
+
+    sample = delta = None
+    try:
+        if "image" in request.files:
+            with timings.stage("read"):
+                image_bytes = request.files["image"].read()
+            with timings.stage("decode"):
+                # A mean needs only a few pixels; the draft decode skips the rest
+                frame = decode_image(image_bytes, COLOR_SAMPLE_MIN_PX if DECODE_DRAFT else None)
+                sample = np.asarray(frame.image).reshape(-1, 3).mean(axis=0)
+        elif options.get("rgb") is not None:
+            sample = parse_rgb(options["rgb"])
+        elif options.get("delta") is not None:
+            delta = parse_rgb(options["delta"], "delta", signed=True)
+        else:
+            return jsonify({"error": "Send an 'image' file, 'rgb' or 'delta'"}), 400
+    except OSError as e:
+        return invalid_image("color_stream_sample", e)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def lookup(rgb: Tuple[int, int, int]) -> Tuple[int, str]:
+        index = int(color_db.nearest_batch([rgb], session.metric)[0][0])
+        return index, color_db.names[index] if index >= 0 else "Unknown"
+
+    try:
+        with timings.stage("color"):
+            change = session.update(sample, lookup, delta)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if change is None:
+        return "", 204
+
+    result = color_entry(change["rgb"], change["index"])
+    result.update({
+        "previous": change["previous"],
+        "sample_index": change["sample_index"],
+        "metric": session.metric,
+        "processing_time": timings.elapsed(),
+    })
+    return respond(result)
+
+
+@app.route("/color-stream/<session_id>", methods=["GET"])
+def get_color_stream(session_id: str) -> Any:
+    """Current color and counters of a live color session"""
+    session = color_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired color stream session"}), 404
+    return jsonify(session.info()), 200
+
+
+@app.route("/color-stream/<session_id>", methods=["DELETE"])
+def close_color_stream(session_id: str) -> Any:
+    """End a live color session"""
+    if not color_sessions.remove(session_id):
+        return jsonify({"error": "Unknown or expired color stream session"}), 404
+    return jsonify({"session_id": session_id, "closed": True}), 200
+
+
+def process_stream_frame(session, image_bytes: bytes, timings: Timings,
+                         camera: CameraProfile) -> Dict[str, Any]:
+    """Run one frame of a stream session and attach distances for ``camera``."""
+    with timings.stage("decode"):
+        frame = decode_image(image_bytes, DECODE_MIN_SIZE)
+
+    def detect_boxes(image: Image.Image) -> List[Dict[str, Any]]:
+        with timings.stage("inference"):
+            if inference_pool is not None:
+                # The worker decodes the original bytes itself, at the same size
+                return inference_pool.run(boxes_task, image_bytes, 0.15, DECODE_MIN_SIZE)
+            return detect_traffic_lights(image, conf=0.15)
+
+    def classify(image: Image.Image, boxes: List[Dict[str, Any]]) -> List[str]:
+        with timings.stage("color"):
+            return [c for c, _ in analyze_traffic_light_colors(image, boxes)]
+
+    result = session.process(frame.image, detect=detect_boxes, classify=classify)
+    with timings.stage("distance"):
+        result["detections"] = scale_boxes(result["detections"], frame.scale)
+        for detection in result["detections"]:
+            detection["distance"] = calculate_distance(detection["box"], frame.original_size, camera)
+    result["count"] = len(result["detections"])
+    result["session_id"] = session.session_id
+    result["processing_time"] = timings.elapsed()
+    result["decode_time"] = frame.decode_s
+    return result
+
+
+@app.route("/camera-profile/<device_id>", methods=["PUT"])
+def put_camera_profile(device_id: str) -> Any:
+    """Store a device's camera profile; its requests then only need to send the device ID"""
+    data = request.get_json(silent=True)
+    try:
+        camera = CameraProfile.parse(data if data is not None else request.values.get("camera", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    camera_profiles.set(device_id, camera)
+    return jsonify({"device_id": device_id, "camera": camera.as_dict()}), 200
+
+
+@app.route("/camera-profile/<device_id>", methods=["GET"])
+def get_camera_profile(device_id: str) -> Any:
+    camera = camera_profiles.get(device_id)
+    if camera is None:
+        return jsonify({"error": "No camera profile for this device"}), 404
+    return jsonify({"device_id": device_id, "camera": camera.as_dict()}), 200
+
+
+@app.route("/camera-profile/<device_id>", methods=["DELETE"])
+def delete_camera_profile(device_id: str) -> Any:
+    if not camera_profiles.remove(device_id):
+        return jsonify({"error": "No camera profile for this device"}), 404
+    return jsonify({"device_id": device_id, "deleted": True}), 200
+
+
+@app.route("/stream", methods=["POST"])
+def create_stream() -> Any:
+    """Start a stream session. Frames are then posted to /stream/<session_id>/frame."""
+    options = request.get_json(silent=True) or request.values
+    try:
+        # Frames use this device's camera profile unless they name another
+        device_id = request.headers.get("X-Device-Id") or options.get("device_id")
+        request_camera(options, device_id)
+        session = stream_sessions.create(
+            detect_every=int(options.get("detect_every", STREAM_DETECT_EVERY)),
+            smoothing_window=int(options.get("smoothing_window", STREAM_SMOOTHING_WINDOW)),
+            device_id=device_id,
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid stream options: {str(e)}"}), 400
+    return jsonify(session.info()), 201
+
+
+@app.route("/stream/<session_id>/frame", methods=["POST"])
+def stream_frame(session_id: str) -> Any:
+    """Process the next frame of a stream session"""
+    session = stream_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired stream session"}), 404
+
+    if "image" not in request.files:
+        return jsonify({"error": "Missing file field 'image'"}), 400
+
+    with g.timings.stage("read"):
+        image_bytes = request.files["image"].read()
+    try:
+        camera = request_camera(device_id=session.device_id)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        result = process_stream_frame(session, image_bytes, g.timings, camera)
+    except OSError as e:
+        return invalid_image("stream_frame", e)
+    return respond(result)
+
+
+@app.route("/stream/<session_id>", methods=["DELETE"])
+def close_stream(session_id: str) -> Any:
+    """End a stream session"""
+    if not stream_sessions.remove(session_id):
+        return jsonify({"error": "Unknown or expired stream session"}), 404
+    return jsonify({"session_id": session_id, "closed": True}), 200
+
+
+if sock is not None:
+    @sock.route("/ws/stream")
+    def stream_websocket(ws) -> None:
+        """WebSocket stream: send encoded frames as binary messages, receive JSON per frame."""
+        session = stream_sessions.create(
+            detect_every=int(request.args.get("detect_every", STREAM_DETECT_EVERY)),
+            smoothing_window=int(request.args.get("smoothing_window", STREAM_SMOOTHING_WINDOW)),
+            device_id=request.headers.get("X-Device-Id") or request.args.get("device_id"),
+        )
+        try:
+            while True:
+                message = ws.receive()
+                if message is None:
+                    break
+                if isinstance(message, str):
+                    continue
+                timings = Timings()
+                status = "200"
+                try:
+                    result = process_stream_frame(session, message, timings, device_camera(session.device_id))
+                    if RESPONSE_TIMINGS:
+                        result["timings"] = timings.as_ms()
+                    with timings.stage("serialize"):
+                        payload = json.dumps(result)
+                except OSError as e:
+                    log.warning("invalid image", endpoint="stream_websocket", error=str(e))
+                    payload, status = json.dumps({"error": f"Invalid image: {str(e)}"}), "400"
+                except PoolFullError:
+                    log.warning("request rejected, inference workers busy", endpoint="stream_websocket")
+                    payload, status = json.dumps({"error": "Server busy, retry later"}), "429"
+                ws.send(payload)
+                observe_stages("stream_websocket", timings)
+                request_seconds.observe(timings.elapsed(), "stream_websocket")
+                requests_total.inc("stream_websocket", status)
+        finally:
+            stream_sessions.remove(session.session_id)
+
+
+def handle_local_request(header: Dict[str, Any], payload: bytearray) -> Tuple[int, Dict[str, Any]]:
+    """
+    Unix socket requests. Ops:
+        ping: {"ready": bool, "state": ...}
+        detect: the /detect result for the payload image; header fields
+            client_id, device_id, camera and timings as in /detect
+    """
+    op = header.get("op")
+    if op == "ping":
+        return 200, {"ready": model_loader.ready, "state": model_loader.state}
+    if op != "detect":
+        return 400, {"error": f"Unknown op {op!r}"}
+
+    endpoint = "local_detect"
+    timings = Timings()
+    try:
+        model_loader.require()
+        device_id = header.get("device_id")
+        if header.get("camera"):
+            camera = CameraProfile.parse(header["camera"])
+            if device_id:
+                camera_profiles.set(device_id, camera)
+        else:
+            camera = device_camera(device_id)
+        result = detect_image(payload, camera, str(header.get("client_id") or device_id or "local"), timings)
+        status = 200
+        if RESPONSE_TIMINGS or header.get("timings"):
+            result["timings"] = timings.as_ms()
+    except ModelNotReadyError:
+        result, status = {"error": "Model is not ready yet, retry later", "state": model_loader.state}, 503
+    except PoolFullError:
+        log.warning("request rejected, inference workers busy", endpoint=endpoint)
+        result, status = {"error": "Server busy, retry later"}, 429
+    except OSError as e:
+        log.warning("invalid image", endpoint=endpoint, error=str(e))
+        result, status = {"error": f"Invalid image: {str(e)}"}, 400
+    except ValueError as e:
+        result, status = {"error": str(e)}, 400
+    observe_stages(endpoint, timings)
+    request_seconds.observe(timings.elapsed(), endpoint)
+    requests_total.inc(endpoint, str(status))
+    return status, result
+
+
+def start_local_transport() -> Optional[LocalTransportServer]:
+    """Serve handle_local_request on LOCAL_SOCKET, if set; the caller closes the server."""
+    if not LOCAL_SOCKET:
+        return None
+    server = LocalTransportServer(LOCAL_SOCKET, handle_local_request,
+                                  max_payload=LOCAL_SOCKET_MAX_BYTES, mode=LOCAL_SOCKET_MODE)
+    server.start()
+    log.info("local transport listening", path=LOCAL_SOCKET)
+    return server
+
+
+startup_timeline.mark("app_loaded")
+model_loader.start()
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "5000"))
-    print(f"Starting YOLO service on port {port}")
-    print(f"Device: {yolo_service.device}")
-    print(f"Color database: {len(color_db)} colors")
+    log.info("starting YOLO service", port=port, colors=len(color_db), startup_s=round(startup_timeline.now(), 3))
+    start_local_transport()
+    startup_timeline.mark("listening")
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,106 @@
+"""
+Inference backends for the YOLO service
+
+The service can run the PyTorch weights directly (``torch``) or an exported
+copy through ONNX Runtime (``onnx``) or OpenVINO (``openvino``), which avoid
+eager-mode overhead on CPU-only nodes. Exports are written next to the .pt
+file on first start and reused afterwards. A ready-made export, such as an
+INT8 model from quantize.py, can be served directly; its backend follows
+from the file name.
+
+ultralytics (and with it torch) is imported on first use, not with this
+module, so the web process can serve before either is loaded.
+"""
+
+import os
+from typing import TYPE_CHECKING, Optional
+
+from logs import get_logger
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+log = get_logger(__name__)
+
+MODEL_BACKENDS = ('torch', 'onnx', 'openvino')
+
+
+def backend_for_model(model_path: str, backend: str = 'torch') -> str:
+    """The backend a model file needs: ``backend`` for .pt weights, otherwise the export's format."""
+    if model_path.endswith('.onnx'):
+        return 'onnx'
+    if model_path.rstrip('/').endswith('_openvino_model'):
+        return 'openvino'
+    return backend
+
+
+def exported_model_path(model_path: str, backend: str) -> str:
+    """Where ultralytics writes the export of ``model_path`` for ``backend``."""
+    stem, _ = os.path.splitext(model_path)
+    if backend == 'onnx':
+        return stem + '.onnx'
+    if backend == 'openvino':
+        return stem + '_openvino_model'
+    return model_path
+
+
+def resolve_model(model_path: str, backend: str = 'torch', imgsz: int = 640) -> str:
+    """
+    Return the path to load for ``backend``, exporting the .pt weights first
+    if no cached export exists yet.
+    """
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"backend must be one of {MODEL_BACKENDS}, got {backend!r}")
+    if backend == 'torch' or not model_path.endswith('.pt'):
+        return model_path
+
+    target = exported_model_path(model_path, backend)
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+
+    log.info("exporting model (one-time)", model=model_path, backend=backend)
+    # dynamic=True keeps the batch dimension free for the micro-batcher
+    exported = YOLO(model_path).export(format=backend, imgsz=imgsz, dynamic=True)
+    return str(exported or target)
+
+
+def set_onnx_threads(model: 'YOLO', model_path: str, threads: int) -> bool:
+    """
+    Rebuild the ONNX Runtime session ultralytics created with an explicit
+    intra-op thread count. The predictor (and its session) only exists after
+    the first inference call, so run this after warm-up.
+    """
+    backend = getattr(getattr(model, 'predictor', None), 'model', None)
+    if backend is None or getattr(backend, 'session', None) is None:
+        return False
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        return False
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    backend.session = ort.InferenceSession(
+        model_path, sess_options=options, providers=backend.session.get_providers())
+    return True
+
+
+def load_model(model_path: str, backend: str = 'torch', imgsz: int = 640,
+               threads: Optional[int] = None) -> 'YOLO':
+    """Load ``model_path`` for ``backend``, exporting it first if needed."""
+    from ultralytics import YOLO
+
+    path = resolve_model(model_path, backend, imgsz)
+    if backend == 'torch':
+        if threads:
+            try:
+                import torch
+                torch.set_num_threads(threads)
+            except ImportError:
+                pass
+        return YOLO(path)
+    return YOLO(path, task='detect')
@@ -0,0 +1,168 @@
+"""
+Micro-batching - coalesce concurrent inference requests into batched calls
+"""
+
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Queue single-item requests and run them through ``run_batch`` together.
+
+    A background thread takes the oldest queued request, then keeps collecting
+    requests with the same options until ``max_batch_size`` is reached or
+    ``max_wait_ms`` has passed since the first one was taken. ``run_batch``
+    receives the list of items plus the shared options and must return one
+    result per item, in order. Each caller gets its own result back through
+    a Future.
+
+    The wait is adaptive: a request that finds nothing else queued while
+    the previous batch held a single item (low load) is dispatched at once,
+    since waiting would only add latency. Under concurrent load, requests
+    queue up while a batch runs and the next one waits to fill.
+    """
+
+    def __init__(self, run_batch: Callable[..., List[Any]], max_batch_size: int = 8,
+                 max_wait_ms: float = 10.0, name: str = 'micro-batcher'):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue: 'queue.Queue[Tuple[Any, Dict, Future]]' = queue.Queue()
+        # Requests pulled off the queue whose options didn't match the batch
+        # being assembled; they start the next batch.
+        self._deferred: deque = deque()
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._items = 0
+        self._max_queue_depth = 0
+        self._last_batch_size = 1
+        self._immediate = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any, **options) -> Future:
+        """Queue one item and return a Future for its result."""
+        future: Future = Future()
+        # Under the lock, so nothing is queued after close() has drained the queue
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('MicroBatcher is closed')
+            self._queue.put((item, options, future))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            with self._lock:
+                self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def run(self, item: Any, timeout: Optional[float] = None, **options) -> Any:
+        """Submit one item and block until its result is ready."""
+        return self.submit(item, **options).result(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the batcher. The batch already running completes; every request
+        still queued fails with RuntimeError, so no caller blocks forever.
+        """
+        with self._lock:
+            self._closed = True
+            self._queue.put(None)
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            histogram = {str(size): count for size, count in sorted(self._batch_sizes.items())}
+            batches = sum(self._batch_sizes.values())
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'queue_depth': self._queue.qsize() + len(self._deferred),
+                'max_queue_depth': self._max_queue_depth,
+                'batches': batches,
+                'items': self._items,
+                'mean_batch_size': round(self._items / batches, 2) if batches else 0.0,
+                'dispatched_without_wait': self._immediate,
+                'batch_size_histogram': histogram,
+            }
+
+    def _next(self, timeout: Optional[float]):
+        if self._deferred:
+            return self._deferred.popleft()
+        return self._queue.get(timeout=timeout)
+
+    def _collect(self) -> List[Tuple[Any, Dict, Future]]:
+        first = self._next(None)
+        if first is None:
+            return []
+        batch = [first]
+        options = first[1]
+        if self._last_batch_size == 1 and not self._deferred and self._queue.empty():
+            with self._lock:
+                self._immediate += 1
+            return batch
+        deadline = time.monotonic() + self.max_wait
+        skipped = []
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._next(remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)
+                break
+            if entry[1] == options:
+                batch.append(entry)
+            else:
+                skipped.append(entry)
+
+        self._deferred.extend(skipped)
+        return batch
+
+    def _fail_pending(self) -> None:
+        pending = list(self._deferred)
+        self._deferred.clear()
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not None:
+                pending.append(entry)
+        for _, _, future in pending:
+            future.set_exception(RuntimeError('MicroBatcher is closed'))
+
+    def _loop(self) -> None:
+        while not self._closed:
+            batch = self._collect()
+            if not batch:
+                continue
+            self._last_batch_size = len(batch)
+
+            items = [entry[0] for entry in batch]
+            futures = [entry[2] for entry in batch]
+            with self._lock:
+                self._batch_sizes[len(batch)] += 1
+                self._items += len(batch)
+
+            try:
+                results = self.run_batch(items, **batch[0][1])
+                if len(results) != len(items):
+                    raise RuntimeError(f'run_batch returned {len(results)} results for {len(items)} items')
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
+        self._fail_pending()
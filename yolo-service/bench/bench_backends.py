@@ -0,0 +1,89 @@
+"""
+Backend benchmark: per-image latency and throughput for torch / onnx / openvino
+
+Exports the model for each backend on first use (cached next to the .pt
+file), warms it up, then times single-image calls and batched calls on
+synthetic frames.
+
+Usage:
+    python bench/bench_backends.py [--model yolov8n.pt] [--backends torch,onnx,openvino]
+                                   [--threads 4] [--runs 30] [--batch 8]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from backends import load_model, resolve_model, set_onnx_threads  # noqa: E402
+
+
+def synthetic_frames(n, size=(640, 480), seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    return [Image.fromarray(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8))
+            for _ in range(n)]
+
+
+def bench_backend(model_path, backend, threads, frames, batch):
+    path = resolve_model(model_path, backend)
+    model = load_model(path, backend, threads=threads)
+    kwargs = dict(verbose=False, conf=0.15, device='cpu')
+
+    start = time.perf_counter()
+    model(frames[0], **kwargs)
+    if backend == 'onnx' and threads:
+        set_onnx_threads(model, path, threads)
+        model(frames[0], **kwargs)
+    warmup = time.perf_counter() - start
+
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        model(frame, **kwargs)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        model(frames[i:i + batch], **kwargs)
+    throughput = len(frames) / (time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        'warmup_s': warmup,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        'throughput': throughput,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default='yolov8n.pt')
+    parser.add_argument('--backends', default='torch,onnx,openvino')
+    parser.add_argument('--threads', type=int, default=0, help='intra-op threads (0 = library default)')
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--batch', type=int, default=8)
+    args = parser.parse_args()
+
+    frames = synthetic_frames(args.runs)
+    print(f"{'backend':<10}{'warm-up (s)':>12}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+          f"{f'batch={args.batch} (img/s)':>20}")
+    for backend in args.backends.split(','):
+        try:
+            r = bench_backend(args.model, backend, args.threads or None, frames, args.batch)
+        except Exception as e:
+            print(f"{backend:<10}  unavailable: {e}")
+            continue
+        print(f"{backend:<10}{r['warmup_s']:>12.2f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['throughput']:>20.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark: vectorized ColorIndex vs. the original per-row Python loop
+
+Usage:
+    python bench/bench_color_index.py [--samples 5000] [--csv colors.csv]
+                                      [--lut-bits 6] [--lut-cache-dir .cache]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from color_index import ColorIndex  # noqa: E402
+
+
+def legacy_nearest(rgb, color_db):
+    """The loop previously used by /detect-color and find_nearest_color."""
+    min_distance = float('inf')
+    nearest = None
+    for color in color_db:
+        distance = math.sqrt(
+            (rgb[0] - color['r'])**2 +
+            (rgb[1] - color['g'])**2 +
+            (rgb[2] - color['b'])**2
+        )
+        if distance < min_distance:
+            min_distance = distance
+            nearest = color
+    return nearest
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+def main():
+    default_csv = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'colors.csv')
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=default_csv)
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--lut-bits', type=int, default=0,
+                        help='also time the dense lookup table (5, 6 or 8 bits)')
+    parser.add_argument('--lut-cache-dir', default=None)
+    args = parser.parse_args()
+
+    index = ColorIndex.from_csv(args.csv)
+    records = list(index)
+    rng = np.random.default_rng(args.seed)
+    samples = rng.integers(0, 256, size=(args.samples, 3))
+    sample_tuples = [tuple(int(v) for v in s) for s in samples]
+
+    print(f"Palette: {len(index)} colors, {args.samples} random samples\n")
+
+    legacy, t_legacy = _timed(lambda: [legacy_nearest(s, records)['name'] for s in sample_tuples])
+    single, t_single = _timed(lambda: [index.names[index.nearest(s)[0]] for s in sample_tuples])
+    (batch_idx, _), t_batch = _timed(index.nearest_batch, samples)
+    batch = [index.names[i] for i in batch_idx]
+
+    if legacy != single or legacy != batch:
+        print("ERROR: vectorized results differ from the legacy loop")
+        sys.exit(1)
+
+    rows = [('legacy loop', t_legacy), ('ColorIndex.nearest', t_single),
+            ('ColorIndex.nearest_batch', t_batch)]
+
+    if args.lut_bits:
+        _, t_build = _timed(index.load_lookup_table, args.lut_bits, args.lut_cache_dir)
+        print(f"Lookup table ({args.lut_bits}-bit) ready in {t_build:.2f}s")
+        _, t_lut_single = _timed(
+            lambda: [index.names[index.nearest(s)[0]] for s in sample_tuples])
+        (lut_idx, _), t_lut_batch = _timed(index.nearest_batch, samples)
+        agreement = np.mean(lut_idx == batch_idx) * 100
+        print(f"Lookup table agreement with exact search: {agreement:.2f}%\n")
+        rows += [('lut nearest', t_lut_single), ('lut nearest_batch', t_lut_batch)]
+
+    per = lambda t: t / args.samples * 1e6  # noqa: E731
+    print(f"{'method':<26}{'total (ms)':>12}{'per query (us)':>16}{'speedup':>10}")
+    for name, t in rows:
+        print(f"{name:<26}{t * 1e3:>12.2f}{per(t):>16.2f}{t_legacy / t:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Traffic light scoring kernel benchmark: boolean masks vs the section LUT
+
+Times only the scoring step of traffic light classification, summing the
+brightness of matching pixels per section, on one section-major HSV strip
+of housings (as classify_lights() builds it), for several strip sizes:
+
+    masks     per section, the original comparisons on H, S and V combined
+              with & and |, then the matching pixels copied out with
+              section[mask] and summed
+    hue bits  the previous batched pass: HUE_BITS plus a per-pixel section
+              array, boolean temporaries, np.where and one segmented sum
+    lut       traffic_color.section_totals(): SECTION_LUT and VALUE_WEIGHT
+              lookups into one uint8 buffer and one segmented sum
+
+Peak KB is the largest amount of temporary memory numpy allocated during
+one call (tracemalloc). All three must return identical totals.
+
+Usage:
+    python bench/bench_color_kernel.py [--pixels 10000,100000,1000000] [--runs 30]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from traffic_color import HUE_BITS, _pack_sections, section_totals  # noqa: E402
+
+
+def housings_strip(pixels, seed=0):
+    """Section-major HSV strip of 8-40 px wide housings totalling about ``pixels``, and section starts."""
+    rng = np.random.default_rng(seed)
+    housings, total = [], 0
+    while total < pixels:
+        w = int(rng.integers(8, 41))
+        h = 3 * w + int(rng.integers(0, 3))
+        housings.append(rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8))
+        total += h * w
+    hsv, starts, areas = _pack_sections(housings)
+    return hsv, starts, areas
+
+
+def masks(hsv, starts, areas):
+    totals = np.zeros(starts.shape, dtype=np.int64)
+    for j in range(len(starts)):
+        for k in range(3):
+            section = hsv[starts[j, k]:starts[j, k] + areas[j, k]]
+            h, s, v = section[:, 0], section[:, 1], section[:, 2]
+            if k == 0:
+                mask = ((h < 25) | (h > 230)) & (s > 50) & (v > 60)
+            elif k == 1:
+                mask = (h >= 20) & (h <= 60) & (s > 50) & (v > 60)
+            else:
+                mask = (h >= 40) & (h <= 130) & (s > 50) & (v > 60)
+            totals[j, k] = np.sum(section[mask][:, 2], dtype=np.int64)
+    return totals
+
+
+def hue_bits(hsv, starts, areas):
+    h, s, v = hsv[:, 0], hsv[:, 1], hsv[:, 2]
+    # The strip is section-major, so the bits come in three runs
+    section_bits = np.repeat(np.repeat(np.array([1, 2, 4], dtype=np.uint8), len(starts)), areas.T.ravel())
+    hit = (HUE_BITS[h] & section_bits).astype(bool) & (s > 50) & (v > 60)
+    weighted = np.where(hit, v, 0)
+    return np.add.reduceat(weighted, starts.T.ravel(), dtype=np.int64).reshape(3, -1).T
+
+
+def lut(hsv, starts, areas):
+    return section_totals(hsv, starts)
+
+
+def time_call(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def peak_kb(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pixels', default='10000,100000,1000000')
+    parser.add_argument('--runs', type=int, default=30)
+    args = parser.parse_args()
+
+    kernels = (('masks', masks), ('hue bits', hue_bits), ('lut', lut))
+    print(f"{'pixels':>9}{'lights':>8}{'kernel':>10}{'ms':>10}{'peak KB':>10}{'speedup':>9}  match")
+    for n in (int(p) for p in args.pixels.split(',')):
+        hsv, starts, areas = housings_strip(n, seed=n)
+        expected = masks(hsv, starts, areas)
+        baseline = None
+        for name, kernel in kernels:
+            fn = lambda kernel=kernel: kernel(hsv, starts, areas)  # noqa: E731
+            match = 'yes' if np.array_equal(fn(), expected) else 'NO'
+            ms = time_call(fn, args.runs)
+            baseline = baseline or ms
+            print(f"{len(hsv):>9}{len(starts):>8}{name:>10}{ms:>10.3f}{peak_kb(fn):>10.0f}"
+                  f"{baseline / ms:>8.1f}x  {match}")
+
+
+if __name__ == '__main__':
+    main()
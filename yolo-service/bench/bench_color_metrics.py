@@ -0,0 +1,64 @@
+"""
+Accuracy-vs-latency benchmark for the ColorIndex distance metrics
+
+CIEDE2000 is treated as the perceptual reference: for every metric the
+benchmark reports how often it picks the same palette entry, and the mean
+CIEDE2000 error between each sample and the color it was matched to.
+
+Usage:
+    python bench/bench_color_metrics.py [--samples 5000] [--csv colors.csv]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from color_index import COLOR_METRICS, ColorIndex, ciede2000, rgb_to_lab  # noqa: E402
+
+
+def main():
+    default_csv = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'colors.csv')
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--csv', default=default_csv)
+    parser.add_argument('--samples', type=int, default=5000)
+    parser.add_argument('--single', type=int, default=200,
+                        help='number of samples timed through nearest() one at a time')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    index = ColorIndex.from_csv(args.csv)
+    rng = np.random.default_rng(args.seed)
+    samples = rng.integers(0, 256, size=(args.samples, 3))
+    sample_lab = rgb_to_lab(samples)
+
+    results = {}
+    for metric in COLOR_METRICS:
+        start = time.perf_counter()
+        indices, _ = index.nearest_batch(samples, metric)
+        t_batch = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for s in samples[:args.single]:
+            index.nearest(s, metric)
+        t_single = (time.perf_counter() - start) / max(1, min(args.single, len(samples)))
+
+        results[metric] = (indices, t_batch, t_single)
+
+    reference = results['ciede2000'][0]
+    print(f"Palette: {len(index)} colors, {args.samples} random samples\n")
+    print(f"{'metric':<12}{'batch (ms)':>12}{'per sample (us)':>17}{'single (us)':>13}"
+          f"{'agree w/ 2000':>15}{'mean dE2000':>13}")
+    for metric, (indices, t_batch, t_single) in results.items():
+        agreement = np.mean(indices == reference) * 100
+        error = ciede2000(sample_lab, index.lab[indices]).mean()
+        print(f"{metric:<12}{t_batch * 1e3:>12.2f}{t_batch / args.samples * 1e6:>17.2f}"
+              f"{t_single * 1e6:>13.1f}{agreement:>14.1f}%{error:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
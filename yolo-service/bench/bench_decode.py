@@ -0,0 +1,97 @@
+"""
+Decode benchmark: full-resolution vs draft-mode JPEG decoding
+
+For each upload size, times the original full decode against decode_image()
+at the detector's input size, and the /detect-color path (full decode, crop
+the center square, average) against decode_region(). Also reports how far
+the center mean color moves with reduced-resolution decoding.
+
+Usage:
+    python bench/bench_decode.py [--sizes 640x480,1280x720,1920x1080,3840x2160]
+                                 [--imgsz 640] [--runs 30] [--image photo.jpg]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from decode import as_array, decode_image, decode_region  # noqa: E402
+
+
+def synthetic_photo(size, seed=0):
+    """Smooth structure plus sensor-like noise, so the JPEG isn't trivially small."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    coarse = Image.fromarray(rng.integers(0, 256, size=(height // 32 + 1, width // 32 + 1, 3), dtype=np.uint8))
+    base = np.asarray(coarse.resize((width, height), Image.BICUBIC)).astype(np.int16)
+    noisy = np.clip(base + rng.integers(-12, 13, size=base.shape), 0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(noisy).save(buf, 'JPEG', quality=90)
+    return buf.getvalue()
+
+
+def center_square(width, height):
+    center_x, center_y = width // 2, height // 2
+    sample_size = min(width, height) // 10
+    return (max(0, center_x - sample_size), max(0, center_y - sample_size),
+            min(width, center_x + sample_size), min(height, center_y + sample_size))
+
+
+def legacy_center_mean(data):
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    return np.array(image.crop(center_square(*image.size))).mean(axis=(0, 1))
+
+
+def region_center_mean(data):
+    crop, _, _ = decode_region(data, center_square)
+    return as_array(crop).mean(axis=(0, 1))
+
+
+def time_call(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='640x480,1280x720,1920x1080,3840x2160')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--runs', type=int, default=30)
+    parser.add_argument('--image', help='JPEG to resize to each size instead of a synthetic one')
+    args = parser.parse_args()
+
+    print(f"{'upload':>10}{'full (ms)':>11}{'draft (ms)':>12}{'decoded':>10}"
+          f"{'color full':>12}{'color region':>14}{'mean diff':>11}")
+    for size in args.sizes.split(','):
+        width, height = (int(v) for v in size.split('x'))
+        if args.image:
+            buf = io.BytesIO()
+            Image.open(args.image).convert('RGB').resize((width, height)).save(buf, 'JPEG', quality=90)
+            data = buf.getvalue()
+        else:
+            data = synthetic_photo((width, height))
+
+        t_full = time_call(lambda: Image.open(io.BytesIO(data)).convert('RGB'), args.runs)
+        t_draft = time_call(lambda: decode_image(data, args.imgsz), args.runs)
+        decoded = decode_image(data, args.imgsz).image.size
+        t_color_full = time_call(lambda: legacy_center_mean(data), args.runs)
+        t_color_region = time_call(lambda: region_center_mean(data), args.runs)
+        diff = np.abs(legacy_center_mean(data) - region_center_mean(data)).max()
+        print(f"{size:>10}{t_full:>11.2f}{t_draft:>12.2f}{'x'.join(map(str, decoded)):>10}"
+              f"{t_color_full:>12.2f}{t_color_region:>14.2f}{diff:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
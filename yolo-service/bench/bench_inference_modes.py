@@ -0,0 +1,94 @@
+"""
+Inference mode benchmark: latency and traffic-light recall
+
+Compares the original configuration (all 80 COCO classes at 640, filtered in
+Python afterwards) against class-filtered inference at several input sizes
+and the adaptive low-resolution + ROI mode. Recall is measured against the
+traffic lights found by the original configuration (IoU >= 0.5).
+
+Usage:
+    python bench/bench_inference_modes.py --frames dashcam_frames/ [--model yolov8n.pt]
+                                          [--backend torch] [--sizes 640,480,320]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from detector import OptimizedYOLOService  # noqa: E402
+from geometry import box_iou  # noqa: E402
+
+
+def load_frames(frames_dir, limit):
+    if not frames_dir:
+        rng = np.random.default_rng(0)
+        return [Image.fromarray(rng.integers(0, 256, size=(720, 1280, 3), dtype=np.uint8))
+                for _ in range(limit)]
+    names = sorted(f for f in os.listdir(frames_dir)
+                   if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))[:limit]
+    return [Image.open(os.path.join(frames_dir, n)).convert('RGB') for n in names]
+
+
+def recall(reference, found):
+    total = sum(len(r) for r in reference)
+    if not total:
+        return None
+    matched = 0
+    for ref_boxes, boxes in zip(reference, found):
+        for ref in ref_boxes:
+            if any(box_iou(ref['box'], b['box']) >= 0.5 for b in boxes):
+                matched += 1
+    return matched / total
+
+
+def run_mode(frames, detect):
+    latencies, found = [], []
+    detect(frames[0])  # warm-up for this input size
+    for frame in frames:
+        start = time.perf_counter()
+        found.append(detect(frame))
+        latencies.append(time.perf_counter() - start)
+    return found, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', help='directory of frames containing traffic lights')
+    parser.add_argument('--model', default='yolov8n.pt')
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--sizes', default='640,480,320')
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.limit)
+    unfiltered = OptimizedYOLOService(args.model, backend=args.backend, class_filter=False)
+    filtered = OptimizedYOLOService(args.model, backend=args.backend, class_filter=True)
+
+    modes = [('all classes @640', lambda f: unfiltered.traffic_light_boxes(unfiltered.detect(f, imgsz=640)))]
+    for size in (int(s) for s in args.sizes.split(',')):
+        modes.append((f'filtered @{size}',
+                      lambda f, size=size: filtered.traffic_light_boxes(filtered.detect(f, imgsz=size))))
+    modes.append(('adaptive 320+roi', lambda f: filtered.detect_adaptive(f)))
+
+    reference = None
+    print(f"\n{len(frames)} frames\n")
+    print(f"{'mode':<20}{'p50 (ms)':>10}{'mean (ms)':>11}{'lights':>8}{'recall':>9}")
+    for name, detect in modes:
+        found, latencies = run_mode(frames, detect)
+        if reference is None:
+            reference = found
+        r = recall(reference, found)
+        print(f"{name:<20}{statistics.median(latencies) * 1000:>10.1f}"
+              f"{statistics.mean(latencies) * 1000:>11.1f}{sum(len(f) for f in found):>8}"
+              f"{(f'{r * 100:.1f}%' if r is not None else 'n/a'):>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Perceptual cache benchmark: hit rate and accuracy on frame sequences
+
+Replays a sequence of frames through PerceptualCache for several Hamming
+thresholds and reports how often YOLO would have been skipped, and how often
+the reused boxes were actually right. /detect re-classifies colors on every
+frame, so only box positions are judged.
+
+With --frames DIR a recorded sequence is replayed (files sorted by name) and
+--model runs ultralytics on every frame to judge reused detections (same
+number of traffic lights, each matched at IoU >= 0.5). Without --frames a
+synthetic dashcam-like sequence with known ground truth is generated.
+
+Usage:
+    python bench/bench_perceptual_cache.py [--thresholds 0,2,4,6,8] [--hash-size 16]
+    python bench/bench_perceptual_cache.py --frames recorded/ --model yolov8n.pt
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cache import PerceptualCache, dhash  # noqa: E402
+from geometry import box_iou  # noqa: E402
+
+LIGHT_COLORS = {'red': (255, 40, 30), 'yellow': (255, 200, 0), 'green': (40, 255, 90)}
+
+
+def synthetic_sequence(n_frames, change_every, seed=0, size=(640, 480)):
+    """Yield (image, (light x, color)) pairs; the state changes every ``change_every`` frames."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    background = rng.integers(40, 200, size=(height // 16, width // 16, 3), dtype=np.uint8)
+    background = np.asarray(Image.fromarray(background).resize(size, Image.BILINEAR))
+    colors = list(LIGHT_COLORS)
+
+    state = None
+    for i in range(n_frames):
+        if i % change_every == 0:
+            x = int(rng.integers(50, width - 100))
+            state = (x, colors[(i // change_every) % len(colors)])
+        x, color = state
+        jitter = int(rng.integers(-1, 2))
+        noise = rng.normal(0, 3, size=background.shape)
+        frame = np.clip(background + noise, 0, 255).astype(np.uint8)
+        image = Image.fromarray(frame)
+        draw = ImageDraw.Draw(image)
+        draw.rectangle([x + jitter, 80, x + jitter + 40, 200], fill=(25, 25, 25))
+        slot = colors.index(color)
+        cy = 100 + slot * 40
+        draw.ellipse([x + jitter + 8, cy - 12, x + jitter + 32, cy + 12], fill=LIGHT_COLORS[color])
+        yield image, state
+
+
+def recorded_sequence(frames_dir, model):
+    names = sorted(f for f in os.listdir(frames_dir)
+                   if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))
+    for name in names:
+        image = Image.open(os.path.join(frames_dir, name)).convert('RGB')
+        yield image, detect_lights(model, image) if model is not None else None
+
+
+def detect_lights(model, image):
+    boxes = []
+    for result in model(image, verbose=False, conf=0.15):
+        if result.boxes is None:
+            continue
+        for coords, cls_id in zip(result.boxes.xyxy.tolist(), result.boxes.cls.tolist()):
+            if model.names.get(int(cls_id)) == 'traffic light':
+                x1, y1, x2, y2 = coords
+                boxes.append({'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
+    return boxes
+
+
+def same_detections(a, b):
+    if len(a) != len(b):
+        return False
+    return all(max((box_iou(x, y) for y in b), default=0.0) >= 0.5 for x in a)
+
+
+def replay(frames, threshold, hash_size):
+    cache = PerceptualCache(threshold=threshold, history=4, ttl_s=float('inf'))
+    hits = correct = judged = 0
+    hash_time = 0.0
+    for image, truth in frames:
+        start = time.perf_counter()
+        phash = dhash(image, hash_size)
+        hash_time += time.perf_counter() - start
+
+        hit = cache.get('bench', phash)
+        if hit is None:
+            cache.set('bench', phash, {'truth': truth})
+            continue
+        hits += 1
+        reused = hit[0]['truth']
+        if truth is None:
+            continue
+        judged += 1
+        if isinstance(truth, list):
+            correct += same_detections(reused, truth)
+        else:
+            correct += reused[0] == truth[0]
+    return hits, correct, judged, hash_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', help='directory of recorded frames')
+    parser.add_argument('--model', help='YOLO weights used to judge reused detections')
+    parser.add_argument('--n-frames', type=int, default=300)
+    parser.add_argument('--change-every', type=int, default=30)
+    parser.add_argument('--thresholds', default='0,2,4,6,8,12')
+    parser.add_argument('--hash-size', type=int, default=16,
+                        help='dHash grid size; the hash has hash_size^2 bits')
+    args = parser.parse_args()
+
+    if args.frames:
+        model = None
+        if args.model:
+            from ultralytics import YOLO
+            model = YOLO(args.model)
+        frames = list(recorded_sequence(args.frames, model))
+    else:
+        frames = list(synthetic_sequence(args.n_frames, args.change_every))
+
+    print(f"{len(frames)} frames, {args.hash_size ** 2}-bit dHash\n")
+    print(f"{'threshold':>10}{'hit rate':>11}{'accuracy':>11}{'hash (us/frame)':>17}")
+    for threshold in (int(t) for t in args.thresholds.split(',')):
+        hits, correct, judged, hash_time = replay(frames, threshold, args.hash_size)
+        accuracy = f"{correct / judged * 100:.1f}%" if judged else 'n/a'
+        print(f"{threshold:>10}{hits / len(frames) * 100:>10.1f}%{accuracy:>11}"
+              f"{hash_time / len(frames) * 1e6:>17.1f}")
+
+
+if __name__ == '__main__':
+    main()
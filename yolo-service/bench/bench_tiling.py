@@ -0,0 +1,165 @@
+"""
+Tiled inference benchmark: latency and recall against single-pass detection
+
+Runs every frame through OptimizedYOLOService once as a single full-frame
+pass and once per tiling configuration (grid x coverage), and reports the
+median latency per frame plus recall and precision of traffic lights
+against ground truth, matched at IoU >= --iou.
+
+Ground truth comes from YOLO-format label files next to the frames
+(frame.jpg + frame.txt with "class cx cy w h" rows, normalized; rows of
+--label-class are traffic lights), or, without --frames, from synthetic
+high-resolution scenes with small, distant signals drawn at known
+positions. Synthetic housings are crude, so recall on them is only a
+relative measure; use labelled dashcam frames for real numbers.
+
+--stub-model measures the tiling overhead only: the stub's boxes don't
+depend on the pixels, so recall is not reported, and its single pass skips
+the PIL-to-array conversion ultralytics does, which tiling does up front.
+
+Usage:
+    python bench/bench_tiling.py --model yolov8n.pt [--grids 2x1,3x2,4x2] [--tops 1.0,0.5]
+    python bench/bench_tiling.py --model yolov8n.pt --frames labelled/ --label-class 9
+    python bench/bench_tiling.py --stub-model --size 3840x2160
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import stub_model  # noqa: E402
+
+_LIT = ((235, 40, 35), (240, 200, 40), (40, 220, 110))
+
+
+def synthetic_frames(count, size, lights=8, seed=0):
+    """Yield (image, boxes): road scenes with ``lights`` signals 10-60 px tall in the upper half."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    for _ in range(count):
+        image = stub_model.synthetic_scene(size, seed=int(rng.integers(1 << 31)))
+        # Clear the stub's large lights; only the small ones below are ground truth
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((0, 0, width, height // 2), fill=(120, 150, 190))
+        boxes = []
+        for _ in range(lights):
+            h = float(rng.uniform(10, 60))
+            w = h * 0.38
+            x1 = float(rng.uniform(0, width - w))
+            y1 = float(rng.uniform(0, height / 2 - h))
+            box = {'x1': x1, 'y1': y1, 'x2': x1 + w, 'y2': y1 + h}
+            draw.rectangle((x1, y1, x1 + w, y1 + h), fill=(25, 25, 25))
+            k = int(rng.integers(3))
+            section = h / 3
+            draw.ellipse((x1 + 1, y1 + k * section + 1, x1 + w - 1, y1 + (k + 1) * section - 1), fill=_LIT[k])
+            boxes.append(box)
+        yield image, boxes
+
+
+def labelled_frames(frames_dir, label_class):
+    names = sorted(f for f in os.listdir(frames_dir)
+                   if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))
+    if not names:
+        raise SystemExit(f"no images in {frames_dir}")
+    for name in names:
+        image = Image.open(os.path.join(frames_dir, name)).convert('RGB')
+        width, height = image.size
+        boxes = []
+        label_path = os.path.join(frames_dir, os.path.splitext(name)[0] + '.txt')
+        if os.path.exists(label_path):
+            with open(label_path) as f:
+                for row in f:
+                    fields = row.split()
+                    if len(fields) < 5 or int(fields[0]) != label_class:
+                        continue
+                    cx, cy, w, h = (float(v) for v in fields[1:5])
+                    boxes.append({'x1': (cx - w / 2) * width, 'y1': (cy - h / 2) * height,
+                                  'x2': (cx + w / 2) * width, 'y2': (cy + h / 2) * height})
+        yield image, boxes
+
+
+def score(predicted, truth, iou_threshold):
+    """Labelled lights matched by a prediction, taking predictions by confidence."""
+    from geometry import box_iou
+    unmatched = list(truth)
+    hits = 0
+    for detection in sorted(predicted, key=lambda d: -d['confidence']):
+        best = max(unmatched, key=lambda t: box_iou(detection['box'], t), default=None)
+        if best is not None and box_iou(detection['box'], best) >= iou_threshold:
+            unmatched.remove(best)
+            hits += 1
+    return hits
+
+
+def run(detect, frames, iou_threshold, warmup=2):
+    for image, _ in frames[:warmup]:
+        detect(image)
+    times, found, truth_total, predicted_total = [], 0, 0, 0
+    for image, truth in frames:
+        start = time.perf_counter()
+        boxes = detect(image)
+        times.append(time.perf_counter() - start)
+        found += score(boxes, truth, iou_threshold)
+        truth_total += len(truth)
+        predicted_total += len(boxes)
+    recall = found / truth_total if truth_total else float('nan')
+    precision = found / predicted_total if predicted_total else float('nan')
+    return statistics.median(times) * 1000, recall, precision, predicted_total / len(frames)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default='yolov8n.pt')
+    parser.add_argument('--stub-model', action='store_true', help='latency only, no weights needed')
+    parser.add_argument('--frames', help='directory of frames with YOLO-format .txt labels')
+    parser.add_argument('--label-class', type=int, default=9, help='traffic-light class in the labels (COCO: 9)')
+    parser.add_argument('--size', default='3840x2160', help='synthetic frame size')
+    parser.add_argument('--n-frames', type=int, default=10)
+    parser.add_argument('--grids', default='2x1,3x2,4x2')
+    parser.add_argument('--tops', default='1.0,0.5')
+    parser.add_argument('--overlap', type=float, default=0.2)
+    parser.add_argument('--no-full-frame', action='store_true', help='tiles only, without the full-frame pass')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.15)
+    parser.add_argument('--iou', type=float, default=0.3, help='IoU for a detection to match a labelled light')
+    args = parser.parse_args()
+
+    if args.stub_model:
+        stub_model.install()
+    from detector import OptimizedYOLOService
+
+    service = OptimizedYOLOService(model_path=args.model, imgsz=args.imgsz)
+    if args.frames:
+        frames = list(labelled_frames(args.frames, args.label_class))
+    else:
+        size = tuple(int(v) for v in args.size.lower().split('x'))
+        frames = list(synthetic_frames(args.n_frames, size))
+
+    configs = [('single pass', lambda image: service.traffic_light_boxes(service.detect(image, conf=args.conf)))]
+    for grid in args.grids.split(','):
+        tiles = tuple(int(v) for v in grid.lower().split('x'))
+        for top in (float(t) for t in args.tops.split(',')):
+            options = dict(tiles=tiles, overlap=args.overlap, top=top, full_frame=not args.no_full_frame)
+            configs.append((f"tiled {grid} top={top:g}",
+                            lambda image, options=options: service.detect_tiled(image, conf=args.conf, **options)))
+
+    print(f"{len(frames)} frames of {frames[0][0].width}x{frames[0][0].height}, "
+          f"{sum(len(t) for _, t in frames)} labelled lights, imgsz {args.imgsz}\n")
+    print(f"{'mode':<24}{'median ms':>11}{'recall':>9}{'precision':>11}{'boxes/frame':>13}")
+    for name, detect in configs:
+        median, recall, precision, per_frame = run(detect, frames, args.iou)
+        if args.stub_model:
+            print(f"{name:<24}{median:>11.1f}{'n/a':>9}{'n/a':>11}{per_frame:>13.1f}")
+        else:
+            print(f"{name:<24}{median:>11.1f}{recall:>9.1%}{precision:>11.1%}{per_frame:>13.1f}")
+
+
+if __name__ == '__main__':
+    main()
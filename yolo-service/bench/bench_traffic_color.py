@@ -0,0 +1,135 @@
+"""
+Traffic light color benchmark: per-box classification vs one batched pass
+
+Draws synthetic traffic lights (dark housing, one lit bulb, some unlit
+frames for the brightness fallback) on a noisy 1280x720 frame and times the
+original per-box classifier against analyze_traffic_light_colors() for 1-50
+boxes per frame, both from a PIL image and from an already-decoded array
+(the speedup column). All must return identical colors.
+
+Usage:
+    python bench/bench_traffic_color.py [--boxes 1,5,10,25,50] [--runs 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from traffic_color import analyze_traffic_light_colors  # noqa: E402
+
+BULB_COLORS = [(255, 40, 30), (255, 200, 0), (40, 255, 90)]
+
+
+def legacy_analyze_traffic_light_color(image, box):
+    """The original per-box implementation: crop, convert and mask each box."""
+    x1, y1, x2, y2 = int(box['x1']), int(box['y1']), int(box['x2']), int(box['y2'])
+    width, height = image.size
+    x1, y1 = max(0, x1), max(0, y1)
+    x2, y2 = min(width, x2), min(height, y2)
+    if x2 <= x1 or y2 <= y1:
+        return 'unknown'
+
+    region = image.crop((x1, y1, x2, y2))
+    img_array = np.array(region.convert('HSV'))
+    section_height = img_array.shape[0] // 3
+    sections = [
+        ("red", img_array[0:section_height, :]),
+        ("yellow", img_array[section_height:2 * section_height, :]),
+        ("green", img_array[2 * section_height:, :]),
+    ]
+    max_score = 0
+    detected_color = 'unknown'
+    for color_name, section in sections:
+        if section.size == 0:
+            continue
+        h, s, v = section[:, :, 0], section[:, :, 1], section[:, :, 2]
+        if color_name == 'red':
+            mask = ((h < 25) | (h > 230)) & (s > 50) & (v > 60)
+        elif color_name == 'yellow':
+            mask = (h >= 20) & (h <= 60) & (s > 50) & (v > 60)
+        else:
+            mask = (h >= 40) & (h <= 130) & (s > 50) & (v > 60)
+        matching_pixels = section[mask]
+        if matching_pixels.size > 0:
+            normalized_score = np.sum(matching_pixels[:, 2]) / (section.shape[0] * section.shape[1])
+            if normalized_score > max_score and normalized_score > 5:
+                max_score = normalized_score
+                detected_color = color_name
+
+    if detected_color == 'unknown':
+        gray_array = np.array(region.convert('L'))
+        scores = []
+        for i in range(3):
+            sec = gray_array[i * section_height:(i + 1) * section_height, :]
+            scores.append(np.max(sec) if sec.size > 0 else 0)
+        best = int(np.argmax(scores))
+        if scores[best] > 150:
+            return ('red', 'yellow', 'green')[best]
+    return detected_color
+
+
+def synthetic_frame(n_boxes, size=(1280, 720), seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    frame = rng.integers(0, 120, size=(height, width, 3), dtype=np.uint8)
+    boxes = []
+    for i in range(n_boxes):
+        w = int(rng.integers(8, 40))
+        h = 3 * w + int(rng.integers(0, 3))
+        x1 = int(rng.integers(0, width - w))
+        y1 = int(rng.integers(0, height // 2))
+        frame[y1:y1 + h, x1:x1 + w] = 20
+        lit = int(rng.integers(0, 3))
+        sh = h // 3
+        r = max(2, w // 3)
+        cy, cx = y1 + lit * sh + sh // 2, x1 + w // 2
+        yy, xx = np.ogrid[:height, :width]
+        bulb = (yy - cy) ** 2 + (xx - cx) ** 2 <= r * r
+        # Every fifth light is white so the brightness fallback is exercised
+        frame[bulb] = (240, 240, 240) if i % 5 == 4 else BULB_COLORS[lit]
+        # Jitter the box edges like a real detector would
+        boxes.append({'x1': x1 + float(rng.normal(0, 1)), 'y1': y1 + float(rng.normal(0, 1)),
+                      'x2': x1 + w + float(rng.normal(0, 1)), 'y2': y1 + h + float(rng.normal(0, 1))})
+    return Image.fromarray(frame), boxes
+
+
+def time_call(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--boxes', default='1,5,10,25,50')
+    parser.add_argument('--runs', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'boxes':>6}{'per-box (ms)':>14}{'batched (ms)':>14}{'+array (ms)':>13}{'speedup':>9}  match")
+    for n in (int(b) for b in args.boxes.split(',')):
+        frame, boxes = synthetic_frame(n, seed=n)
+        legacy = [legacy_analyze_traffic_light_color(frame, b) for b in boxes]
+        batched = [c for c, _ in analyze_traffic_light_colors(frame, boxes)]
+        array = np.asarray(frame)
+        with_array = [c for c, _ in analyze_traffic_light_colors(frame, boxes, frame=array)]
+        match = 'yes' if legacy == batched == with_array else 'NO'
+
+        t_legacy = time_call(lambda: [legacy_analyze_traffic_light_color(frame, b) for b in boxes], args.runs)
+        t_batched = time_call(lambda: analyze_traffic_light_colors(frame, boxes), args.runs)
+        t_array = time_call(lambda: analyze_traffic_light_colors(frame, boxes, frame=array), args.runs)
+        print(f"{n:>6}{t_legacy:>14.3f}{t_batched:>14.3f}{t_array:>13.3f}"
+              f"{t_legacy / t_array:>8.1f}x  {match}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Transport benchmark: /detect over HTTP multipart vs the Unix socket
+
+Serves the app on 127.0.0.1 (Werkzeug's threaded server with keep-alive)
+and on a Unix socket (local_transport.py), then sends the same JPEG frames
+through both from one client each: a keep-alive http.client connection
+with a hand-built multipart body, as the back end's form-data does, and
+LocalTransportClient.
+
+Two request kinds per frame size:
+    cache hit   the same bytes every time, so the round trip is almost all
+                transport: framing, parsing, copies and JSON
+    miss        a nonce after the JPEG end marker defeats the cache, so
+                decoding and the (stub) model are included too
+
+Usage:
+    python bench/bench_transport.py [--runs 200] [--sizes 640x480,1920x1080]
+"""
+
+import argparse
+import http.client
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import stub_model  # noqa: E402
+from regression import import_service  # noqa: E402
+
+BOUNDARY = 'vision-aid-bench-boundary'
+
+
+def multipart(image):
+    head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="frame.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode()
+    return head + image + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def start_http(app):
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def http_detect(connection):
+    def send(image):
+        body = multipart(image)
+        connection.request('POST', '/detect', body=body, headers={
+            'Content-Type': f'multipart/form-data; boundary={BOUNDARY}', 'X-Client-Id': 'bench'})
+        response = connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"HTTP /detect returned {response.status}: {data[:200]!r}")
+    return send
+
+
+def socket_detect(client):
+    def send(image):
+        status, body = client.request({'op': 'detect', 'client_id': 'bench'}, image)
+        if status != 200:
+            raise RuntimeError(f"socket detect returned {status}: {body}")
+    return send
+
+
+def measure(send, images, runs, warmup=5):
+    for image in itertools.islice(images, warmup):
+        send(image)
+    times = []
+    for image in itertools.islice(images, runs):
+        start = time.perf_counter()
+        send(image)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return statistics.median(times) * 1000, times[min(len(times) - 1, int(len(times) * 0.95))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--sizes', default='640x480,1920x1080')
+    args = parser.parse_args()
+
+    app = import_service(stub=True)
+    from local_transport import LocalTransportClient, LocalTransportServer
+
+    http_server = start_http(app.app)
+    socket_path = os.path.join(tempfile.mkdtemp(prefix='yolo-'), 'yolo.sock')
+    socket_server = LocalTransportServer(socket_path, app.handle_local_request)
+    socket_server.start()
+
+    transports = {
+        'http multipart': http_detect(http.client.HTTPConnection('127.0.0.1', http_server.server_port)),
+        'unix socket': socket_detect(LocalTransportClient(socket_path)),
+    }
+    nonce = itertools.count()
+
+    print(f"{'frame':<11}{'request':<11}{'transport':<16}{'median':>9}{'p95':>9}{'speedup':>9}  (ms)")
+    for size in args.sizes.split(','):
+        width, height = (int(v) for v in size.lower().split('x'))
+        jpeg = stub_model.encode_jpeg(stub_model.synthetic_scene((width, height), seed=0))
+        kinds = {
+            'cache hit': lambda: itertools.repeat(jpeg),
+            # Trailing bytes after the JPEG end marker change the cache key but not the pixels
+            'miss': lambda: (jpeg + next(nonce).to_bytes(8, 'little') for _ in itertools.count()),
+        }
+        for kind, images in kinds.items():
+            baseline = None
+            for name, send in transports.items():
+                median, p95 = measure(send, images(), args.runs)
+                baseline = baseline or median
+                print(f"{size:<11}{kind:<11}{name:<16}{median:>9.3f}{p95:>9.3f}{baseline / median:>8.2f}x")
+        print(f"{'':<11}({len(jpeg) / 1024:.0f} KiB JPEG)")
+
+    socket_server.close()
+    http_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Quantized model evaluation: traffic-light mAP, color agreement and latency
+
+Runs a reference model (FP32, default yolov8n.pt) and a candidate (e.g. an
+INT8 export from quantize.py) through OptimizedYOLOService, exactly as the
+service loads them, on the same frames and reports per model:
+
+    mAP50, mAP50-95   traffic-light class, COCO-style 101-point AP
+    median, p95       detection latency per frame
+and between them:
+    detections        reference lights (at the serving confidence) the
+                      candidate also finds, at IoU >= 0.5
+    colors            of those, the share classified the same color
+
+Ground truth is read from YOLO-format labels next to the frames (frame.jpg
++ frame.txt, "class cx cy w h" normalized, rows of --label-class). Frames
+without labels are scored against the reference model's detections
+instead, so mAP then measures agreement with FP32 rather than accuracy.
+
+The run fails (exit 1) when the candidate's mAP50 is more than
+--max-map-drop below the reference's or its color agreement is under
+--min-color-agreement, so it can gate a deployment.
+
+Usage:
+    python bench/eval_quantized.py --candidate yolov8n_int8.onnx --frames labelled/
+    python bench/eval_quantized.py --reference yolov8n.pt --candidate yolov8n_int8_openvino_model --frames f/
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import stub_model  # noqa: E402
+from bench_tiling import labelled_frames  # noqa: E402
+
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+RECALL_POINTS = np.linspace(0, 1, 101)
+
+
+def average_precision(predictions, truths, iou_threshold):
+    """
+    COCO-style AP of one class.
+
+    Args:
+        predictions: (frame index, confidence, box) for every detection
+        truths: Ground-truth boxes per frame
+    """
+    from geometry import box_iou
+    total = sum(len(t) for t in truths)
+    if total == 0:
+        return float('nan')
+    matched = [set() for _ in truths]
+    hits = []
+    for frame, _, box in sorted(predictions, key=lambda p: -p[1]):
+        ious = [(box_iou(box, t), i) for i, t in enumerate(truths[frame]) if i not in matched[frame]]
+        best_iou, best = max(ious, default=(0.0, None))
+        if best is not None and best_iou >= iou_threshold:
+            matched[frame].add(best)
+            hits.append(1)
+        else:
+            hits.append(0)
+    if not hits:
+        return 0.0
+    tp = np.cumsum(hits)
+    recall = tp / total
+    precision = tp / np.arange(1, len(hits) + 1)
+    # Precision envelope, sampled at fixed recall levels
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    index = np.searchsorted(recall, RECALL_POINTS, side='left')
+    return float(np.mean([precision[i] if i < len(precision) else 0.0 for i in index]))
+
+
+def evaluate(service, frames, conf):
+    """Detections (conf >= ``conf``) and seconds per frame."""
+    detections, times = [], []
+    for image, _ in frames:
+        start = time.perf_counter()
+        boxes = service.traffic_light_boxes(service.detect(image, conf=conf))
+        times.append(time.perf_counter() - start)
+        detections.append(boxes)
+    return detections, times
+
+
+def compare_colors(frames, reference, candidate, serve_conf):
+    """(reference lights found by the candidate, of those with the same color, reference lights)."""
+    from geometry import box_iou
+    from traffic_color import analyze_traffic_light_colors
+    found = agree = total = 0
+    for (image, _), ref, cand in zip(frames, reference, candidate):
+        ref = [d for d in ref if d['confidence'] >= serve_conf]
+        cand = [d for d in cand if d['confidence'] >= serve_conf]
+        total += len(ref)
+        pairs = []
+        for r in ref:
+            best = max(cand, key=lambda c: box_iou(r['box'], c['box']), default=None)
+            if best is not None and box_iou(r['box'], best['box']) >= 0.5:
+                pairs.append((r, best))
+        if not pairs:
+            continue
+        found += len(pairs)
+        colors = analyze_traffic_light_colors(image, [d['box'] for pair in pairs for d in pair])
+        agree += sum(colors[2 * i][0] == colors[2 * i + 1][0] for i in range(len(pairs)))
+    return found, agree, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reference', default='yolov8n.pt')
+    parser.add_argument('--candidate', required=True, help='model to check, e.g. yolov8n_int8.onnx')
+    parser.add_argument('--frames', required=True, help='directory of frames, optionally with YOLO-format labels')
+    parser.add_argument('--label-class', type=int, default=9, help='traffic-light class in the labels (COCO: 9)')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.001, help='detection threshold for mAP')
+    parser.add_argument('--serve-conf', type=float, default=0.15,
+                        help='confidence the service reports at, for detection and color agreement')
+    parser.add_argument('--max-map-drop', type=float, default=0.02, help='allowed mAP50 loss vs the reference')
+    parser.add_argument('--min-color-agreement', type=float, default=0.95)
+    parser.add_argument('--stub-model', action='store_true', help='check the script itself without weights')
+    args = parser.parse_args()
+
+    if args.stub_model:
+        stub_model.install()
+    from backends import backend_for_model
+    from detector import OptimizedYOLOService
+
+    frames = list(labelled_frames(args.frames, args.label_class))
+    labelled = any(truth for _, truth in frames)
+
+    results = {}
+    for role, path in (('reference', args.reference), ('candidate', args.candidate)):
+        service = OptimizedYOLOService(model_path=path, backend=backend_for_model(path), imgsz=args.imgsz)
+        service.warmup(runs=2, sizes=[frames[0][0].size])
+        results[role] = evaluate(service, frames, args.conf)
+
+    if labelled:
+        truths = [truth for _, truth in frames]
+        source = 'labels'
+    else:
+        truths = [[d['box'] for d in boxes if d['confidence'] >= args.serve_conf]
+                  for boxes in results['reference'][0]]
+        source = 'reference detections (no labels found)'
+
+    print(f"{len(frames)} frames, {sum(len(t) for t in truths)} traffic lights from {source}\n")
+    print(f"{'model':<36}{'mAP50':>8}{'mAP50-95':>10}{'median ms':>11}{'p95 ms':>9}{'speedup':>9}")
+    summary = {}
+    for role, path in (('reference', args.reference), ('candidate', args.candidate)):
+        detections, times = results[role]
+        predictions = [(i, d['confidence'], d['box']) for i, boxes in enumerate(detections) for d in boxes]
+        aps = [average_precision(predictions, truths, t) for t in IOU_THRESHOLDS]
+        times = sorted(times)
+        median = statistics.median(times) * 1000
+        summary[role] = {'map50': aps[0], 'median': median}
+        speedup = summary['reference']['median'] / median
+        print(f"{os.path.basename(path.rstrip('/')):<36}{aps[0]:>8.3f}{float(np.mean(aps)):>10.3f}"
+              f"{median:>11.1f}{times[min(len(times) - 1, int(len(times) * 0.95))] * 1000:>9.1f}{speedup:>8.2f}x")
+
+    found, agree, total = compare_colors(frames, results['reference'][0], results['candidate'][0], args.serve_conf)
+    color_agreement = agree / found if found else 1.0
+    print(f"\ndetections: {found}/{total} reference lights also found by the candidate")
+    print(f"colors:     {agree}/{found} classified the same ({color_agreement:.1%})")
+
+    failures = []
+    drop = summary['reference']['map50'] - summary['candidate']['map50']
+    if drop > args.max_map_drop:
+        failures.append(f"mAP50 dropped by {drop:.3f} (allowed {args.max_map_drop})")
+    if color_agreement < args.min_color_agreement:
+        failures.append(f"color agreement {color_agreement:.1%} < {args.min_color_agreement:.0%}")
+    if failures:
+        print("\nFAILED: " + "; ".join(failures))
+        sys.exit(1)
+    print("\npassed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Load test: /detect latency percentiles against the number of inference workers
+
+For each worker count, starts `python serve.py` with YOLO_WORKERS set (and
+the result caches disabled, so every request runs inference), drives it with
+a fixed number of concurrent clients for a fixed time, and reports
+throughput, p50/p95/p99 latency of successful requests and the share of
+requests turned away with 429. With --url, a running server is tested once
+instead; disable its perceptual cache for meaningful numbers.
+
+Usage:
+    python bench/load_test.py [--workers 1,2,4] [--concurrency 16] [--duration 20]
+                              [--image frame.jpg] [--backend torch]
+    python bench/load_test.py --url http://localhost:5000 [--concurrency 16]
+"""
+
+import argparse
+import http.client
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BOUNDARY = 'load-test-boundary'
+
+
+def multipart(image_bytes):
+    head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="frame.jpg"\r\n'
+            f'Content-Type: image/jpeg\r\n\r\n').encode()
+    return head + image_bytes + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def synthetic_jpeg(size=(640, 480), seed=0):
+    rng = np.random.default_rng(seed)
+    width, height = size
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(url, timeout_s):
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/health', timeout=2) as r:
+                return json.loads(r.read())
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"server at {url} not ready after {timeout_s}s")
+
+
+def client(url, image_bytes, stop_at, latencies, statuses, lock):
+    parts = urllib.parse.urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    headers = {'Content-Type': f'multipart/form-data; boundary={BOUNDARY}'}
+    n = 0
+    while time.time() < stop_at:
+        # Bytes after the JPEG end marker are ignored by decoders but make
+        # every upload unique, so the exact-bytes cache never answers
+        payload = multipart(image_bytes + f'{threading.get_ident()}-{n}'.encode())
+        n += 1
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/detect', payload, headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+            status = 0
+        elapsed = time.perf_counter() - start
+        with lock:
+            statuses.append(status)
+            if status == 200:
+                latencies.append(elapsed)
+        if status == 429:
+            time.sleep(0.05)
+    conn.close()
+
+
+def run_load(url, image_bytes, concurrency, duration):
+    latencies, statuses, lock = [], [], threading.Lock()
+    stop_at = time.time() + duration
+    threads = [threading.Thread(target=client, args=(url, image_bytes, stop_at, latencies, statuses, lock))
+               for _ in range(concurrency)]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else float('nan')
+
+    return {
+        'requests': len(statuses),
+        'ok_per_s': len(latencies) / elapsed,
+        'p50_ms': pct(0.50),
+        'p95_ms': pct(0.95),
+        'p99_ms': pct(0.99),
+        'rejected': statuses.count(429) / max(1, len(statuses)),
+        'errors': sum(1 for s in statuses if s not in (200, 429)),
+    }
+
+
+def start_server(workers, args):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), YOLO_WORKERS=str(workers), YOLO_BACKEND=args.backend,
+               CACHE_MAX_BYTES='0', PERCEPTUAL_CACHE_THRESHOLD='-1')
+    if args.worker_queue is not None:
+        env['YOLO_WORKER_QUEUE'] = str(args.worker_queue)
+    proc = subprocess.Popen([sys.executable, 'serve.py'], cwd=SERVICE_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        wait_ready(url, args.startup_timeout)
+    except TimeoutError:
+        proc.kill()
+        raise
+    return proc, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--url', help='test a running server instead of starting one per worker count')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--image', help='JPEG to send (default: synthetic 640x480)')
+    parser.add_argument('--backend', default='torch')
+    parser.add_argument('--worker-queue', type=int, help='YOLO_WORKER_QUEUE for started servers')
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            image_bytes = f.read()
+    else:
+        image_bytes = synthetic_jpeg()
+
+    print(f"{args.concurrency} concurrent clients, {args.duration:.0f}s per run\n")
+    print(f"{'workers':>8}{'requests':>10}{'ok/s':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+          f"{'p99 (ms)':>10}{'429':>7}{'errors':>8}")
+    runs = [('-', None)] if args.url else [(w, int(w)) for w in args.workers.split(',')]
+    for label, workers in runs:
+        proc = None
+        url = args.url
+        if workers is not None:
+            proc, url = start_server(workers, args)
+        try:
+            r = run_load(url, image_bytes, args.concurrency, args.duration)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+        print(f"{label:>8}{r['requests']:>10}{r['ok_per_s']:>8.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['rejected'] * 100:>6.1f}%{r['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""
+Offline benchmark and regression suite for the detection and color pipelines
+
+Times palette loading, the color matcher, traffic-light color analysis,
+the result cache, image decoding and end-to-end /detect, /detect-color
+and /color-stream requests through the Flask test client. Needs no
+network or GPU: frames are synthetic (or read from --frames), and
+--stub-model swaps the YOLO model for a stand-in that returns fixed
+boxes, so everything except the forward pass is measured on any CPU.
+
+Results are written as JSON. With --compare, each case's median is checked
+against a baseline file and the run fails (exit 1) when any case is slower
+by more than --threshold (and by more than --min-delta-ms, so sub-0.1 ms
+cases don't fail on timer noise).
+
+Usage:
+    python bench/regression.py --stub-model --output baseline.json
+    python bench/regression.py --stub-model --compare baseline.json [--threshold 0.25]
+    python bench/regression.py --current new.json --compare baseline.json
+"""
+
+import argparse
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import PIL
+from PIL import Image
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, SERVICE_DIR)
+
+import stub_model  # noqa: E402
+
+
+def load_frames(frames_dir, limit=8):
+    if not frames_dir:
+        return [stub_model.synthetic_scene((1920, 1080), seed=i) for i in range(2)]
+    names = sorted(f for f in os.listdir(frames_dir)
+                   if f.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp')))[:limit]
+    if not names:
+        raise SystemExit(f"no images in {frames_dir}")
+    return [Image.open(os.path.join(frames_dir, n)).convert('RGB') for n in names]
+
+
+def import_service(stub):
+    """Import app.py configured for benchmarking: in-process inference loaded
+    during import, no batching delay, no background lookup-table build, quiet logs."""
+    if stub:
+        stub_model.install()
+    for name, value in (("YOLO_WORKERS", "0"), ("YOLO_BACKGROUND_LOAD", "0"), ("DETECT_BATCH_SIZE", "1"),
+                        ("COLOR_LUT_BITS", "0"), ("MEMORY_GC_INTERVAL_S", "0"), ("LOG_LEVEL", "WARNING")):
+        os.environ.setdefault(name, value)
+    if stub:
+        os.environ["YOLO_BACKEND"] = "torch"
+    # colors.csv and the model path are relative to the service directory
+    os.chdir(SERVICE_DIR)
+    import app
+    return app
+
+
+def measure(fn, runs, warmup=3):
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 4),
+        "p95_ms": round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1000, 4),
+        "mean_ms": round(statistics.fmean(times) * 1000, 4),
+        "min_ms": round(times[0] * 1000, 4),
+        "runs": runs,
+    }
+
+
+def build_cases(app, frames):
+    """(name, zero-argument callable) pairs; each call is one timed iteration."""
+    from color_index import ColorIndex
+    from color_sampling import dominant_colors
+    from decode import decode_image, decode_region
+    from traffic_color import analyze_traffic_light_color, analyze_traffic_light_colors
+
+    rng = np.random.default_rng(0)
+    colors = itertools.cycle([tuple(int(v) for v in c) for c in rng.integers(0, 256, size=(256, 3))])
+    frame = frames[0]
+    jpegs = [stub_model.encode_jpeg(f) for f in frames]
+    width, height = frame.size
+    light_boxes = [{"x1": x1 * width, "y1": y1 * height, "x2": x2 * width, "y2": y2 * height}
+                   for (x1, y1, x2, y2), _ in stub_model.STUB_LIGHTS]
+
+    cases = []
+    for metric in ("rgb", "lab76", "ciede2000"):
+        cases.append((f"find_nearest_color[{metric}]",
+                      lambda metric=metric: app.find_nearest_color(next(colors), app.color_db, metric)))
+
+    palette_dir = tempfile.mkdtemp(prefix="palette-")
+    ColorIndex.load("colors.csv", palette_dir)
+    cases.append(("ColorIndex.from_csv", lambda: ColorIndex.from_csv("colors.csv")))
+    cases.append(("ColorIndex.load[compiled]", lambda: ColorIndex.load("colors.csv", palette_dir)))
+
+    cases.append(("analyze_traffic_light_color[1 box]",
+                  lambda: analyze_traffic_light_color(frame, light_boxes[0])))
+    cases.append((f"analyze_traffic_light_colors[{len(light_boxes)} boxes]",
+                  lambda: analyze_traffic_light_colors(frame, light_boxes)))
+
+    sample = np.asarray(frame.resize((64, 64), Image.NEAREST)).reshape(-1, 3)
+    cases.append(("dominant_colors[64x64, k=3]", lambda: dominant_colors(sample, 3)))
+
+    cache = app.ImageCache(max_size=100)
+    result = {"count": 2, "detections": [{"box": b, "confidence": 0.9, "color": "red", "distance": 4.2}
+                                         for b in light_boxes[:2]], "cached": False}
+    keys = [cache.key(data) for data in jpegs]
+    cases.append(("image_cache.key[1080p jpeg]", lambda: cache.key(jpegs[0])))
+    cases.append(("image_cache.set+get", lambda: (cache.set(keys[0], result), cache.get(keys[0]))))
+    cases.append(("image_cache.get[miss]", lambda: cache.get("0" * 32)))
+
+    def center(w, h):
+        return w // 2 - w // 10, h // 2 - h // 10, w // 2 + w // 10, h // 2 + h // 10
+
+    cases.append(("decode_image[full]", lambda: decode_image(jpegs[0])))
+    cases.append(("decode_image[draft 640]", lambda: decode_image(jpegs[0], 640)))
+    cases.append(("decode_region[center]", lambda: decode_region(jpegs[0], center)))
+
+    client = app.app.test_client()
+    nonce = itertools.count()
+
+    def post(path, data, **form):
+        response = client.post(path, data={"image": (io.BytesIO(data), "frame.jpg"), **form},
+                               headers={"X-Client-Id": f"bench-{next(nonce)}"})
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)}")
+        return response
+
+    # Trailing bytes after the JPEG end marker change the cache key but not the pixels
+    cases.append(("POST /detect[miss]",
+                  lambda: post("/detect", jpegs[0] + next(nonce).to_bytes(8, "little"))))
+    cases.append(("POST /detect[cache hit]", lambda: post("/detect", jpegs[0])))
+    cases.append(("POST /detect-color", lambda: post("/detect-color", jpegs[0])))
+
+    regions = {"rois": json.dumps([[x1, y1, x2, y2] for (x1, y1, x2, y2), _ in stub_model.STUB_LIGHTS[:2]]),
+               "points": json.dumps([[0.5, 0.5], [0.25, 0.75]]), "coords": "relative", "k": "3"}
+    cases.append(("POST /detect-color[4 regions, k=3]", lambda: post("/detect-color", jpegs[0], **regions)))
+
+    # The live color path: a 48x48 crop or a client-side mean instead of the full frame
+    session = client.post("/color-stream", json={}).json["session_id"]
+    crop = stub_model.encode_jpeg(frame.crop(center(width, height)).resize((48, 48)))
+    live_colors = itertools.cycle([[200, 30, 30], [30, 200, 30]])
+
+    def post_sample(**form):
+        response = client.post(f"/color-stream/{session}/sample", data=form)
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"/color-stream returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    cases.append(("POST /color-stream sample[48px crop]",
+                  lambda: post_sample(image=(io.BytesIO(crop), "crop.jpg"))))
+    cases.append(("POST /color-stream sample[rgb]", lambda: post_sample(rgb=json.dumps(next(live_colors)))))
+
+    def post_batch(count):
+        files = [(io.BytesIO(jpegs[i % len(jpegs)] + next(nonce).to_bytes(8, "little")), f"{i}.jpg")
+                 for i in range(count)]
+        response = client.post("/detect-batch", data={"images": files})
+        if response.status_code != 200 or response.json["errors"]:
+            raise RuntimeError(f"/detect-batch returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    cases.append(("POST /detect-batch[8 misses]", lambda: post_batch(8)))
+    return cases
+
+
+def run_suite(args):
+    app = import_service(args.stub_model)
+    frames = load_frames(args.frames)
+    results = {}
+    print(f"{'case':<40}{'median':>10}{'p95':>10}{'mean':>10}  (ms)")
+    for name, fn in build_cases(app, frames):
+        if args.only and args.only not in name:
+            continue
+        stats = measure(fn, args.runs)
+        results[name] = stats
+        print(f"{name:<40}{stats['median_ms']:>10.3f}{stats['p95_ms']:>10.3f}{stats['mean_ms']:>10.3f}")
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "pillow": PIL.__version__,
+            "stub_model": args.stub_model,
+            "frames": args.frames or "synthetic 1920x1080",
+            "runs": args.runs,
+        },
+        "cases": results,
+    }
+
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """Print a comparison table; return the names of regressed cases."""
+    regressions = []
+    print(f"\n{'case':<40}{'baseline':>10}{'current':>10}{'change':>9}  status")
+    for name in sorted(set(baseline["cases"]) | set(current["cases"])):
+        base = baseline["cases"].get(name)
+        new = current["cases"].get(name)
+        if base is None or new is None:
+            print(f"{name:<40}{'':>29}  {'new' if base is None else 'missing'}")
+            continue
+        before, after = base["median_ms"], new["median_ms"]
+        change = (after - before) / before if before else 0.0
+        status = "ok"
+        if change > threshold and after - before > min_delta_ms:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "faster"
+        print(f"{name:<40}{before:>10.3f}{after:>10.3f}{change:>+9.1%}  {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stub-model', action='store_true',
+                        help='replace the YOLO model with fixed boxes (no weights, network or GPU)')
+    parser.add_argument('--frames', help='directory of sample frames to use instead of synthetic ones')
+    parser.add_argument('--runs', type=int, default=50)
+    parser.add_argument('--only', help='run only cases whose name contains this')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON to check the results against')
+    parser.add_argument('--current', help='compare this results file instead of running the suite')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed relative slowdown of a case median (default 0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                        help='slowdowns smaller than this are never regressions')
+    args = parser.parse_args()
+    # The suite runs from the service directory; resolve paths before that
+    for name in ('frames', 'output', 'compare', 'current'):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    if args.current:
+        with open(args.current) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"\nwrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Stand-in for the ultralytics YOLO model, for benchmarks on CPU-only CI
+
+install() registers a fake ``ultralytics`` module before the service is
+imported. Its model answers every frame with the same traffic lights, at
+fixed positions relative to the frame size, without any inference; the
+service code around it (batching, class filtering, color analysis,
+distance, caching, JSON) runs unchanged. synthetic_scene() draws lit
+signals at those positions so color analysis has real work to do.
+"""
+
+import io
+import sys
+import types
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+TRAFFIC_LIGHT_ID = 9
+
+# (x1, y1, x2, y2) as fractions of the frame, and which section is lit
+STUB_LIGHTS: List[Tuple[Tuple[float, float, float, float], str]] = [
+    ((0.20, 0.10, 0.24, 0.30), 'red'),
+    ((0.48, 0.15, 0.51, 0.29), 'green'),
+    ((0.76, 0.12, 0.79, 0.26), 'yellow'),
+    ((0.90, 0.40, 0.91, 0.44), 'red'),
+]
+# A non-traffic-light detection, removed by the class filter
+STUB_OTHER = ((0.05, 0.55, 0.25, 0.95), 0)
+
+_LIT = {'red': (235, 40, 35), 'yellow': (240, 200, 40), 'green': (40, 220, 110)}
+_SECTIONS = ('red', 'yellow', 'green')
+
+
+class _Tensor:
+    def __init__(self, values):
+        self._values = np.asarray(values, dtype=np.float32)
+
+    def tolist(self):
+        return self._values.tolist()
+
+    def __len__(self):
+        return len(self._values)
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = _Tensor(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self.conf = _Tensor(conf)
+        self.cls = _Tensor(cls)
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class _Result:
+    def __init__(self, boxes: _Boxes):
+        self.boxes = boxes
+
+
+def _frame_size(source) -> Tuple[int, int]:
+    if isinstance(source, np.ndarray):
+        return source.shape[1], source.shape[0]
+    return source.size
+
+
+class StubYOLO:
+    """Mimics ``ultralytics.YOLO`` closely enough for detector.py."""
+
+    def __init__(self, model='stub', task=None):
+        self.model_path = model
+        self.names = {i: f'class{i}' for i in range(80)}
+        self.names[0] = 'person'
+        self.names[TRAFFIC_LIGHT_ID] = 'traffic light'
+
+    def to(self, device):
+        return self
+
+    def export(self, **kwargs):
+        raise RuntimeError('the stub model cannot be exported')
+
+    def _predict_one(self, source, classes=None, **kwargs) -> _Result:
+        width, height = _frame_size(source)
+        rows = [(box, 0.9 - 0.1 * i, TRAFFIC_LIGHT_ID) for i, (box, _) in enumerate(STUB_LIGHTS)]
+        rows.append((STUB_OTHER[0], 0.8, STUB_OTHER[1]))
+        if classes is not None:
+            rows = [row for row in rows if row[2] in classes]
+        xyxy = [(x1 * width, y1 * height, x2 * width, y2 * height) for (x1, y1, x2, y2), _, _ in rows]
+        return _Result(_Boxes(xyxy, [r[1] for r in rows], [r[2] for r in rows]))
+
+    def __call__(self, source, **kwargs):
+        if isinstance(source, list):
+            return [self._predict_one(s, **kwargs) for s in source]
+        return [self._predict_one(source, **kwargs)]
+
+
+def install() -> None:
+    """Make ``from ultralytics import YOLO`` return the stub."""
+    module = types.ModuleType('ultralytics')
+    module.YOLO = StubYOLO
+    sys.modules['ultralytics'] = module
+
+
+def synthetic_scene(size: Tuple[int, int] = (1280, 720), seed: int = 0) -> Image.Image:
+    """Noisy sky/road frame with lit traffic lights where the stub reports them."""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    pixels = np.empty((height, width, 3), dtype=np.int16)
+    pixels[: height // 2] = (120, 150, 190)
+    pixels[height // 2:] = (70, 70, 75)
+    pixels += rng.integers(-15, 16, size=pixels.shape, dtype=np.int16)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    draw = ImageDraw.Draw(image)
+    for (x1, y1, x2, y2), lit in STUB_LIGHTS:
+        box = (x1 * width, y1 * height, x2 * width, y2 * height)
+        draw.rectangle(box, fill=(25, 25, 25))
+        section_h = (box[3] - box[1]) / 3
+        k = _SECTIONS.index(lit)
+        draw.ellipse((box[0] + 1, box[1] + k * section_h + 1, box[2] - 1, box[1] + (k + 1) * section_h - 1),
+                     fill=_LIT[lit])
+    return image
+
+
+def encode_jpeg(image: Image.Image, quality: int = 90) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, 'JPEG', quality=quality)
+    return buf.getvalue()
@@ -0,0 +1,212 @@
+"""
+Detection result caches
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# xxhash is optional; blake2b from the standard library is the fallback
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+
+def hash_bytes(data: bytes) -> str:
+    """Fast non-cryptographic-strength content key for uploaded images."""
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class ImageCache:
+    """
+    Thread-safe LRU cache for detection results, keyed by image content.
+
+    Entries are bounded by count and by total serialized size, and expire
+    after ``ttl_s`` seconds. Results are stored as JSON so every get()
+    returns a fresh copy that callers can mutate freely.
+    """
+
+    def __init__(self, max_size: int = 100, max_bytes: int = 16 * 1024 * 1024,
+                 ttl_s: Optional[float] = 300.0):
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+
+        # key -> (serialized result, expiry time or None)
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(image_bytes: bytes) -> str:
+        return hash_bytes(image_bytes)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(payload)
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        payload = json.dumps(result, separators=(',', ':'))
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s else None
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and (len(self._entries) >= self.max_size
+                                     or self._bytes + size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (payload, expires_at)
+            self._bytes += size
+
+    def _remove(self, key: str) -> None:
+        payload, _ = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_size,
+                'max_bytes': self.max_bytes,
+                'ttl_s': self.ttl_s,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+def dhash(image: Image.Image, hash_size: int = 8, dead_zone: int = 1) -> int:
+    """
+    Difference hash: compare horizontally adjacent pixels of a tiny grayscale
+    thumbnail. Frames of the same scene differ in only a few bits.
+
+    Neighbours within ``dead_zone`` gray levels count as equal, so sensor
+    noise in flat regions (sky, road) doesn't flip bits between frames.
+    """
+    thumb = image.resize((hash_size + 1, hash_size), Image.BOX).convert('L')
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = ((pixels[:, 1:] - pixels[:, :-1]) > dead_zone).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class PerceptualCache:
+    """
+    Per-client near-duplicate cache for live camera frames.
+
+    Each client keeps its last ``history`` frames as (dHash, result) pairs. A
+    new frame whose hash is within ``threshold`` bits of a recent frame from
+    the same client reuses that frame's result. Entries older than ``ttl_s``
+    are ignored so a slowly changing scene is re-detected regularly.
+
+    A 16x16 hash (256 bits) is the default: 8x8 hashes miss small traffic
+    lights moving against a static background. Even so, a hash cannot see a
+    lamp changing color, so callers should cache detected boxes and re-run
+    color analysis on the new frame.
+
+    A dHash ignores resolution, so frames also carry their ``size``: boxes
+    cached for one upload size are never reused for another, which would
+    put them in the wrong coordinate space.
+    """
+
+    def __init__(self, threshold: int = 2, hash_size: int = 16, history: int = 4,
+                 ttl_s: float = 2.0, max_clients: int = 1024):
+        self.threshold = threshold
+        self.hash_size = hash_size
+        self.history = history
+        self.ttl_s = ttl_s
+        self.max_clients = max_clients
+
+        self._clients: 'OrderedDict[str, deque]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hash(self, image: Image.Image) -> int:
+        return dhash(image, self.hash_size)
+
+    def get(self, client_id: str, phash: int, size: Optional[Tuple[int, int]] = None) -> Optional[Tuple[Any, int]]:
+        """Return (result copy, Hamming distance) for a near-identical recent frame of the same ``size``."""
+        now = time.monotonic()
+        best = None
+        with self._lock:
+            frames = self._clients.get(client_id)
+            if frames:
+                self._clients.move_to_end(client_id)
+                for frame_hash, payload, stored_at, frame_size in frames:
+                    if now - stored_at > self.ttl_s or frame_size != size:
+                        continue
+                    distance = hamming_distance(phash, frame_hash)
+                    if distance <= self.threshold and (best is None or distance < best[1]):
+                        best = (payload, distance)
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(best[0]), best[1]
+
+    def set(self, client_id: str, phash: int, result: Any, size: Optional[Tuple[int, int]] = None) -> None:
+        payload = json.dumps(result, separators=(',', ':'))
+        with self._lock:
+            frames = self._clients.get(client_id)
+            if frames is None:
+                frames = deque(maxlen=self.history)
+                self._clients[client_id] = frames
+                while len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client_id)
+            frames.append((phash, payload, time.monotonic(), size))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'threshold': self.threshold,
+                'hash_bits': self.hash_size ** 2,
+                'clients': len(self._clients),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,256 @@
+"""
+Camera profiles for distance estimation
+
+Distance follows from the pinhole model: real size * focal length / size
+in the image, with both sizes along the housing's long axis. A focal
+length in pixels only holds for one resolution, so a profile stores it
+relative to the sensor instead, as a fraction of the sensor's long side.
+A frame that is a downscaled readout of the sensor, or a crop of it (16:9
+video from a 4:3 sensor, a square crop), then gets the focal length that
+matches its own pixels, and clients can upload small frames and still get
+correct distances.
+
+The real size comes from the light housing: vertical or horizontal, with
+3 or 4 aspects (lamps). Profiles are sent per request or stored per device
+ID (see CameraProfileStore).
+"""
+
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# Long-axis length of a housing in meters, by number of aspects
+# (200-300 mm lenses plus backplate)
+HOUSING_LENGTH_M = {3: 0.8, 4: 1.05}
+HOUSINGS = ('vertical', 'horizontal', 'auto')
+
+# Most phone and dash-cam sensors are 4:3; video modes crop them to 16:9
+DEFAULT_SENSOR_ASPECT = 4 / 3
+
+# The focal length distances used to assume: 650 px on a 1280-wide frame
+REFERENCE_SIZE = (1280, 720)
+REFERENCE_FOCAL_LENGTH_PX = 650.0
+
+# Diagonal of a 35 mm film frame, which "35 mm equivalent" focal lengths refer to
+FILM_DIAGONAL_MM = math.hypot(36.0, 24.0)
+
+
+def _parse_aspect(value: Any) -> float:
+    """'4:3', '16/9' or a number; returned as long side / short side."""
+    if isinstance(value, str):
+        for sep in (':', '/', 'x'):
+            if sep in value:
+                long_side, short_side = (float(v) for v in value.split(sep, 1))
+                break
+        else:
+            long_side, short_side = float(value), 1.0
+    else:
+        long_side, short_side = float(value), 1.0
+    if not (math.isfinite(long_side) and math.isfinite(short_side)) or long_side <= 0 or short_side <= 0:
+        raise ValueError("sensor_aspect must be positive and finite")
+    return max(long_side, short_side) / min(long_side, short_side)
+
+
+def covered_sensor_px(frame_size: Tuple[int, int], sensor_aspect: float) -> float:
+    """
+    How many of the frame's pixels the sensor's long side spans.
+
+    A frame at least as wide as the sensor (16:9 from 4:3) keeps the full
+    long side and crops the short one; a narrower frame (1:1 from 4:3) keeps
+    the full short side. Portrait frames are handled by using long and
+    short sides rather than width and height.
+    """
+    long_side, short_side = max(frame_size), min(frame_size)
+    if short_side <= 0:
+        raise ValueError(f"invalid frame size {frame_size}")
+    if long_side / short_side >= sensor_aspect:
+        return float(long_side)
+    return short_side * sensor_aspect
+
+
+class CameraProfile:
+    """
+    Focal length and light housing used to turn box sizes into distances.
+
+    Attributes:
+        focal_ratio: Focal length divided by the sensor's long side
+        sensor_aspect: Sensor long side / short side
+        housing: 'vertical' (measure box height), 'horizontal' (box width)
+            or 'auto' (the box's longer side)
+        aspects: Lamps in the housing, 3 or 4
+        housing_length_m: Real long-axis length of the housing
+    """
+
+    __slots__ = ('focal_ratio', 'sensor_aspect', 'housing', 'aspects', 'housing_length_m')
+
+    def __init__(self, focal_ratio: float, sensor_aspect: float = DEFAULT_SENSOR_ASPECT,
+                 housing: str = 'vertical', aspects: int = 3, housing_length_m: Optional[float] = None):
+        # Non-finite values would put Infinity / NaN distances in the JSON
+        if not (math.isfinite(focal_ratio) and focal_ratio > 0):
+            raise ValueError("focal length must be positive and finite")
+        if not (math.isfinite(sensor_aspect) and sensor_aspect > 0):
+            raise ValueError("sensor_aspect must be positive and finite")
+        if housing not in HOUSINGS:
+            raise ValueError(f"housing must be one of {HOUSINGS}, got {housing!r}")
+        if aspects not in HOUSING_LENGTH_M:
+            raise ValueError(f"aspects must be one of {tuple(HOUSING_LENGTH_M)}, got {aspects!r}")
+        if housing_length_m is not None and not (math.isfinite(housing_length_m) and housing_length_m > 0):
+            raise ValueError("housing_length_m must be positive and finite")
+        self.focal_ratio = float(focal_ratio)
+        self.sensor_aspect = float(sensor_aspect)
+        self.housing = housing
+        self.aspects = int(aspects)
+        self.housing_length_m = float(housing_length_m or HOUSING_LENGTH_M[self.aspects])
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'CameraProfile':
+        """
+        Build a profile from client-supplied fields.
+
+        The focal length is given as one of:
+            focal_length_px with width and height: calibrated on a frame of that size
+            hfov_deg: horizontal field of view of a full-sensor landscape frame
+            focal_length_mm with sensor_width_mm (the sensor's long side)
+            focal_length_35mm: 35 mm equivalent focal length, as phones report it
+        Optional: sensor_aspect ('4:3', '16:9' or a number; implied by
+        sensor_width_mm and sensor_height_mm), housing, aspects, housing_length_m.
+
+        Raises:
+            ValueError: Missing or invalid fields
+        """
+        if not isinstance(data, Mapping):
+            raise ValueError("camera profile must be a JSON object")
+        try:
+            if 'sensor_aspect' in data:
+                sensor_aspect = _parse_aspect(data['sensor_aspect'])
+            elif 'sensor_width_mm' in data and 'sensor_height_mm' in data:
+                sensor_aspect = _parse_aspect(f"{data['sensor_width_mm']}:{data['sensor_height_mm']}")
+            else:
+                sensor_aspect = DEFAULT_SENSOR_ASPECT
+
+            if 'focal_length_px' in data:
+                if 'width' not in data or 'height' not in data:
+                    raise ValueError("focal_length_px needs the width and height of the frame it was measured on")
+                size = (int(data['width']), int(data['height']))
+                focal_ratio = float(data['focal_length_px']) / covered_sensor_px(size, sensor_aspect)
+            elif 'hfov_deg' in data:
+                hfov = float(data['hfov_deg'])
+                if not 0 < hfov < 180:
+                    raise ValueError("hfov_deg must be between 0 and 180")
+                focal_ratio = 0.5 / math.tan(math.radians(hfov) / 2)
+            elif 'focal_length_mm' in data:
+                if 'sensor_width_mm' not in data:
+                    raise ValueError("focal_length_mm needs sensor_width_mm")
+                focal_ratio = float(data['focal_length_mm']) / float(data['sensor_width_mm'])
+            elif 'focal_length_35mm' in data:
+                # Equivalence is by diagonal; convert to the sensor's long side
+                focal_ratio = (float(data['focal_length_35mm']) / FILM_DIAGONAL_MM
+                               * math.hypot(sensor_aspect, 1.0) / sensor_aspect)
+            else:
+                raise ValueError(
+                    "camera profile needs focal_length_px (with width and height), hfov_deg, "
+                    "focal_length_mm (with sensor_width_mm) or focal_length_35mm")
+
+            return cls(focal_ratio, sensor_aspect,
+                       housing=str(data.get('housing', 'vertical')),
+                       aspects=int(data.get('aspects', 3)),
+                       housing_length_m=(float(data['housing_length_m'])
+                                         if data.get('housing_length_m') is not None else None))
+        except (TypeError, ZeroDivisionError, OverflowError) as e:
+            raise ValueError(f"invalid camera profile: {e}") from e
+
+    @classmethod
+    def parse(cls, value: Any) -> 'CameraProfile':
+        """from_dict() for a JSON string or an already-decoded object."""
+        if isinstance(value, (str, bytes)):
+            try:
+                value = json.loads(value)
+            except ValueError as e:
+                raise ValueError(f"'camera' must be a JSON object: {e}") from e
+        return cls.from_dict(value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'focal_ratio': round(self.focal_ratio, 6),
+            'hfov_deg': round(math.degrees(2 * math.atan(0.5 / self.focal_ratio)), 2),
+            'sensor_aspect': round(self.sensor_aspect, 4),
+            'housing': self.housing,
+            'aspects': self.aspects,
+            'housing_length_m': self.housing_length_m,
+        }
+
+    @property
+    def key(self) -> str:
+        """Short stable digest, for cache keys of results computed with this profile."""
+        fields = (self.focal_ratio, self.sensor_aspect, self.housing, self.aspects, self.housing_length_m)
+        return hashlib.blake2b(repr(fields).encode(), digest_size=6).hexdigest()
+
+    def focal_length_px(self, frame_size: Tuple[int, int]) -> float:
+        """Focal length in pixels of a (width, height) frame."""
+        return self.focal_ratio * covered_sensor_px(frame_size, self.sensor_aspect)
+
+    def distance(self, box: Mapping[str, float], frame_size: Tuple[int, int]) -> float:
+        """Meters to the housing in ``box`` (pixels of a ``frame_size`` frame), to 0.1 m; 0.0 if degenerate."""
+        width, height = box['x2'] - box['x1'], box['y2'] - box['y1']
+        if self.housing == 'vertical':
+            pixels = height
+        elif self.housing == 'horizontal':
+            pixels = width
+        else:
+            pixels = max(width, height)
+        if pixels <= 0:
+            return 0.0
+        return round(self.housing_length_m * self.focal_length_px(frame_size) / pixels, 1)
+
+
+# Matches the fixed 650 px / 0.8 m estimate on 1280x720 frames
+DEFAULT_PROFILE = CameraProfile(REFERENCE_FOCAL_LENGTH_PX / covered_sensor_px(REFERENCE_SIZE, DEFAULT_SENSOR_ASPECT))
+
+
+class CameraProfileStore:
+    """
+    Thread-safe LRU of camera profiles by device ID.
+
+    Profiles expire ``ttl_s`` seconds after they were last stored or used,
+    so devices that stop sending frames don't hold entries forever.
+    """
+
+    def __init__(self, max_profiles: int = 1024, ttl_s: Optional[float] = 7 * 24 * 3600.0):
+        self.max_profiles = max_profiles
+        self.ttl_s = ttl_s
+        # device ID -> (profile, last use)
+        self._profiles: 'OrderedDict[str, Tuple[CameraProfile, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, device_id: str) -> Optional[CameraProfile]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._profiles.get(device_id)
+            if entry is None:
+                return None
+            profile, last_used = entry
+            if self.ttl_s is not None and now - last_used > self.ttl_s:
+                del self._profiles[device_id]
+                return None
+            self._profiles[device_id] = (profile, now)
+            self._profiles.move_to_end(device_id)
+            return profile
+
+    def set(self, device_id: str, profile: CameraProfile) -> None:
+        with self._lock:
+            self._profiles[device_id] = (profile, time.monotonic())
+            self._profiles.move_to_end(device_id)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def remove(self, device_id: str) -> bool:
+        with self._lock:
+            return self._profiles.pop(device_id, None) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._profiles)
@@ -0,0 +1,563 @@
+"""
+Color Index - vectorized nearest-color lookups over the colors.csv palette
+"""
+
+import csv
+import hashlib
+import json
+import math
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# Query rows resolved per chunk in nearest_batch. Bounds the temporary
+# (chunk x palette) distance matrix to roughly 30 MB for the bundled palette.
+BATCH_CHUNK_SIZE = 4096
+
+# Bits per channel accepted for the dense RGB lookup table. 8 bits is exact
+# (2^24 entries, 32 MB on disk); 6 and 5 bits quantize each channel to
+# 64 / 32 levels and shrink the table to 512 KB / 64 KB.
+LOOKUP_TABLE_BITS = (5, 6, 8)
+
+# Distance metrics understood by the index:
+#   rgb        Euclidean distance in sRGB (the original behaviour)
+#   lab76      Euclidean distance in CIELAB (CIE76 delta E)
+#   ciede2000  CIEDE2000 delta E, closest to perceived color difference
+COLOR_METRICS = ('rgb', 'lab76', 'ciede2000')
+
+# CIEDE2000 keeps several (chunk x palette) temporaries alive, so it resolves
+# smaller chunks than the plain Euclidean metrics. It is also ~50x slower per
+# sample, so a ciede2000 lookup table is best built at 5 or 6 bits.
+CIEDE2000_CHUNK_SIZE = 512
+
+# Compiled palettes (ColorIndex.load) are .npy arrays named by the CSV's
+# content hash plus a small JSON stamp recording which CSV (path, size,
+# mtime) they were built from. Bump the version when the layout changes.
+COMPILED_PALETTE_VERSION = 1
+_COMPILED_ARRAYS = ('rgb', 'lab', 'text', 'offsets')
+
+# sRGB (D65) to CIE XYZ, and the D65 reference white
+_SRGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+
+
+def rgb_to_lab(rgb) -> np.ndarray:
+    """Convert an (N, 3) array of 8-bit sRGB values to CIELAB (D65)."""
+    c = np.asarray(rgb, dtype=np.float64).reshape(-1, 3) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = (linear @ _SRGB_TO_XYZ.T) / _D65_WHITE
+    delta = 6.0 / 29.0
+    f = np.where(xyz > delta ** 3, np.cbrt(xyz), xyz / (3 * delta ** 2) + 4.0 / 29.0)
+    return np.stack([
+        116.0 * f[:, 1] - 16.0,
+        500.0 * (f[:, 0] - f[:, 1]),
+        200.0 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+
+
+def ciede2000(lab1: np.ndarray, lab2: np.ndarray) -> np.ndarray:
+    """
+    CIEDE2000 color difference, broadcasting over the leading dimensions.
+
+    Args:
+        lab1: Array of shape (..., 3) in CIELAB
+        lab2: Array of shape (..., 3) in CIELAB, broadcastable with lab1
+
+    Returns:
+        Array of delta E values with the broadcast shape
+    """
+    L1, a1, b1 = lab1[..., 0], lab1[..., 1], lab1[..., 2]
+    L2, a2, b2 = lab2[..., 0], lab2[..., 1], lab2[..., 2]
+
+    c_bar7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2.0) ** 7
+    g = 0.5 * (1.0 - np.sqrt(c_bar7 / (c_bar7 + 25.0 ** 7)))
+    a1p = (1.0 + g) * a1
+    a2p = (1.0 + g) * a2
+    c1p = np.hypot(a1p, b1)
+    c2p = np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360.0
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360.0
+
+    chroma_zero = (c1p * c2p) == 0
+    dh = h2p - h1p
+    dh = np.where(dh > 180.0, dh - 360.0, np.where(dh < -180.0, dh + 360.0, dh))
+    dh = np.where(chroma_zero, 0.0, dh)
+    d_L = L2 - L1
+    d_C = c2p - c1p
+    d_H = 2.0 * np.sqrt(c1p * c2p) * np.sin(np.radians(dh) / 2.0)
+
+    L_bar = (L1 + L2) / 2.0
+    c_bar_p = (c1p + c2p) / 2.0
+    h_sum = h1p + h2p
+    h_bar = np.where(
+        np.abs(h1p - h2p) <= 180.0, h_sum / 2.0,
+        np.where(h_sum < 360.0, (h_sum + 360.0) / 2.0, (h_sum - 360.0) / 2.0))
+    h_bar = np.where(chroma_zero, h_sum, h_bar)
+
+    t = (1.0
+         - 0.17 * np.cos(np.radians(h_bar - 30.0))
+         + 0.24 * np.cos(np.radians(2.0 * h_bar))
+         + 0.32 * np.cos(np.radians(3.0 * h_bar + 6.0))
+         - 0.20 * np.cos(np.radians(4.0 * h_bar - 63.0)))
+    d_theta = 30.0 * np.exp(-(((h_bar - 275.0) / 25.0) ** 2))
+    c_bar_p7 = c_bar_p ** 7
+    r_c = 2.0 * np.sqrt(c_bar_p7 / (c_bar_p7 + 25.0 ** 7))
+    l_term = (L_bar - 50.0) ** 2
+    s_L = 1.0 + 0.015 * l_term / np.sqrt(20.0 + l_term)
+    s_C = 1.0 + 0.045 * c_bar_p
+    s_H = 1.0 + 0.015 * c_bar_p * t
+    r_T = -np.sin(np.radians(2.0 * d_theta)) * r_c
+
+    dl = d_L / s_L
+    dc = d_C / s_C
+    dhh = d_H / s_H
+    return np.sqrt(np.maximum(dl * dl + dc * dc + dhh * dhh + r_T * dc * dhh, 0.0))
+
+
+def validate_metric(metric: str) -> str:
+    if metric not in COLOR_METRICS:
+        raise ValueError(f"metric must be one of {COLOR_METRICS}, got {metric!r}")
+    return metric
+
+
+def _save_npy_atomic(path: str, array: np.ndarray) -> None:
+    """Write to a temp file and rename so concurrent processes never map a half-written file."""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class StringTable:
+    """
+    Read-only sequence of strings packed into one UTF-8 byte array.
+
+    String ``i`` is ``data[offsets[i]:offsets[i + 1]]``, decoded on access,
+    so a memory-mapped table costs no Python objects until it is read.
+    """
+
+    __slots__ = ('data', 'offsets')
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def pack(cls, strings: Sequence[str]) -> 'StringTable':
+        encoded = [s.encode('utf-8') for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def column(self, start: int, count: int) -> 'StringTable':
+        """The ``count`` strings from ``start`` on, sharing this table's bytes."""
+        return StringTable(self.data, self.offsets[start:start + count + 1])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('string table index out of range')
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ColorLookupTable:
+    """Dense table mapping every (quantized) RGB value to a palette index"""
+
+    def __init__(self, table: np.ndarray, bits: int):
+        self.table = table
+        self.bits = bits
+        self.shift = 8 - bits
+
+    def lookup(self, rgb: np.ndarray) -> np.ndarray:
+        """Map an (N, 3) uint8 array to palette indices with one gather."""
+        q = (rgb >> self.shift).astype(np.intp)
+        return self.table[(q[:, 0] << (2 * self.bits)) | (q[:, 1] << self.bits) | q[:, 2]]
+
+    def lookup_one(self, r: int, g: int, b: int) -> int:
+        s = self.shift
+        return int(self.table[((r >> s) << (2 * self.bits)) | ((g >> s) << self.bits) | (b >> s)])
+
+    @staticmethod
+    def grid(bits: int, red_level: int) -> np.ndarray:
+        """RGB values at the centre of each quantization cell for one red level."""
+        levels = 1 << bits
+        step = 1 << (8 - bits)
+        centers = np.arange(levels, dtype=np.float64) * step + (step - 1) / 2.0
+        g, b = np.meshgrid(centers, centers, indexing='ij')
+        r = np.full(g.size, centers[red_level])
+        return np.stack([r, g.ravel(), b.ravel()], axis=1)
+
+
+class ColorIndex:
+    """Color palette held in contiguous NumPy arrays for nearest-color queries"""
+
+    __slots__ = ('ids', 'names', 'hexes', 'rgb', '_rgb_f', '_norms', 'lab', '_lab_norms',
+                 '_lut', '_lut_metric', '_lut_state', '_lut_thread')
+
+    def __init__(self, ids: Sequence[str], names: Sequence[str],
+                 hexes: Sequence[str], rgb: Iterable, lab: Optional[np.ndarray] = None):
+        # String tables (from a compiled palette) are kept as they are
+        self.ids = ids if isinstance(ids, StringTable) else list(ids)
+        self.names = names if isinstance(names, StringTable) else list(names)
+        self.hexes = hexes if isinstance(hexes, StringTable) else list(hexes)
+        # A memory-mapped palette is already contiguous uint8 and stays mapped
+        rgb = np.asanyarray(rgb, dtype=np.uint8).reshape(-1, 3)
+        self.rgb = rgb if rgb.flags.c_contiguous else np.ascontiguousarray(rgb)
+
+        # Palette pre-converted once for the perceptual metrics
+        self.lab = rgb_to_lab(self.rgb) if lab is None else np.asanyarray(lab, dtype=np.float64)
+
+        # Search-only copies, built on the first exact search: a process that
+        # only answers from the (shared) lookup table never allocates them
+        self._rgb_f: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._lab_norms: Optional[np.ndarray] = None
+
+        self._lut: Optional[ColorLookupTable] = None
+        self._lut_metric = 'rgb'
+        self._lut_state = 'disabled'
+        self._lut_thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_csv(cls, csv_path: str = 'colors.csv') -> 'ColorIndex':
+        """Parse a colors.csv file (id, name, hex, r, g, b) into an index."""
+        ids, names, hexes, rgb = [], [], [], []
+        with open(csv_path, 'r', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            for row in reader:
+                if len(row) >= 6:
+                    ids.append(row[0])
+                    names.append(row[1])
+                    hexes.append(row[2])
+                    rgb.append((int(row[3]), int(row[4]), int(row[5])))
+        return cls(ids, names, hexes, rgb)
+
+    @classmethod
+    def load(cls, csv_path: str = 'colors.csv', cache_dir: Optional[str] = None) -> 'ColorIndex':
+        """
+        Load a palette CSV through its compiled form in ``cache_dir``.
+
+        If the compiled arrays match the CSV's size and modification time
+        they are memory-mapped read-only, which skips CSV parsing and Lab
+        conversion and lets every process on the host share the same pages.
+        Otherwise the CSV is parsed and compiled for next time. Without
+        ``cache_dir`` this is from_csv().
+        """
+        if not cache_dir:
+            return cls.from_csv(csv_path)
+
+        source = os.path.abspath(csv_path)
+        stat = os.stat(source)
+        stem = os.path.splitext(os.path.basename(source))[0]
+        stamp_path = os.path.join(
+            cache_dir, f"{stem}-{hashlib.sha256(source.encode()).hexdigest()[:8]}.palette.json")
+        try:
+            with open(stamp_path, 'r', encoding='utf-8') as f:
+                stamp = json.load(f)
+            if (stamp['version'] == COMPILED_PALETTE_VERSION and stamp['size'] == stat.st_size
+                    and stamp['mtime_ns'] == stat.st_mtime_ns):
+                return cls.from_compiled(cache_dir, stamp['key'])
+        except (OSError, ValueError, KeyError):
+            pass
+
+        index = cls.from_csv(csv_path)
+        try:
+            key = index.compile(cache_dir)
+            stamp = {'version': COMPILED_PALETTE_VERSION, 'source': source, 'size': stat.st_size,
+                     'mtime_ns': stat.st_mtime_ns, 'key': key, 'colors': len(index)}
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(stamp, f)
+            os.replace(tmp_path, stamp_path)
+            log.info("compiled color palette", source=source, colors=len(index), key=key)
+        except OSError as e:
+            log.warning("could not write compiled palette", cache_dir=cache_dir, error=str(e))
+        return index
+
+    def compile(self, cache_dir: str) -> str:
+        """Write the palette's arrays to ``cache_dir`` as .npy files; returns their key."""
+        text = StringTable.pack([*self.ids, *self.names, *self.hexes])
+        arrays = {'rgb': self.rgb, 'lab': self.lab, 'text': text.data, 'offsets': text.offsets}
+        digest = hashlib.sha256(str(COMPILED_PALETTE_VERSION).encode())
+        for name in _COMPILED_ARRAYS:
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        key = digest.hexdigest()[:16]
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in _COMPILED_ARRAYS:
+            path = os.path.join(cache_dir, f"palette-{key}.{name}.npy")
+            if not os.path.exists(path):
+                _save_npy_atomic(path, arrays[name])
+        return key
+
+    @classmethod
+    def from_compiled(cls, cache_dir: str, key: str) -> 'ColorIndex':
+        """
+        Memory-map a palette written by compile().
+
+        Raises:
+            OSError: A file is missing
+            ValueError: The arrays don't fit together
+        """
+        arrays = {name: np.load(os.path.join(cache_dir, f"palette-{key}.{name}.npy"), mmap_mode='r')
+                  for name in _COMPILED_ARRAYS}
+        rgb, lab, offsets = arrays['rgb'], arrays['lab'], arrays['offsets']
+        n = rgb.shape[0]
+        if (rgb.dtype != np.uint8 or rgb.shape != (n, 3) or lab.shape != (n, 3)
+                or offsets.shape != (3 * n + 1,) or offsets[-1] != arrays['text'].shape[0]):
+            raise ValueError(f"compiled palette {key} is inconsistent")
+        text = StringTable(arrays['text'], offsets)
+        return cls(text.column(0, n), text.column(n, n), text.column(2 * n, n), rgb, lab)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'ColorIndex':
+        """Build an index from dicts with 'name', 'r', 'g', 'b' (and optionally 'id', 'hex')."""
+        records = list(records)
+        return cls(
+            [c.get('id', '') for c in records],
+            [c['name'] for c in records],
+            [c.get('hex', '#%02x%02x%02x' % (c['r'], c['g'], c['b'])) for c in records],
+            [(c['r'], c['g'], c['b']) for c in records],
+        )
+
+    @classmethod
+    def empty(cls) -> 'ColorIndex':
+        return cls([], [], [], np.empty((0, 3), dtype=np.uint8))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self.record(i)
+
+    def __getitem__(self, i: int) -> Dict:
+        return self.record(i)
+
+    def record(self, i: int) -> Dict:
+        """Return palette entry ``i`` in the dict shape used by the CSV loaders."""
+        r, g, b = (int(v) for v in self.rgb[i])
+        return {
+            'id': self.ids[i],
+            'name': self.names[i],
+            'hex': self.hexes[i],
+            'r': r,
+            'g': g,
+            'b': b,
+        }
+
+    def nearest_batch(self, samples, metric: str = 'rgb') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Resolve many RGB samples at once.
+
+        Args:
+            samples: Array-like of shape (N, 3) with RGB values 0-255
+            metric: One of COLOR_METRICS
+
+        Returns:
+            (indices, distances) arrays of length N, with distances in the
+            units of ``metric``. Indices are -1 when the palette is empty.
+        """
+        validate_metric(metric)
+        query = np.asarray(samples, dtype=np.float64).reshape(-1, 3)
+        n = query.shape[0]
+        if len(self) == 0:
+            return np.full(n, -1, dtype=np.intp), np.full(n, np.inf)
+
+        lut = self._lut
+        if lut is not None and self._lut_metric == metric:
+            return self._lookup_batch(lut, query, metric)
+        return self._search_batch(query, metric)
+
+    def _rgb_float(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The palette as float64 and its squared norms."""
+        if self._norms is None:
+            # Float64 keeps the expanded |a|^2 - 2ab + |b|^2 form exact for 8-bit
+            # inputs, so results (including tie-breaks) match the per-row loop.
+            rgb_f = self.rgb.astype(np.float64)
+            self._rgb_f, self._norms = rgb_f, np.einsum('ij,ij->i', rgb_f, rgb_f)
+        return self._rgb_f, self._norms
+
+    def _lab_squared_norms(self) -> np.ndarray:
+        if self._lab_norms is None:
+            self._lab_norms = np.einsum('ij,ij->i', self.lab, self.lab)
+        return self._lab_norms
+
+    def _search_batch(self, query: np.ndarray, metric: str = 'rgb') -> Tuple[np.ndarray, np.ndarray]:
+        n = query.shape[0]
+        indices = np.empty(n, dtype=np.intp)
+        distances = np.empty(n, dtype=np.float64)
+
+        if metric == 'ciede2000':
+            lab = rgb_to_lab(query)
+            for start in range(0, n, CIEDE2000_CHUNK_SIZE):
+                chunk = lab[start:start + CIEDE2000_CHUNK_SIZE]
+                d = ciede2000(chunk[:, None, :], self.lab[None, :, :])
+                best = np.argmin(d, axis=1)
+                indices[start:start + len(chunk)] = best
+                distances[start:start + len(chunk)] = d[np.arange(len(chunk)), best]
+            return indices, distances
+
+        if metric == 'lab76':
+            points, palette, norms = rgb_to_lab(query), self.lab, self._lab_squared_norms()
+        else:
+            palette, norms = self._rgb_float()
+            points = query
+
+        for start in range(0, n, BATCH_CHUNK_SIZE):
+            chunk = points[start:start + BATCH_CHUNK_SIZE]
+            d2 = chunk @ palette.T
+            d2 *= -2.0
+            d2 += norms
+            d2 += np.einsum('ij,ij->i', chunk, chunk)[:, None]
+            best = np.argmin(d2, axis=1)
+            indices[start:start + len(chunk)] = best
+            distances[start:start + len(chunk)] = d2[np.arange(len(chunk)), best]
+
+        np.sqrt(np.maximum(distances, 0.0, out=distances), out=distances)
+        return indices, distances
+
+    def _pair_distances(self, query: np.ndarray, indices: np.ndarray, metric: str) -> np.ndarray:
+        """Distance from each query to its already-chosen palette entry."""
+        if metric == 'rgb':
+            diff = query - self.rgb[indices]
+            return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        lab = rgb_to_lab(query)
+        if metric == 'lab76':
+            diff = lab - self.lab[indices]
+            return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        return ciede2000(lab, self.lab[indices])
+
+    def _lookup_batch(self, lut: ColorLookupTable, query: np.ndarray,
+                      metric: str) -> Tuple[np.ndarray, np.ndarray]:
+        # The table is defined on integer RGB, so fractional inputs are rounded.
+        rgb = np.clip(np.rint(query), 0, 255).astype(np.uint8)
+        indices = lut.lookup(rgb).astype(np.intp)
+        return indices, self._pair_distances(query, indices, metric)
+
+    def nearest(self, rgb: Sequence[float], metric: str = 'rgb') -> Tuple[int, float]:
+        """Return (index, distance) of the palette entry closest to one RGB value."""
+        lut = self._lut
+        if lut is not None and metric == 'rgb' == self._lut_metric and len(self):
+            r, g, b = (min(255, max(0, int(round(v)))) for v in rgb)
+            index = lut.lookup_one(r, g, b)
+            pr, pg, pb = (int(v) for v in self.rgb[index])
+            return index, math.sqrt((rgb[0] - pr)**2 + (rgb[1] - pg)**2 + (rgb[2] - pb)**2)
+        indices, distances = self.nearest_batch(rgb, metric)
+        return int(indices[0]), float(distances[0])
+
+    def palette_hash(self) -> str:
+        """Content hash of the palette, used to key cached lookup tables."""
+        return hashlib.sha256(self.rgb.tobytes()).hexdigest()[:16]
+
+    def lookup_table_path(self, cache_dir: str, bits: int, metric: str = 'rgb') -> str:
+        suffix = '' if metric == 'rgb' else f"-{metric}"
+        return os.path.join(cache_dir, f"palette-{self.palette_hash()}-{bits}b{suffix}.lut.npy")
+
+    def build_lookup_table(self, bits: int = 8, metric: str = 'rgb') -> np.ndarray:
+        """Compute the nearest palette index for every quantized RGB cell."""
+        if bits not in LOOKUP_TABLE_BITS:
+            raise ValueError(f"bits must be one of {LOOKUP_TABLE_BITS}, got {bits}")
+        validate_metric(metric)
+        levels = 1 << bits
+        table = np.empty(levels ** 3, dtype=np.uint16)
+        plane = levels * levels
+        for red_level in range(levels):
+            indices, _ = self._search_batch(ColorLookupTable.grid(bits, red_level), metric)
+            table[red_level * plane:(red_level + 1) * plane] = indices
+        return table
+
+    def load_lookup_table(self, bits: int = 8, cache_dir: Optional[str] = None,
+                          metric: str = 'rgb') -> ColorLookupTable:
+        """
+        Memory-map the lookup table from ``cache_dir`` or build (and cache) it.
+
+        Once loaded, nearest() and nearest_batch() resolve queries for
+        ``metric`` with a single array index instead of a palette search.
+        """
+        table = None
+        path = self.lookup_table_path(cache_dir, bits, metric) if cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                table = np.load(path, mmap_mode='r')
+                if table.shape != ((1 << bits) ** 3,):
+                    table = None
+            except (OSError, ValueError):
+                table = None
+
+        if table is None:
+            table = self.build_lookup_table(bits, metric)
+            if path:
+                os.makedirs(cache_dir, exist_ok=True)
+                _save_npy_atomic(path, table)
+
+        lut = ColorLookupTable(table, bits)
+        self._lut_metric = metric
+        self._lut = lut
+        self._lut_state = 'ready'
+        return lut
+
+    def enable_lookup_table(self, bits: int = 8, cache_dir: Optional[str] = None,
+                            background: bool = True, metric: str = 'rgb') -> None:
+        """Load or build the lookup table, by default on a daemon thread."""
+        if bits not in LOOKUP_TABLE_BITS:
+            raise ValueError(f"bits must be one of {LOOKUP_TABLE_BITS}, got {bits}")
+        validate_metric(metric)
+        if len(self) == 0:
+            return
+
+        def _run():
+            try:
+                self.load_lookup_table(bits, cache_dir, metric)
+            except Exception as e:
+                self._lut_state = 'failed'
+                log.error("color lookup table build failed", error=str(e), bits=bits)
+
+        self._lut_state = 'building'
+        if background:
+            self._lut_thread = threading.Thread(target=_run, name='color-lut', daemon=True)
+            self._lut_thread.start()
+        else:
+            _run()
+
+    def lookup_table_status(self) -> Dict:
+        lut = self._lut
+        return {
+            'state': self._lut_state,
+            'bits': lut.bits if lut is not None else None,
+            'metric': self._lut_metric if lut is not None else None,
+        }
+
+
+def as_color_index(color_db) -> ColorIndex:
+    """Accept either a ColorIndex or a list of color dicts."""
+    if isinstance(color_db, ColorIndex):
+        return color_db
+    return ColorIndex.from_records(color_db)
@@ -0,0 +1,157 @@
+"""
+Region sampling for /detect-color
+
+Parses the regions a client asks about (boxes, or points expanded to small
+squares) and summarises each one as its mean color plus its dominant
+colors. Dominant colors come from a coarse RGB histogram (4 bits per
+channel) whose most populated bins seed a few vectorized k-means steps on
+a downsampled copy of the region, so a multi-colored target isn't blurred
+into one average.
+"""
+
+import json
+import math
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from decode import as_array
+
+Box = Tuple[int, int, int, int]
+
+# Limits per request
+MAX_REGIONS = 32
+MAX_DOMINANT = 8
+
+# Regions are downsampled to at most this many pixels per side for clustering
+SAMPLE_MAX_SIDE = 64
+
+HISTOGRAM_BITS = 4
+KMEANS_ITERATIONS = 4
+
+
+def _parse_list(value: Any, name: str, length: int) -> List[Sequence[float]]:
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError as e:
+            raise ValueError(f"'{name}' must be a JSON list: {e}") from e
+    # bool subclasses int, but JSON true / false aren't coordinates
+    if not isinstance(value, list) or not all(
+            isinstance(v, (list, tuple)) and len(v) == length
+            and all(isinstance(c, (int, float)) and not isinstance(c, bool) for c in v)
+            for v in value):
+        shape = '[x1, y1, x2, y2]' if length == 4 else '[x, y]'
+        raise ValueError(f"'{name}' must be a list of {shape} entries")
+    return value
+
+
+def parse_regions(rois: Any, points: Any, width: int, height: int, relative: bool = False,
+                  radius: Optional[float] = None) -> List[Tuple[str, Box]]:
+    """
+    Turn requested ROIs and points into pixel boxes clipped to the image.
+
+    Args:
+        rois: JSON string or list of [x1, y1, x2, y2]
+        points: JSON string or list of [x, y]; each becomes a square of
+            half-side ``radius`` around the point
+        width, height: Full-resolution image size
+        relative: Coordinates are fractions of the image size, not pixels
+        radius: Point half-side in pixels (default 2% of the shorter side)
+
+    Returns:
+        ('roi' | 'point', box) per region, ROIs first
+
+    Raises:
+        ValueError: Malformed or non-finite input, no regions or too many, or
+            a region outside the image
+    """
+    roi_list = _parse_list(rois, 'rois', 4)
+    point_list = _parse_list(points, 'points', 2)
+    if not roi_list and not point_list:
+        raise ValueError("no regions requested: 'rois' and 'points' are empty")
+    if len(roi_list) + len(point_list) > MAX_REGIONS:
+        raise ValueError(f"at most {MAX_REGIONS} regions per request")
+
+    sx, sy = (width, height) if relative else (1, 1)
+    if radius is None:
+        radius = max(2, min(width, height) // 50)
+    elif not math.isfinite(radius) or radius < 0:
+        raise ValueError("'radius' must be a finite number of pixels, 0 or more")
+
+    raw = [('roi', (x1 * sx, y1 * sy, x2 * sx, y2 * sy)) for x1, y1, x2, y2 in roi_list]
+    raw += [('point', (x * sx - radius, y * sy - radius, x * sx + radius + 1, y * sy + radius + 1))
+            for x, y in point_list]
+
+    regions: List[Tuple[str, Box]] = []
+    for kind, (x1, y1, x2, y2) in raw:
+        # JSON allows Infinity and NaN, and 1e400 parses as inf
+        if not all(math.isfinite(v) for v in (x1, y1, x2, y2)):
+            raise ValueError(f"{kind} coordinates must be finite numbers")
+        box = (max(0, int(min(x1, x2))), max(0, int(min(y1, y2))),
+               min(width, int(round(max(x1, x2)))), min(height, int(round(max(y1, y2)))))
+        if box[2] <= box[0] or box[3] <= box[1]:
+            raise ValueError(f"{kind} {[round(v, 2) for v in (x1, y1, x2, y2)]} is outside the {width}x{height} image")
+        regions.append((kind, box))
+    return regions
+
+
+def dominant_colors(pixels: np.ndarray, k: int = 3,
+                    iterations: int = KMEANS_ITERATIONS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Up to ``k`` dominant colors of an (N, 3) uint8 pixel array.
+
+    Returns:
+        (centers, shares): (m, 3) float RGB centers and the fraction of
+        pixels belonging to each, sorted by share, m <= k
+    """
+    if k <= 0 or not len(pixels):
+        return np.empty((0, 3)), np.empty(0)
+    points = pixels.astype(np.float64)
+
+    # Seed with the means of the most populated histogram bins
+    shift = 8 - HISTOGRAM_BITS
+    q = (pixels >> shift).astype(np.intp)
+    codes = (q[:, 0] << (2 * HISTOGRAM_BITS)) | (q[:, 1] << HISTOGRAM_BITS) | q[:, 2]
+    counts = np.bincount(codes, minlength=1 << (3 * HISTOGRAM_BITS))
+    top = np.argsort(counts, kind='stable')[::-1][:k]
+    top = top[counts[top] > 0]
+    centers = np.stack([np.bincount(codes, weights=points[:, c], minlength=counts.size)[top]
+                        for c in range(3)], axis=1) / counts[top, None]
+
+    for _ in range(iterations):
+        d2 = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = np.argmin(d2, axis=1)
+        sizes = np.bincount(labels, minlength=len(centers))
+        keep = sizes > 0
+        sums = np.stack([np.bincount(labels, weights=points[:, c], minlength=len(centers))
+                         for c in range(3)], axis=1)
+        centers = sums[keep] / sizes[keep, None]
+
+    d2 = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    sizes = np.bincount(np.argmin(d2, axis=1), minlength=len(centers))
+    order = np.argsort(-sizes, kind='stable')
+    order = order[sizes[order] > 0]
+    return centers[order], sizes[order] / len(pixels)
+
+
+def summarize_region(crop: Image.Image, k: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (mean RGB, dominant centers, dominant shares) for one decoded region.
+
+    The mean is over every decoded pixel; clustering runs on a copy
+    downsampled to SAMPLE_MAX_SIDE with nearest-neighbour sampling, which
+    keeps real pixel colors instead of blending them at edges.
+    """
+    mean = as_array(crop).reshape(-1, 3).mean(axis=0)
+    if k <= 0:
+        return mean, np.empty((0, 3)), np.empty(0)
+    width, height = crop.size
+    scale = SAMPLE_MAX_SIDE / max(width, height)
+    if scale < 1:
+        crop = crop.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.NEAREST)
+    centers, shares = dominant_colors(as_array(crop).reshape(-1, 3), k)
+    return mean, centers, shares
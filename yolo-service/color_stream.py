@@ -0,0 +1,136 @@
+"""
+Incremental color detection for live video
+
+A ColorSession replaces posting a full frame to /detect-color on every
+tick. The client sends only what the color depends on: a small encoded
+crop of the region it watches, the crop's mean RGB, or the change of that
+mean since its previous sample (which is also the mean of a per-pixel
+difference image). The session keeps an exponentially smoothed running
+mean and a short history of matched names, and names the mean only when
+it has moved since the last lookup. The reported name is a majority vote
+over the history, so a one-frame flicker is never reported; callers get a
+result only when it changes.
+"""
+
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+RGB = Tuple[int, int, int]
+
+
+def parse_rgb(value: Any, name: str = 'rgb', signed: bool = False) -> np.ndarray:
+    """
+    A JSON-style [r, g, b] list (or a "r,g,b" string) as a float array.
+
+    Raises:
+        ValueError: Not three numbers, or outside 0-255 (-255-255 when ``signed``)
+    """
+    if isinstance(value, str):
+        value = value.strip().strip('[]').split(',')
+    try:
+        rgb = np.array([float(v) for v in value], dtype=np.float64)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"'{name}' must be three numbers: {e}") from e
+    low = -255.0 if signed else 0.0
+    if rgb.shape != (3,) or not np.all((rgb >= low) & (rgb <= 255.0)):
+        raise ValueError(f"'{name}' must be three numbers between {low:g} and 255")
+    return rgb
+
+
+class ColorSession:
+    """
+    Per-client state for a live color stream.
+
+    Args:
+        alpha: Weight of each new sample in the running mean (1 = no smoothing)
+        history: Matched names kept for the majority vote
+        metric: Color distance used for naming
+        lookup_tolerance: The mean is only named again once a channel has
+            moved more than this since the last lookup
+    """
+
+    def __init__(self, alpha: float = 0.3, history: int = 5, metric: str = 'rgb',
+                 lookup_tolerance: float = 2.0, device_id: Optional[str] = None):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.session_id = uuid.uuid4().hex
+        self.device_id = device_id
+        self.alpha = float(alpha)
+        self.history = max(1, int(history))
+        self.metric = metric
+        self.lookup_tolerance = float(lookup_tolerance)
+
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+        self.samples = 0
+        self.lookups = 0
+        self.changes = 0
+        # (name, palette index, smoothed RGB) per recent sample
+        self.matches: deque = deque(maxlen=self.history)
+        self.mean: Optional[np.ndarray] = None
+        self._last_sample: Optional[np.ndarray] = None
+        self._looked_up: Optional[np.ndarray] = None
+        self._match: Tuple[int, str] = (-1, 'Unknown')
+        self.reported_name: Optional[str] = None
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'session_id': self.session_id,
+            'device_id': self.device_id,
+            'alpha': self.alpha,
+            'history': self.history,
+            'metric': self.metric,
+            'samples': self.samples,
+            'lookups': self.lookups,
+            'changes': self.changes,
+            'color_name': self.reported_name,
+        }
+
+    def update(self, sample: Optional[np.ndarray], lookup: Callable[[RGB], Tuple[int, str]],
+               delta: Optional[np.ndarray] = None) -> Optional[Dict[str, Any]]:
+        """
+        Add one sample: a mean RGB, or ``delta``, the change since the previous one.
+
+        Args:
+            lookup: Returns (palette index, name) of the nearest palette color
+
+        Returns:
+            None while the reported name is unchanged; otherwise the new
+            name's palette index and smoothed RGB plus the previous name
+
+        Raises:
+            ValueError: A delta before any sample
+        """
+        with self.lock:
+            self.last_seen = time.monotonic()
+            if sample is None:
+                if self._last_sample is None:
+                    raise ValueError("the first sample of a session can't be a delta")
+                sample = np.clip(self._last_sample + delta, 0, 255)
+            self._last_sample = sample
+            self.mean = sample if self.mean is None else self.mean + self.alpha * (sample - self.mean)
+            self.samples += 1
+
+            rgb = tuple(int(v) for v in np.rint(self.mean))
+            if self._looked_up is None or np.abs(self.mean - self._looked_up).max() > self.lookup_tolerance:
+                self._match = lookup(rgb)
+                self._looked_up = self.mean
+                self.lookups += 1
+            index, name = self._match
+            self.matches.append((name, index, rgb))
+
+            # Majority vote; ties go to the most recent name
+            counts = Counter(n for n, _, _ in self.matches)
+            best = max(counts.values())
+            stable, index, rgb = next(e for e in reversed(self.matches) if counts[e[0]] == best)
+            if stable == self.reported_name:
+                return None
+            previous = self.reported_name
+            self.reported_name = stable
+            self.changes += 1
+            return {'index': index, 'rgb': rgb, 'previous': previous, 'sample_index': self.samples - 1}
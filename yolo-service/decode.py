@@ -0,0 +1,163 @@
+"""
+Image decoding for the YOLO service
+
+JPEG uploads are decoded at reduced resolution when the consumer doesn't
+need full size: libjpeg can scale by 1/2, 1/4 or 1/8 while decoding (draft
+mode), which skips most of the IDCT work. The detector only needs the
+longest side at its input size, and a mean color needs far fewer pixels
+still. Other formats are decoded normally.
+
+Pixel arrays are wrapped straight around the decoded bytes with
+np.frombuffer instead of going through np.array, which would copy them
+a second time.
+"""
+
+import io
+import math
+import time
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+# Formats whose decoder supports draft (DCT-domain) downscaling
+DRAFT_FORMATS = ('JPEG', 'MPO')
+
+
+class DecodedFrame:
+    """
+    A decoded RGB frame and how it relates to the uploaded image.
+
+    Attributes:
+        image: Decoded RGB image, possibly smaller than the upload
+        original_size: (width, height) of the uploaded image
+        scale: (x, y) factors from decoded to original pixel coordinates
+        decode_s: Seconds spent decoding
+    """
+
+    __slots__ = ('image', 'original_size', 'scale', 'decode_s')
+
+    def __init__(self, image: Image.Image, original_size: Tuple[int, int], decode_s: float):
+        self.image = image
+        self.original_size = original_size
+        self.scale = (original_size[0] / image.size[0], original_size[1] / image.size[1])
+        self.decode_s = decode_s
+
+
+def as_array(image: Image.Image) -> np.ndarray:
+    """Read-only uint8 array over an RGB or L image's bytes, without a second copy."""
+    width, height = image.size
+    shape = (height, width, 3) if image.mode == 'RGB' else (height, width)
+    return np.frombuffer(image.tobytes(), dtype=np.uint8).reshape(shape)
+
+
+def as_bgr_array(image: Image.Image) -> np.ndarray:
+    """Read-only BGR uint8 array of an RGB image (the layout ultralytics expects
+    of arrays); the channel swap happens while the bytes are packed."""
+    width, height = image.size
+    return np.frombuffer(image.tobytes('raw', 'BGR'), dtype=np.uint8).reshape(height, width, 3)
+
+
+def open_image(image_bytes: bytes) -> Image.Image:
+    """Open an upload lazily: the header is parsed, pixels are not decoded yet."""
+    return Image.open(io.BytesIO(image_bytes))
+
+
+def _draft(image: Image.Image, min_width: float, min_height: float) -> None:
+    """Ask the decoder for the smallest scale that keeps at least this size."""
+    if image.format in DRAFT_FORMATS:
+        image.draft('RGB', (max(1, math.ceil(min_width)), max(1, math.ceil(min_height))))
+
+
+def decode_image(image_bytes: bytes, min_size: Optional[int] = None) -> DecodedFrame:
+    """
+    Decode an upload to RGB.
+
+    Args:
+        image_bytes: Encoded image
+        min_size: Smallest acceptable longest side; JPEGs larger than this
+            are decoded at the smallest scale that keeps it. None decodes at
+            full resolution.
+
+    Raises:
+        OSError: The bytes aren't a readable image
+    """
+    start = time.perf_counter()
+    image = open_image(image_bytes)
+    original_size = image.size
+    longest = max(original_size)
+    if min_size and longest > min_size:
+        ratio = min_size / longest
+        _draft(image, original_size[0] * ratio, original_size[1] * ratio)
+    image = image.convert('RGB')
+    return DecodedFrame(image, original_size, time.perf_counter() - start)
+
+
+def decode_many(blobs: Sequence[bytes], min_size: Optional[int] = None,
+                executor: Optional[Executor] = None) -> List[Union[DecodedFrame, OSError]]:
+    """
+    Decode several uploads, in parallel on ``executor`` when given (Pillow
+    releases the GIL while decoding). An upload that can't be read yields
+    its OSError in place of a frame, so one bad image doesn't fail the rest.
+    """
+    def decode_one(image_bytes: bytes) -> Union[DecodedFrame, OSError]:
+        try:
+            return decode_image(image_bytes, min_size)
+        except OSError as e:
+            return e
+
+    if executor is None or len(blobs) < 2:
+        return [decode_one(b) for b in blobs]
+    return list(executor.map(decode_one, blobs))
+
+
+def decode_regions(image_bytes: bytes, boxes_fn: Callable[[int, int], List[Tuple[int, int, int, int]]],
+                   min_side: Optional[int] = 16) -> Tuple[List[Image.Image], List[Tuple[int, int, int, int]], float]:
+    """
+    Decode just enough of an upload to read several regions.
+
+    ``boxes_fn(width, height)`` returns the regions (x1, y1, x2, y2) in
+    full-resolution pixels, computed from the header before any decoding.
+    JPEGs are decoded once, at the smallest scale that keeps the smallest
+    region's shorter side at ``min_side`` pixels or more (None decodes at
+    full resolution); each region is then cropped.
+
+    Returns:
+        (RGB crops, regions in full-resolution pixels, decode seconds)
+
+    Raises:
+        OSError: The bytes aren't a readable image
+    """
+    start = time.perf_counter()
+    image = open_image(image_bytes)
+    width, height = image.size
+    regions = boxes_fn(width, height)
+    side = min(min(x2 - x1, y2 - y1) for x1, y1, x2, y2 in regions)
+    if min_side and side > min_side:
+        ratio = min_side / side
+        _draft(image, width * ratio, height * ratio)
+
+    # Map the regions onto the (possibly reduced) decoded image
+    sx, sy = image.size[0] / width, image.size[1] / height
+    crops = []
+    for x1, y1, x2, y2 in regions:
+        crop_box = (int(x1 * sx), int(y1 * sy), max(int(x1 * sx) + 1, round(x2 * sx)),
+                    max(int(y1 * sy) + 1, round(y2 * sy)))
+        crops.append(image.crop(crop_box).convert('RGB'))
+    return crops, regions, time.perf_counter() - start
+
+
+def decode_region(image_bytes: bytes, box_fn: Callable[[int, int], Tuple[int, int, int, int]],
+                  min_side: Optional[int] = 16) -> Tuple[Image.Image, Tuple[int, int, int, int], float]:
+    """
+    Decode just enough of an upload to read one region; see decode_regions().
+
+    Returns:
+        (RGB crop, region in full-resolution pixels, decode seconds)
+
+    Raises:
+        OSError: The bytes aren't a readable image
+    """
+    crops, regions, decode_s = decode_regions(image_bytes, lambda w, h: [box_fn(w, h)], min_side)
+    return crops[0], regions[0], decode_s
@@ -0,0 +1,254 @@
+# YOLO model wrapper with GPU support, batching and traffic-light focused inference
+
+import gc
+import importlib.util
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from backends import load_model, resolve_model, set_onnx_threads
+from decode import as_bgr_array
+from geometry import box_ios, nms
+from logs import get_logger
+from tiling import tile_grid, tile_views
+
+log = get_logger(__name__)
+
+# PyTorch (for GPU support) is imported when the first model is created,
+# not with this module, so the web process can start serving without it
+TORCH_AVAILABLE = importlib.util.find_spec("torch") is not None
+torch = None
+
+TRAFFIC_LIGHT_CLASS = "traffic light"
+
+
+def import_frameworks() -> None:
+    """Import torch and ultralytics now rather than on first model creation."""
+    global torch, TORCH_AVAILABLE
+    if torch is None and TORCH_AVAILABLE:
+        try:
+            import torch
+        except ImportError as e:
+            log.warning("PyTorch failed to import", error=str(e))
+            TORCH_AVAILABLE = False
+    import ultralytics  # noqa: F401
+
+
+def synthetic_frame(size: Tuple[int, int] = (640, 480), seed: int = 0) -> Image.Image:
+    """
+    Deterministic noisy gradient frame for warm-up. Unlike a blank frame it
+    yields candidate boxes, so NMS and post-processing get warmed up too.
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(40, 200, height, dtype=np.float32)[:, None, None]
+    pixels = gradient + rng.normal(0, 40, size=(height, width, 3)).astype(np.float32)
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+
+class OptimizedYOLOService:
+    """YOLO Service with GPU support and optimization"""
+
+    def __init__(self, model_path='yolov8n.pt', backend='torch', threads=None,
+                 imgsz=640, class_filter=True):
+        self.backend = backend
+        self.threads = threads
+        self.imgsz = imgsz
+        import_frameworks()
+        # Exported backends target CPU-only nodes
+        self.device = self._get_device() if backend == 'torch' else 'cpu'
+        log.info("initializing YOLO model", backend=backend, device=self.device)
+
+        # Exports are traced at the configured input size
+        self.model_file = resolve_model(model_path, backend, imgsz)
+        self.model = load_model(self.model_file, backend, imgsz, threads=threads)
+        if torch is not None and backend == 'torch':
+            self.model.to(self.device)
+
+        self.model_names = self.model.names
+        log.info("model loaded", model=self.model_file, classes=len(self.model_names))
+
+        # Pass the class filter into inference so NMS and post-processing
+        # only ever see traffic lights
+        self.traffic_light_id = next(
+            (int(i) for i, name in self.model_names.items() if name == TRAFFIC_LIGHT_CLASS), None)
+        self.classes = [self.traffic_light_id] if class_filter and self.traffic_light_id is not None else None
+
+    def _get_device(self):
+        """Determine the best device to use"""
+        if torch is None:
+            log.warning("PyTorch not available, running in CPU-only mode")
+            return 'cpu'
+
+        if torch.cuda.is_available():
+            log.info("CUDA available", gpu=torch.cuda.get_device_name(0))
+            return 'cuda'
+        elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+            log.info("MPS (Apple Silicon) available")
+            return 'mps'
+        else:
+            log.info("no GPU available, using CPU")
+            return 'cpu'
+
+    def _predict(self, source, conf, imgsz):
+        kwargs = dict(verbose=False, conf=conf, device=self.device, imgsz=imgsz or self.imgsz)
+        if self.classes is not None:
+            kwargs['classes'] = self.classes
+        with torch.no_grad() if torch is not None else nullcontext():
+            return self.model(source, **kwargs)
+
+    def detect(self, image, conf=0.15, imgsz=None):
+        """Perform detection with memory optimization"""
+        return self._predict(image, conf, imgsz)
+
+    def detect_batch(self, images, conf=0.15, imgsz=None):
+        """Run several images through the model in one forward pass.
+
+        Returns one single-element results list per image, matching the
+        shape returned by detect().
+        """
+        results = self._predict(list(images), conf, imgsz)
+        return [[result] for result in results]
+
+    def traffic_light_boxes(self, results, offset: Tuple[float, float] = (0.0, 0.0)) -> List[Dict[str, Any]]:
+        """Extract traffic-light boxes from raw model results, shifted by ``offset``."""
+        dx, dy = offset
+        boxes: List[Dict[str, Any]] = []
+        for result in results:
+            if result.boxes is None:
+                continue
+
+            for coords, conf, cls_id in zip(result.boxes.xyxy.tolist(),
+                                            result.boxes.conf.tolist(),
+                                            result.boxes.cls.tolist()):
+                class_name = self.model_names.get(int(cls_id), str(cls_id))
+                if class_name != TRAFFIC_LIGHT_CLASS:
+                    continue
+
+                x1, y1, x2, y2 = map(float, coords)
+                boxes.append({
+                    "box": {"x1": x1 + dx, "y1": y1 + dy, "x2": x2 + dx, "y2": y2 + dy},
+                    "confidence": float(conf),
+                    "class_id": int(cls_id),
+                    "class_name": class_name,
+                })
+        return boxes
+
+    def detect_adaptive(self, image: Image.Image, conf=0.15, low_imgsz=320, roi_imgsz=320,
+                        small_px=24, refine_conf=0.35,
+                        run: Optional[Callable[..., Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Two-stage detection for small CPUs.
+
+        Runs the whole frame at ``low_imgsz`` first. Traffic lights that come
+        back small (shorter than ``small_px`` in frame pixels) or below
+        ``refine_conf`` are re-detected on square crops around them at
+        ``roi_imgsz``, all crops in one batched call, which effectively zooms
+        in on them. Confident, large detections are kept from the first pass.
+        """
+        run = run or self.detect
+        boxes = self.traffic_light_boxes(run(image, conf=conf, imgsz=low_imgsz))
+
+        uncertain = [b for b in boxes
+                     if b["box"]["y2"] - b["box"]["y1"] < small_px or b["confidence"] < refine_conf]
+        if not uncertain:
+            return boxes
+
+        rois = [self._roi_around(b["box"], image.size, roi_imgsz) for b in uncertain]
+        crops = [image.crop(roi) for roi in rois]
+        refined: List[Dict[str, Any]] = []
+        for roi, results in zip(rois, self.detect_batch(crops, conf=conf, imgsz=roi_imgsz)):
+            refined.extend(self.traffic_light_boxes(results, offset=(roi[0], roi[1])))
+
+        confident = [b for b in boxes if not any(b is u for u in uncertain)]
+        return nms(confident + refined, iou_threshold=0.5)
+
+    def detect_tiled(self, image: Image.Image, conf=0.15, tiles: Tuple[int, int] = (3, 2), overlap=0.2,
+                     top=1.0, full_frame=True, imgsz=None, merge_threshold=0.5) -> List[Dict[str, Any]]:
+        """
+        High-resolution detection on overlapping tiles (see tiling.py).
+
+        The frame is packed into the model's BGR array layout once (which
+        ultralytics would otherwise do itself for a PIL image); the ``tiles``
+        (cols, rows) grid over its upper ``top`` fraction is cut from that
+        array as views and, with ``full_frame``, the whole frame is added,
+        all in one batched call. Boxes are shifted back to frame
+        pixels and merged across tiles with NMS on intersection over the
+        smaller box, so a light cut by a tile edge folds into the whole one.
+        """
+        frame = as_bgr_array(image)
+        grid = tile_grid(image.size, *tiles, overlap=overlap, top=top)
+        sources = tile_views(frame, grid)
+        offsets = [(x1, y1) for x1, y1, _, _ in grid]
+        if full_frame:
+            sources.append(frame)
+            offsets.append((0, 0))
+
+        boxes: List[Dict[str, Any]] = []
+        for offset, results in zip(offsets, self.detect_batch(sources, conf=conf, imgsz=imgsz)):
+            boxes.extend(self.traffic_light_boxes(results, offset=offset))
+        return nms(boxes, iou_threshold=merge_threshold, overlap=box_ios)
+
+    @staticmethod
+    def _roi_around(box: Dict[str, float], frame_size: Sequence[int], min_side: int) -> Tuple[int, int, int, int]:
+        """Square crop centred on ``box``, about four box-heights wide, clipped to the frame."""
+        width, height = frame_size
+        side = max(min_side // 2, 4 * int(max(box["x2"] - box["x1"], box["y2"] - box["y1"])))
+        side = min(side, width, height)
+        cx = (box["x1"] + box["x2"]) / 2
+        cy = (box["y1"] + box["y2"]) / 2
+        x1 = int(min(max(cx - side / 2, 0), width - side))
+        y1 = int(min(max(cy - side / 2, 0), height - side))
+        return x1, y1, x1 + side, y1 + side
+
+    def warmup(self, runs=1, sizes: Sequence[Tuple[int, int]] = ((640, 480),), batch=0):
+        """
+        Run inference on synthetic frames so the first real request isn't slow.
+
+        Each run detects one frame per entry in ``sizes`` (frames of another
+        aspect ratio letterbox to another input shape, which GPU kernels and
+        exported graphs specialise on) and, with ``batch`` > 1, one batch of
+        that many frames for the micro-batcher's shapes.
+        """
+        if runs <= 0:
+            return 0.0
+        start = time.time()
+        frames = [synthetic_frame(size, seed=i) for i, size in enumerate(sizes)] or [synthetic_frame()]
+        self.detect(frames[0])
+        # ultralytics creates the ONNX Runtime session lazily on the first
+        # call; rebuild it with the configured thread count, then warm it up.
+        if self.backend == 'onnx' and self.threads:
+            if set_onnx_threads(self.model, self.model_file, self.threads):
+                self.detect(frames[0])
+            else:
+                log.warning("could not set ONNX Runtime thread count", threads=self.threads)
+        for run in range(runs):
+            for frame in frames[0 if run else 1:]:
+                self.detect(frame)
+            if batch > 1:
+                self.detect_batch([frames[0]] * batch)
+        return time.time() - start
+
+    def cleanup_memory(self):
+        """Force garbage collection and clear GPU cache"""
+        gc.collect()
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def cuda_memory_allocated(self):
+        """Bytes currently allocated on the CUDA device, or None without CUDA"""
+        if self.device == 'cuda':
+            return torch.cuda.memory_allocated()
+        return None
+
+
+def nullcontext():
+    """Context manager for non-PyTorch environments"""
+    class _NullContext:
+        def __enter__(self):
+            return self
+        def __exit__(self, exc_type, exc_val, exc_tb):
+            return False
+    return _NullContext()
@@ -0,0 +1,39 @@
+"""
+Bounding-box helpers shared by tracking, adaptive and tiled inference
+"""
+
+from typing import Any, Callable, Dict, List
+
+
+def box_iou(a: Dict[str, float], b: Dict[str, float]) -> float:
+    ix1, iy1 = max(a['x1'], b['x1']), max(a['y1'], b['y1'])
+    ix2, iy2 = min(a['x2'], b['x2']), min(a['y2'], b['y2'])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    area_a = (a['x2'] - a['x1']) * (a['y2'] - a['y1'])
+    area_b = (b['x2'] - b['x1']) * (b['y2'] - b['y1'])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def box_ios(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """Intersection over the smaller box: 1.0 when one box lies inside the other."""
+    ix1, iy1 = max(a['x1'], b['x1']), max(a['y1'], b['y1'])
+    ix2, iy2 = min(a['x2'], b['x2']), min(a['y2'], b['y2'])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    smaller = min((a['x2'] - a['x1']) * (a['y2'] - a['y1']), (b['x2'] - b['x1']) * (b['y2'] - b['y1']))
+    return inter / smaller if smaller > 0 else 0.0
+
+
+def nms(detections: List[Dict[str, Any]], iou_threshold: float = 0.5,
+        overlap: Callable[[Dict[str, float], Dict[str, float]], float] = box_iou) -> List[Dict[str, Any]]:
+    """
+    Greedy non-maximum suppression over detection dicts with 'box' and 'confidence'.
+
+    ``overlap`` scores two boxes; box_ios also merges a light cut by a tile
+    edge into the whole one from the neighbouring tile.
+    """
+    kept: List[Dict[str, Any]] = []
+    for detection in sorted(detections, key=lambda d: -d['confidence']):
+        if all(overlap(detection['box'], k['box']) < iou_threshold for k in kept):
+            kept.append(detection)
+    return kept
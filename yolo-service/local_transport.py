@@ -0,0 +1,149 @@
+"""
+Unix domain socket transport for clients on the same host
+
+An alternative to HTTP multipart for the Node back end when both run on
+one host (in docker-compose, with the socket on a shared volume). Frames
+are length-prefixed, so there is no multipart encoding or parsing, and the
+image is received into one buffer that is handed to the decoder as is.
+
+Each connection carries any number of requests, answered in order:
+
+    request:  u32 header length | u32 payload length | header | payload
+    response: u32 body length   | u32 status         | body
+
+All integers are big-endian. The header and the response body are UTF-8
+JSON; the payload is the encoded image. The header's "op" selects the
+operation (e.g. "detect", "ping"); the other fields are its options.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+_PREFIX = struct.Struct('>II')
+MAX_HEADER_BYTES = 64 * 1024
+
+# handler(header, payload) -> (status, JSON-serializable body)
+Handler = Callable[[Dict[str, Any], bytearray], Tuple[int, Dict[str, Any]]]
+
+
+def _recv_into(sock: socket.socket, view: memoryview) -> bool:
+    """Fill ``view`` from ``sock``; False if the peer closed before it was full."""
+    while view:
+        n = sock.recv_into(view)
+        if not n:
+            return False
+        view = view[n:]
+    return True
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytearray]:
+    buf = bytearray(size)
+    return buf if _recv_into(sock, memoryview(buf)) else None
+
+
+def _send_response(sock: socket.socket, status: int, body: Dict[str, Any]) -> None:
+    data = json.dumps(body).encode()
+    sock.sendall(_PREFIX.pack(len(data), status) + data)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    server: 'LocalTransportServer'
+
+    def handle(self) -> None:
+        sock = self.request
+        while True:
+            prefix = _recv_exact(sock, _PREFIX.size)
+            if prefix is None:
+                return
+            header_len, payload_len = _PREFIX.unpack(prefix)
+            if header_len > MAX_HEADER_BYTES or payload_len > self.server.max_payload:
+                # The oversized frame can't be skipped cheaply; drop the connection
+                _send_response(sock, 413, {"error": f"frame larger than {self.server.max_payload} bytes"})
+                return
+            header_bytes = _recv_exact(sock, header_len)
+            payload = _recv_exact(sock, payload_len) if header_bytes is not None else None
+            if payload is None:
+                return
+            try:
+                header = json.loads(header_bytes) if header_len else {}
+                if not isinstance(header, dict):
+                    raise ValueError("header must be a JSON object")
+            except ValueError as e:
+                _send_response(sock, 400, {"error": f"Invalid header: {e}"})
+                continue
+            try:
+                status, body = self.server.handler(header, payload)
+            except Exception as e:
+                log.error("local transport request failed", op=header.get("op"), error=str(e))
+                status, body = 500, {"error": "Internal error"}
+            _send_response(sock, status, body)
+
+
+class LocalTransportServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Serves ``handler`` on a Unix socket at ``path``, one thread per connection.
+
+    A stale socket file left by a previous run is replaced. ``mode`` sets
+    the socket file's permissions.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: str, handler: Handler, max_payload: int = 32 * 1024 * 1024, mode: int = 0o660):
+        self.handler = handler
+        self.max_payload = max_payload
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, _RequestHandler)
+        os.chmod(path, mode)
+        self.path = path
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.serve_forever, name='local-transport', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class LocalTransportClient:
+    """Reference client: one connection, requests sent and answered in order."""
+
+    def __init__(self, path: str, timeout: Optional[float] = 30.0):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(path)
+        self._lock = threading.Lock()
+
+    def request(self, header: Dict[str, Any], payload: bytes = b'') -> Tuple[int, Dict[str, Any]]:
+        """Send one request and return (status, decoded JSON body)."""
+        header_bytes = json.dumps(header).encode()
+        with self._lock:
+            self._sock.sendall(_PREFIX.pack(len(header_bytes), len(payload)) + header_bytes)
+            self._sock.sendall(payload)
+            prefix = _recv_exact(self._sock, _PREFIX.size)
+            if prefix is None:
+                raise ConnectionError("server closed the connection")
+            length, status = _PREFIX.unpack(prefix)
+            body = _recv_exact(self._sock, length)
+            if body is None:
+                raise ConnectionError("server closed the connection")
+        return status, json.loads(body)
+
+    def close(self) -> None:
+        self._sock.close()
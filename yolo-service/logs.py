@@ -0,0 +1,122 @@
+"""
+Structured, rate-limited logging for the YOLO service
+
+Log calls take an event message plus keyword fields:
+
+    log.info("model loaded", backend="onnx", classes=80)
+
+Records are written as ``key=value`` text or, with LOG_FORMAT=json, one JSON
+object per line. Repeats of the same message from the same logger are
+dropped for LOG_RATE_LIMIT_S seconds; the next record that gets through
+carries the number that were dropped, so a burst of identical warnings on
+the request path costs one write instead of hundreds.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+_RESERVED = ('exc_info', 'stack_info', 'stacklevel', 'extra')
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger adapter that turns keyword arguments into structured fields."""
+
+    def process(self, msg, kwargs):
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _RESERVED}
+        kwargs.setdefault('extra', {})['fields'] = fields
+        return msg, kwargs
+
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, json_output: bool = False):
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields: Dict[str, Any] = dict(getattr(record, 'fields', None) or {})
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            fields['suppressed'] = suppressed
+        if record.exc_info:
+            fields['exc'] = self.formatException(record.exc_info)
+
+        if self.json_output:
+            return json.dumps({
+                'ts': round(record.created, 3),
+                'level': record.levelname.lower(),
+                'logger': record.name,
+                'msg': record.getMessage(),
+                **fields,
+            }, default=str)
+
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+        text = f"{timestamp} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        if fields:
+            text += ' ' + ' '.join(f"{k}={_text_value(v)}" for k, v in fields.items())
+        return text
+
+
+def _text_value(value: Any) -> str:
+    text = str(value)
+    return json.dumps(text) if (' ' in text or '=' in text or not text) else text
+
+
+class RateLimitFilter(logging.Filter):
+    """Let one record per (logger, message) through every ``interval_s`` seconds."""
+
+    def __init__(self, interval_s: float = 10.0):
+        super().__init__()
+        self.interval_s = interval_s
+        self._last: Dict[Tuple[str, str], float] = {}
+        self._suppressed: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval_s <= 0:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval_s:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            record.suppressed = self._suppressed.pop(key, 0)
+            if len(self._last) > 4096:
+                # Messages are templates, so this only grows if callers
+                # interpolate values into them; drop the stale entries
+                cutoff = now - self.interval_s
+                self._last = {k: t for k, t in self._last.items() if t >= cutoff}
+        return True
+
+
+_configured = False
+
+
+def configure_logging(level: str = None, fmt: str = None, rate_limit_s: float = None) -> None:
+    """Install the structured handler on the root logger (once per process)."""
+    global _configured
+    if _configured:
+        return
+    _configured = True
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'text')
+    if rate_limit_s is None:
+        rate_limit_s = float(os.environ.get('LOG_RATE_LIMIT_S', '10'))
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(StructuredFormatter(json_output=fmt == 'json'))
+    handler.addFilter(RateLimitFilter(rate_limit_s))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level.upper())
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(name), {})
@@ -0,0 +1,149 @@
+"""
+Memory-pressure-driven cleanup for the YOLO service
+
+Garbage collection and CUDA cache flushes run on a background thread, only
+when RSS or CUDA memory crosses a high watermark or on a slow periodic
+timer, never on a request thread.
+"""
+
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process, or 0 if it can't be read."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    if resource is not None:
+        # ru_maxrss is the peak, in KB on Linux and bytes on macOS; better than nothing
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if peak > 1 << 32 else peak * 1024
+    return 0
+
+
+class MemoryManager:
+    """
+    Watch process memory and run cleanup when it is actually needed.
+
+    Args:
+        collect: Cleanup callable (gc.collect plus any device cache flush)
+        rss_high_mb: Collect when RSS exceeds this many MB (0 disables)
+        cuda_high_mb: Collect when CUDA allocated memory exceeds this many MB
+        cuda_memory: Returns CUDA bytes allocated, or None without CUDA
+        interval_s: Collect at least this often regardless of pressure (0 disables)
+        check_interval_s: How often memory is sampled
+        min_gap_s: Minimum time between two pressure-triggered collections,
+            so a process that stays above the watermark doesn't thrash
+        on_collect: Called with (reason, pause seconds) after each
+            collection, e.g. to export the pause as a metric
+    """
+
+    def __init__(self, collect: Callable[[], Any], rss_high_mb: float = 0,
+                 cuda_high_mb: float = 0, cuda_memory: Optional[Callable[[], int]] = None,
+                 interval_s: float = 300.0, check_interval_s: float = 1.0,
+                 min_gap_s: float = 5.0, on_collect: Optional[Callable[[str, float], Any]] = None):
+        self.collect_fn = collect
+        self.rss_high = rss_high_mb * 1024 * 1024
+        self.cuda_high = cuda_high_mb * 1024 * 1024
+        self.cuda_memory = cuda_memory
+        self.interval_s = interval_s
+        self.check_interval_s = check_interval_s
+        self.min_gap_s = min_gap_s
+        self.on_collect = on_collect
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_collect = time.monotonic()
+
+        self.collections: Counter = Counter()
+        self.pause_total_s = 0.0
+        self.pause_max_s = 0.0
+        self.last_pause_s = 0.0
+        self.last_reason: Optional[str] = None
+        self.rss_bytes = current_rss_bytes()
+        self.cuda_bytes = 0
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='memory-manager', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def sample(self) -> None:
+        self.rss_bytes = current_rss_bytes()
+        if self.cuda_memory is not None:
+            try:
+                self.cuda_bytes = int(self.cuda_memory() or 0)
+            except Exception:
+                self.cuda_bytes = 0
+
+    def decide(self, now: float) -> Optional[str]:
+        """Return the reason to collect now, or None."""
+        since_last = now - self._last_collect
+        if since_last >= self.min_gap_s:
+            if self.rss_high and self.rss_bytes > self.rss_high:
+                return 'rss'
+            if self.cuda_high and self.cuda_bytes > self.cuda_high:
+                return 'cuda'
+        if self.interval_s and since_last >= self.interval_s:
+            return 'timer'
+        return None
+
+    def collect(self, reason: str = 'manual') -> float:
+        """Run cleanup now and record the pause. Returns the pause in seconds."""
+        start = time.perf_counter()
+        self.collect_fn()
+        pause = time.perf_counter() - start
+        with self._lock:
+            self._last_collect = time.monotonic()
+            self.collections[reason] += 1
+            self.pause_total_s += pause
+            self.pause_max_s = max(self.pause_max_s, pause)
+            self.last_pause_s = pause
+            self.last_reason = reason
+        self.sample()
+        if self.on_collect is not None:
+            self.on_collect(reason, pause)
+        return pause
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.check_interval_s):
+            self.sample()
+            reason = self.decide(time.monotonic())
+            if reason is not None:
+                self.collect(reason)
+
+    def collection_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.collections)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = sum(self.collections.values())
+            return {
+                'rss_mb': round(self.rss_bytes / 1024 / 1024, 1),
+                'cuda_mb': round(self.cuda_bytes / 1024 / 1024, 1),
+                'rss_high_mb': round(self.rss_high / 1024 / 1024, 1),
+                'cuda_high_mb': round(self.cuda_high / 1024 / 1024, 1),
+                'collections': dict(self.collections),
+                'last_reason': self.last_reason,
+                'pause_last_ms': round(self.last_pause_s * 1000, 2),
+                'pause_max_ms': round(self.pause_max_s * 1000, 2),
+                'pause_mean_ms': round(self.pause_total_s / count * 1000, 2) if count else 0.0,
+            }
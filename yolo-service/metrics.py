@@ -0,0 +1,208 @@
+"""
+Request instrumentation for the YOLO service
+
+Per-request stage timers (monotonic clock) and a small Prometheus registry
+rendered in the text exposition format at /metrics. Histograms and counters
+are updated on request threads under a lock; gauges are read from callbacks
+at scrape time, so cache, queue and device state cost nothing per request.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans a cache hit (sub-millisecond) to a slow CPU inference
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+GaugeValue = Union[float, Dict[Tuple[str, ...], float]]
+
+
+class Timings:
+    """Per-request stage timer. Repeated stages accumulate."""
+
+    __slots__ = ('start', 'stages')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def merge(self, stages: Dict[str, float]) -> None:
+        """Add stage times measured elsewhere (e.g. in a worker process)."""
+        for name, seconds in stages.items():
+            self.add(name, seconds)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def as_ms(self) -> Dict[str, float]:
+        timings = {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()}
+        timings['total'] = round(self.elapsed() * 1000, 3)
+        return timings
+
+
+def timed(timings: Optional[Timings], name: str):
+    """``timings.stage(name)``, or a no-op context when there is nothing to record into."""
+    return timings.stage(name) if timings is not None else _NULL_STAGE
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts (last one is +Inf), sum, count]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = [(labels, list(s[0]), s[1], s[2]) for labels, s in sorted(self._series.items())]
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        lines.extend(f'{self.name}{_labels(self.labelnames, labels)} {_number(v)}' for labels, v in values)
+        return lines
+
+
+class CallbackMetric:
+    """
+    A gauge (or a counter kept elsewhere) read at scrape time.
+
+    ``read`` returns a number, a {label values: number} dict, or None to
+    skip the metric.
+    """
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Optional[GaugeValue]],
+                 labelnames: Sequence[str] = (), kind: str = 'gauge'):
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        value = self.read()
+        if value is None:
+            return []
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        if isinstance(value, dict):
+            lines.extend(f'{self.name}{_labels(self.labelnames, labels)} {_number(v)}'
+                         for labels, v in sorted(value.items()))
+        else:
+            lines.append(f'{self.name} {_number(value)}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self._add(Histogram(*args, **kwargs))
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self._add(Counter(*args, **kwargs))
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Optional[GaugeValue]],
+              labelnames: Sequence[str] = ()) -> CallbackMetric:
+        return self._add(CallbackMetric(name, help_text, read, labelnames))
+
+    def counter_from(self, name: str, help_text: str, read: Callable[[], Optional[GaugeValue]],
+                     labelnames: Sequence[str] = ()) -> CallbackMetric:
+        """A counter whose running total is kept by another object."""
+        return self._add(CallbackMetric(name, help_text, read, labelnames, kind='counter'))
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # A failing callback must not take down the whole scrape
+                continue
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,133 @@
+"""
+Per-frame detection pipeline shared by the web app and the inference workers
+
+Everything here works on a decoded frame and a model wrapper passed in by
+the caller, so it can run either in the request process or in a worker
+process without importing the Flask app.
+"""
+
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from camera import DEFAULT_PROFILE, REFERENCE_SIZE, CameraProfile
+from decode import DecodedFrame, decode_many
+from metrics import Timings, timed
+from traffic_color import analyze_traffic_light_colors
+
+
+def calculate_distance(box: Dict[str, float], frame_size: Tuple[int, int] = REFERENCE_SIZE,
+                       camera: Optional[CameraProfile] = None) -> float:
+    """
+    Estimate distance to the traffic light from its bounding box.
+
+    ``box`` is in pixels of a ``frame_size`` (width, height) upload; the
+    camera's focal length is scaled to that size. Without a ``camera``, a
+    3-aspect vertical housing (0.8 m) and 650 px focal length at 1280x720
+    are assumed.
+    """
+    return (camera or DEFAULT_PROFILE).distance(box, frame_size)
+
+
+def detect_traffic_lights(service, image: Image.Image, conf: float = 0.15,
+                          adaptive: Optional[Dict[str, Any]] = None,
+                          run: Optional[Callable[..., Any]] = None,
+                          tiled: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Traffic-light boxes for one frame.
+
+    Args:
+        service: OptimizedYOLOService
+        image: RGB frame
+        conf: Confidence threshold
+        adaptive: detect_adaptive() options, or None for a single full pass
+        run: Replacement for service.detect (e.g. a micro-batcher)
+        tiled: detect_tiled() options; takes precedence over ``adaptive``
+    """
+    if tiled is not None:
+        return service.detect_tiled(image, conf=conf, **tiled)
+    if adaptive is not None:
+        return service.detect_adaptive(image, conf=conf, run=run, **adaptive)
+    run = run or service.detect
+    return service.traffic_light_boxes(run(image, conf=conf))
+
+
+def scale_boxes(boxes: List[Dict[str, Any]], scale: Tuple[float, float]) -> List[Dict[str, Any]]:
+    """Map detections from decoded-frame to original-image pixel coordinates."""
+    sx, sy = scale
+    if sx == 1.0 and sy == 1.0:
+        return boxes
+    return [{**d, "box": {"x1": d["box"]["x1"] * sx, "y1": d["box"]["y1"] * sy,
+                          "x2": d["box"]["x2"] * sx, "y2": d["box"]["y2"] * sy}}
+            for d in boxes]
+
+
+def describe_detections(image: Image.Image, boxes: List[Dict[str, Any]],
+                        scale: Tuple[float, float] = (1.0, 1.0),
+                        timings: Optional[Timings] = None,
+                        camera: Optional[CameraProfile] = None) -> List[Dict[str, Any]]:
+    """
+    Add color and distance to each traffic-light box.
+
+    ``boxes`` are in ``image`` pixels. If ``image`` was decoded at reduced
+    size, ``scale`` maps them back so returned boxes and distances refer to
+    the original upload. Distances use ``camera`` (default: DEFAULT_PROFILE).
+    Stage times go to ``timings`` when given.
+    """
+    original_size = (round(image.width * scale[0]), round(image.height * scale[1]))
+    # Classify all boxes in one pass over the frame
+    with timed(timings, "color"):
+        colors = analyze_traffic_light_colors(image, [d["box"] for d in boxes])
+    detections: List[Dict[str, Any]] = []
+    with timed(timings, "distance"):
+        for detection, (color, scores) in zip(scale_boxes(boxes, scale), colors):
+            detections.append({
+                **detection,
+                "color": color,
+                "color_scores": scores,
+                # Estimate distance
+                "distance": calculate_distance(detection["box"], original_size, camera),
+            })
+    return detections
+
+
+def detect_batch(service, images: List[Image.Image], conf: float = 0.15,
+                 adaptive: Optional[Dict[str, Any]] = None,
+                 tiled: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+    """Traffic-light boxes for several frames, in one forward pass unless adaptive or tiled."""
+    if tiled is not None:
+        return [service.detect_tiled(image, conf=conf, **tiled) for image in images]
+    if adaptive is not None:
+        return [service.detect_adaptive(image, conf=conf, **adaptive) for image in images]
+    return [service.traffic_light_boxes(results) for results in service.detect_batch(images, conf=conf)]
+
+
+def detect_encoded_batch(service, blobs: Sequence[bytes], conf: float = 0.15,
+                         decode_size: Optional[int] = None, adaptive: Optional[Dict[str, Any]] = None,
+                         executor: Optional[Executor] = None,
+                         timings: Optional[Timings] = None,
+                         camera: Optional[CameraProfile] = None,
+                         tiled: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Decode, detect and describe several uploads as one batch.
+
+    Uploads are decoded in parallel on ``executor``, and the readable ones go
+    through the model together. Returns one /detect-style result per upload,
+    in order; an unreadable upload gets ``{"error": ...}`` instead.
+    """
+    with timed(timings, "decode"):
+        decoded = decode_many(blobs, decode_size, executor)
+    frames = [f for f in decoded if isinstance(f, DecodedFrame)]
+    with timed(timings, "inference"):
+        boxes = detect_batch(service, [f.image for f in frames], conf, adaptive, tiled) if frames else []
+
+    described = iter(describe_detections(f.image, b, f.scale, timings, camera) for f, b in zip(frames, boxes))
+    results: List[Dict[str, Any]] = []
+    for frame in decoded:
+        if not isinstance(frame, DecodedFrame):
+            results.append({"error": f"Invalid image: {str(frame)}"})
+            continue
+        detections = next(described)
+        results.append({"count": len(detections), "detections": detections, "decode_time": frame.decode_s})
+    return results
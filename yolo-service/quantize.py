@@ -0,0 +1,180 @@
+"""
+INT8 quantization of the YOLO model for CPU nodes
+
+Writes an INT8 copy of the weights, calibrated on a local folder of frames
+(ideally traffic-light scenes from the cameras it will serve):
+
+    onnx, static    ONNX Runtime post-training quantization in QDQ format:
+                    activation ranges are calibrated on the frames, convs
+                    run as INT8 kernels. The default.
+    onnx, dynamic   Weights only, activations quantized per call; needs no
+                    frames. Conv nets often gain little from it on ONNX
+                    Runtime, so compare both with the eval command.
+    openvino        Static quantization through ultralytics' export (NNCF);
+                    needs the openvino and nncf packages.
+
+The DFL layer that decodes box coordinates always stays FP32; --fp32-head
+keeps the whole detection head in FP32, trading some speed for accuracy.
+
+Serve the result with YOLO_MODEL_PATH (the backend follows from the file
+name), after checking it with bench/eval_quantized.py:
+
+    python quantize.py --calibration frames/ [--model yolov8n.pt] [--format onnx] [--mode static]
+    python bench/eval_quantized.py --candidate yolov8n_int8.onnx --frames labelled/
+    YOLO_MODEL_PATH=yolov8n_int8.onnx python serve.py
+"""
+
+import argparse
+import os
+import re
+import tempfile
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from PIL import Image
+
+from backends import resolve_model
+from logs import configure_logging, get_logger
+
+log = get_logger('quantize')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+CALIBRATION_METHODS = ('minmax', 'entropy', 'percentile')
+
+
+def calibration_images(folder: str, limit: int = 300) -> List[str]:
+    """Up to ``limit`` image paths from ``folder``, spread evenly over its sorted listing."""
+    names = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    if not names:
+        raise SystemExit(f"no images in {folder}")
+    step = max(1, len(names) // limit)
+    return [os.path.join(folder, name) for name in names[::step][:limit]]
+
+
+def letterbox(image: Image.Image, imgsz: int = 640) -> np.ndarray:
+    """(1, 3, imgsz, imgsz) float32 model input, letterboxed with gray like ultralytics' preprocessing."""
+    image = image.convert('RGB')
+    scale = imgsz / max(image.size)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    canvas = Image.new('RGB', (imgsz, imgsz), (114, 114, 114))
+    canvas.paste(image.resize(size, Image.BILINEAR), ((imgsz - size[0]) // 2, (imgsz - size[1]) // 2))
+    return (np.asarray(canvas, dtype=np.float32) / 255.0).transpose(2, 0, 1)[None]
+
+
+def excluded_nodes(model, fp32_head: bool = False) -> List[str]:
+    """
+    Nodes of an exported YOLOv8 graph to keep in FP32: the DFL box decoding,
+    or with ``fp32_head`` the whole detection head (the last /model.N/ module).
+    """
+    names = [node.name for node in model.graph.node]
+    modules = [int(m.group(1)) for m in (re.match(r'/model\.(\d+)/', n) for n in names) if m]
+    if not modules:
+        return []
+    head = f'/model.{max(modules)}/'
+    keep = head if fp32_head else head + 'dfl/'
+    return [n for n in names if n.startswith(keep)]
+
+
+def quantize_onnx(model_path: str, output: str, calibration: Optional[str] = None, mode: str = 'static',
+                  imgsz: int = 640, limit: int = 300, method: str = 'minmax', fp32_head: bool = False) -> str:
+    """
+    INT8 ONNX model at ``output`` from .pt weights (exported to FP32 ONNX first) or an FP32 .onnx.
+
+    ultralytics reads class names, stride and input size from the model's
+    metadata, so it is copied over from the FP32 model.
+    """
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_dynamic, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    fp32_path = resolve_model(model_path, 'onnx', imgsz) if model_path.endswith('.pt') else model_path
+    with tempfile.TemporaryDirectory() as tmp:
+        # Shape inference and graph cleanup make more of the graph quantizable
+        prepared = os.path.join(tmp, 'prepared.onnx')
+        quant_pre_process(fp32_path, prepared)
+        fp32 = onnx.load(prepared)
+        exclude = excluded_nodes(fp32, fp32_head)
+        log.info("quantizing", model=fp32_path, mode=mode, fp32_nodes=len(exclude))
+
+        if mode == 'dynamic':
+            quantize_dynamic(prepared, output, weight_type=QuantType.QInt8, op_types_to_quantize=['Conv', 'MatMul'],
+                             nodes_to_exclude=exclude, per_channel=True)
+        else:
+            if not calibration:
+                raise ValueError("static quantization needs a calibration folder")
+            paths = calibration_images(calibration, limit)
+            input_name = fp32.graph.input[0].name
+
+            class FrameReader(CalibrationDataReader):
+                def __init__(self):
+                    self._frames: Iterator[Dict[str, np.ndarray]] = (
+                        {input_name: letterbox(Image.open(path), imgsz)} for path in paths)
+
+                def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+                    return next(self._frames, None)
+
+            log.info("calibrating", frames=len(paths), method=method)
+            quantize_static(prepared, output, FrameReader(), quant_format=QuantFormat.QDQ,
+                            activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True,
+                            op_types_to_quantize=['Conv', 'MatMul'], nodes_to_exclude=exclude,
+                            calibrate_method={'minmax': CalibrationMethod.MinMax,
+                                              'entropy': CalibrationMethod.Entropy,
+                                              'percentile': CalibrationMethod.Percentile}[method])
+
+    quantized = onnx.load(output)
+    metadata = {p.key: p.value for p in onnx.load(fp32_path, load_external_data=False).metadata_props}
+    metadata['quantization'] = f"int8 {mode}" + (f" {method}" if mode == 'static' else '')
+    onnx.helper.set_model_props(quantized, metadata)
+    onnx.save(quantized, output)
+    return output
+
+
+def quantize_openvino(model_path: str, calibration: str, imgsz: int = 640) -> str:
+    """INT8 OpenVINO model directory from .pt weights, calibrated by ultralytics' NNCF export."""
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        # The export calibrates on a dataset's 'val' images; labels are not needed
+        data = os.path.join(tmp, 'calibration.yaml')
+        with open(data, 'w') as f:
+            f.write(f"path: {os.path.abspath(calibration)}\ntrain: .\nval: .\nnames:\n")
+            f.writelines(f"  {i}: {name}\n" for i, name in model.names.items())
+        log.info("quantizing", model=model_path, format='openvino')
+        return str(model.export(format='openvino', int8=True, data=data, imgsz=imgsz))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--model', default=os.environ.get('YOLO_MODEL_PATH', 'yolov8n.pt'),
+                        help='.pt weights, or an FP32 .onnx for --format onnx')
+    parser.add_argument('--calibration', help='folder of representative frames (static quantization)')
+    parser.add_argument('--format', choices=('onnx', 'openvino'), default='onnx')
+    parser.add_argument('--mode', choices=('static', 'dynamic'), default='static', help='onnx only')
+    parser.add_argument('--method', choices=CALIBRATION_METHODS, default='minmax',
+                        help='activation range calibration (onnx static)')
+    parser.add_argument('--limit', type=int, default=300, help='calibration frames to use')
+    parser.add_argument('--imgsz', type=int, default=int(os.environ.get('YOLO_IMGSZ', '640')))
+    parser.add_argument('--fp32-head', action='store_true', help='keep the whole detection head in FP32')
+    parser.add_argument('--output', help='output .onnx (default: <model>_int8.onnx)')
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.format == 'openvino':
+        if not args.calibration:
+            parser.error("--format openvino needs --calibration")
+        output = quantize_openvino(args.model, args.calibration, args.imgsz)
+    else:
+        if args.mode == 'static' and not args.calibration:
+            parser.error("--mode static needs --calibration (or use --mode dynamic)")
+        output = args.output or os.path.splitext(args.model)[0] + '_int8.onnx'
+        quantize_onnx(args.model, output, args.calibration, args.mode, args.imgsz, args.limit,
+                      args.method, args.fp32_head)
+    log.info("quantized model written", output=output)
+    print(f"\nCheck it:  python bench/eval_quantized.py --candidate {output} --frames <labelled frames>")
+    print(f"Serve it:  YOLO_MODEL_PATH={output} python serve.py")
+
+
+if __name__ == '__main__':
+    main()
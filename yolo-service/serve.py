@@ -0,0 +1,76 @@
+"""
+Production server for the YOLO service
+
+Serves app.py with waitress. Its asynchronous I/O loop accepts connections,
+buffers request bodies and writes responses; only complete requests reach
+the handler threads. With YOLO_WORKERS > 0 those handlers just parse, check
+caches and encode JSON while inference and color analysis run in worker
+processes (see workers.py), and requests beyond the pool's queue get a 429.
+
+Waitress doesn't hand the raw socket to the application, so the /ws/stream
+WebSocket route is unavailable under it: /health reports
+websocket_available false and the route answers 501; clients use the
+/stream HTTP session endpoints instead. SERVER=flask runs Flask's threaded
+server, which supports the WebSocket route but has no connection limit or
+request buffering in front of the handlers. It is also the fallback when
+waitress isn't installed.
+
+Environment:
+    PORT                 Listen port (default 5000)
+    SERVER               waitress (default) or flask
+    SERVER_THREADS       Handler threads (default: 4 per worker, at least 8)
+    SERVER_CONNECTIONS   Open connection limit before new ones wait (default 256)
+    LOCAL_SOCKET         Also serve /detect on this Unix socket (see local_transport.py)
+"""
+
+import os
+import signal
+import sys
+
+from logs import configure_logging, get_logger
+
+log = get_logger('serve')
+
+
+def main():
+    configure_logging()
+    # Import here, not at module level: spawned workers re-import this
+    # module and must not load the app (and its model) themselves.
+    import app as service
+
+    port = int(os.environ.get("PORT", "5000"))
+    threads = int(os.environ.get("SERVER_THREADS", "0")) or max(8, 4 * service.YOLO_WORKERS)
+    # The model may still be loading; /ready reports when it is done
+    log.info("starting YOLO service", port=port, threads=threads, colors=len(service.color_db),
+             model=service.model_loader.state, startup_s=round(service.startup_timeline.now(), 3))
+    local_server = service.start_local_transport()
+    service.startup_timeline.mark("listening")
+
+    # Stop cleanly on `docker stop` so the inference workers are shut down too
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    serve = None
+    if os.environ.get("SERVER", "waitress") == "waitress":
+        try:
+            from waitress import serve
+        except ImportError:
+            log.warning("waitress not installed, using Flask's threaded server")
+    try:
+        if serve is None:
+            service.app.run(host="0.0.0.0", port=port, debug=False, threaded=True)
+        else:
+            if service.websocket_enabled:
+                log.warning("WebSocket streaming is unavailable under waitress; "
+                            "use the /stream endpoints or SERVER=flask")
+                service.websocket_enabled = False
+            serve(service.app, host="0.0.0.0", port=port, threads=threads,
+                  connection_limit=int(os.environ.get("SERVER_CONNECTIONS", "256")),
+                  ident="vision-aid-yolo")
+    finally:
+        if local_server is not None:
+            local_server.close()
+        if service.inference_pool is not None:
+            service.inference_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Startup sequencing for the YOLO service
+
+The web process answers requests as soon as app.py is imported; the model
+(torch, ultralytics, weights and warm-up) loads on a background thread.
+/health is the liveness check and answers throughout; /ready is the
+readiness check and answers 503 until the model is loaded and warmed up.
+Model endpoints answer 503 with Retry-After until then too.
+
+Every step is recorded on a timeline of offsets from process start, which
+is logged once the service is ready and reported by /health, /ready and
+/metrics.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+
+class ModelNotReadyError(RuntimeError):
+    """The model is still loading (or failed to load)."""
+
+
+def process_age() -> float:
+    """Seconds since this process started (Linux), or 0.0 when unknown."""
+    try:
+        with open('/proc/self/stat') as f:
+            # The command name may contain spaces; fields after it are fixed
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimeline:
+    """
+    Named startup phases as (start, end) seconds since process start, plus
+    milestones (points in time).
+
+    Everything before the timeline was created (interpreter start-up and
+    module imports) is recorded as the 'imports' phase where the OS reports
+    the process start time.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._offset = process_age()
+        self._lock = threading.Lock()
+        self._phases: List[Tuple[str, float, float]] = []
+        self._marks: Dict[str, float] = {}
+        if self._offset:
+            self._phases.append(('imports', 0.0, self._offset))
+
+    def now(self) -> float:
+        """Seconds since process start."""
+        return self._offset + time.perf_counter() - self._origin
+
+    def record(self, name: str, start: float, end: Optional[float] = None) -> None:
+        with self._lock:
+            self._phases.append((name, start, self.now() if end is None else end))
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Record the enclosed block as phase ``name``, even if it raises."""
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.record(name, start)
+
+    def mark(self, name: str) -> None:
+        """Record a milestone such as 'listening' or 'ready'."""
+        now = self.now()
+        with self._lock:
+            self._marks[name] = now
+
+    def marks(self) -> Dict[str, float]:
+        """Seconds since process start per milestone."""
+        with self._lock:
+            return dict(self._marks)
+
+    def durations(self) -> Dict[str, float]:
+        """Seconds per phase; repeated names are summed."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for name, start, end in self._phases:
+                totals[name] = totals.get(name, 0.0) + end - start
+        return totals
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p[1])
+            marks = sorted(self._marks.items(), key=lambda m: m[1])
+        return {
+            'phases': [{'name': name, 'start_ms': round(start * 1000, 1),
+                        'duration_ms': round((end - start) * 1000, 1)}
+                       for name, start, end in phases],
+            'marks': {name: round(at * 1000, 1) for name, at in marks},
+            'elapsed_ms': round(self.now() * 1000, 1),
+        }
+
+
+class ModelLoader:
+    """
+    Runs ``load`` once, on a background thread or inline, and tracks its state.
+
+    States: 'pending' before start(), then 'loading', then 'ready' or 'failed'.
+
+    Args:
+        load: Loads and warms up the model; raises on failure
+        timeline: Receives the 'ready' milestone
+        background: Run ``load`` on a daemon thread instead of in start()
+    """
+
+    def __init__(self, load: Callable[[], None], timeline: StartupTimeline, background: bool = True):
+        self._load = load
+        self.timeline = timeline
+        self.background = background
+        self.state = 'pending'
+        self.error: Optional[str] = None
+        self.ready_s: Optional[float] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Begin loading. Inline mode re-raises a load failure."""
+        self.state = 'loading'
+        if self.background:
+            self._thread = threading.Thread(target=self._run, name='model-loader', daemon=True)
+            self._thread.start()
+        else:
+            self._run(reraise=True)
+
+    def _run(self, reraise: bool = False) -> None:
+        try:
+            self._load()
+        except Exception as e:
+            self.state = 'failed'
+            self.error = f"{type(e).__name__}: {e}"
+            log.error("model failed to load", error=self.error)
+            if reraise:
+                raise
+        else:
+            self.timeline.mark('ready')
+            self.ready_s = self.timeline.now()
+            self.state = 'ready'
+            log.info("service ready", startup_s=round(self.ready_s, 3),
+                     **{f"{name}_s": round(s, 3) for name, s in self.timeline.durations().items()})
+        finally:
+            self._done.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == 'ready'
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until loading has finished; True if the model is ready."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def require(self) -> None:
+        """Raise ModelNotReadyError unless the model is ready."""
+        if not self.ready:
+            raise ModelNotReadyError(self.error or f"model is {self.state}")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'error': self.error,
+            'ready_s': round(self.ready_s, 3) if self.ready_s is not None else None,
+        }
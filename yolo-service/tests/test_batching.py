@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def doubled(items, **options):
+    return [item * 2 for item in items]
+
+
+def test_results_come_back_in_order():
+    batcher = MicroBatcher(doubled, max_batch_size=4, max_wait_ms=5)
+    futures = [batcher.submit(i) for i in range(10)]
+    assert [f.result(2) for f in futures] == [i * 2 for i in range(10)]
+    batcher.close()
+
+
+def test_lone_request_is_not_held_for_the_batch_window():
+    batcher = MicroBatcher(doubled, max_batch_size=8, max_wait_ms=1000)
+    start = time.monotonic()
+    assert batcher.run(21, timeout=2) == 42
+    assert time.monotonic() - start < 0.5
+    assert batcher.stats()['dispatched_without_wait'] == 1
+    batcher.close()
+
+
+def test_concurrent_requests_are_batched():
+    started = threading.Event()
+
+    def slow(items, **options):
+        started.set()
+        time.sleep(0.05)
+        return doubled(items)
+
+    batcher = MicroBatcher(slow, max_batch_size=8, max_wait_ms=20)
+    first = batcher.submit(0)
+    started.wait(1)
+    # Queued while the first batch runs, so they go out together
+    rest = [batcher.submit(i) for i in range(1, 6)]
+    assert [f.result(2) for f in [first] + rest] == [0, 2, 4, 6, 8, 10]
+    assert batcher.stats()['batch_size_histogram'] == {'1': 1, '5': 1}
+    batcher.close()
+
+
+def test_requests_with_different_options_are_not_mixed():
+    gate = threading.Event()
+    seen = []
+
+    def scaled(items, scale):
+        gate.wait(1)
+        seen.append((scale, list(items)))
+        return [item * scale for item in items]
+
+    batcher = MicroBatcher(scaled, max_batch_size=8, max_wait_ms=20)
+    blocker = batcher.submit(0, scale=1)
+    futures = [batcher.submit(i, scale=1 + i % 2) for i in range(1, 5)]
+    gate.set()
+    assert blocker.result(2) == 0
+    assert [f.result(2) for f in futures] == [2, 2, 6, 4]
+    for scale, items in seen:
+        assert all(1 + item % 2 == scale for item in items if item)
+    batcher.close()
+
+
+def test_run_batch_errors_reach_every_caller():
+    def broken(items, **options):
+        raise ValueError('boom')
+
+    batcher = MicroBatcher(broken, max_wait_ms=1)
+    with pytest.raises(ValueError, match='boom'):
+        batcher.run(1, timeout=2)
+    batcher.close()
+
+
+def test_wrong_result_count_is_an_error():
+    batcher = MicroBatcher(lambda items, **options: [], max_wait_ms=1)
+    with pytest.raises(RuntimeError, match='0 results for 1 items'):
+        batcher.run(1, timeout=2)
+    batcher.close()
+
+
+def test_close_fails_pending_requests_instead_of_hanging():
+    gate = threading.Event()
+
+    def blocked(items, **options):
+        gate.wait(2)
+        return doubled(items)
+
+    batcher = MicroBatcher(blocked, max_batch_size=1, max_wait_ms=0)
+    running = batcher.submit(1)
+    time.sleep(0.05)
+    pending = [batcher.submit(i) for i in range(2, 5)]
+    closer = threading.Thread(target=batcher.close)
+    closer.start()
+    gate.set()
+    closer.join(2)
+
+    assert running.result(2) == 2
+    for future in pending:
+        with pytest.raises(RuntimeError, match='closed'):
+            future.result(2)
+    with pytest.raises(RuntimeError, match='closed'):
+        batcher.submit(5)
@@ -0,0 +1,103 @@
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from cache import ImageCache, PerceptualCache, dhash, hamming_distance
+
+
+def scene(seed=0, size=(320, 240)):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, size=(size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+                           ).resize(size, Image.NEAREST)
+
+
+class TestImageCache:
+    def test_get_returns_independent_copies(self):
+        cache = ImageCache()
+        cache.set('a', {'detections': [1, 2]})
+        first = cache.get('a')
+        first['detections'].append(3)
+        assert cache.get('a') == {'detections': [1, 2]}
+        assert cache.stats()['hits'] == 2
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = ImageCache(max_size=2)
+        cache.set('a', {'v': 1})
+        cache.set('b', {'v': 2})
+        cache.get('a')
+        cache.set('c', {'v': 3})
+        assert cache.get('b') is None
+        assert cache.get('a') == {'v': 1} and cache.get('c') == {'v': 3}
+        assert cache.stats()['evictions'] == 1
+
+    def test_byte_budget_bounds_the_cache(self):
+        cache = ImageCache(max_size=100, max_bytes=30)
+        cache.set('a', {'v': 'x' * 10})
+        cache.set('b', {'v': 'y' * 10})
+        assert len(cache) == 1 and cache.get('b') is not None
+        cache.set('big', {'v': 'z' * 100})
+        assert cache.get('big') is None
+        assert cache.stats()['bytes'] <= 30
+
+    def test_entries_expire(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+        cache = ImageCache(ttl_s=10)
+        cache.set('a', {'v': 1})
+        now[0] += 9
+        assert cache.get('a') == {'v': 1}
+        now[0] += 2
+        assert cache.get('a') is None
+        assert cache.stats()['expirations'] == 1 and len(cache) == 0
+
+    def test_key_depends_on_content(self):
+        assert ImageCache.key(b'abc') == ImageCache.key(b'abc') != ImageCache.key(b'abd')
+
+
+class TestPerceptualCache:
+    def test_dhash_is_stable_under_noise_and_differs_between_scenes(self):
+        image = scene(1)
+        noisy = np.asarray(image).astype(np.int16) + np.random.default_rng(0).integers(-2, 3, (240, 320, 3))
+        noisy = Image.fromarray(np.clip(noisy, 0, 255).astype(np.uint8))
+        assert hamming_distance(dhash(image, 16), dhash(noisy, 16)) <= 2
+        assert hamming_distance(dhash(image, 16), dhash(scene(2), 16)) > 20
+
+    def test_near_duplicate_of_the_same_client_hits(self):
+        cache = PerceptualCache(threshold=2)
+        phash = cache.hash(scene(1))
+        cache.set('client', phash, [{'box': 1}])
+        assert cache.get('client', phash ^ 0b1) == ([{'box': 1}], 1)
+        assert cache.get('client', phash ^ 0b111) is None
+        assert cache.get('other', phash) is None
+
+    def test_frames_of_another_upload_size_never_hit(self):
+        cache = PerceptualCache()
+        phash = cache.hash(scene(1))
+        cache.set('client', phash, ['boxes'], (1280, 720))
+        assert cache.get('client', phash, (640, 360)) is None
+        assert cache.get('client', phash, (1280, 720)) == (['boxes'], 0)
+
+    def test_old_frames_are_ignored(self, monkeypatch):
+        now = [50.0]
+        monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+        cache = PerceptualCache(ttl_s=2)
+        cache.set('client', 7, 'result')
+        now[0] += 3
+        assert cache.get('client', 7) is None
+
+    def test_client_count_is_bounded(self):
+        cache = PerceptualCache(max_clients=2)
+        for client in ('a', 'b', 'c'):
+            cache.set(client, 1, client)
+        assert cache.stats()['clients'] == 2
+        assert cache.get('a', 1) is None
+
+    @pytest.mark.parametrize('history', [1, 3])
+    def test_history_keeps_the_last_frames(self, history):
+        cache = PerceptualCache(threshold=0, history=history)
+        for phash in range(4):
+            cache.set('client', phash << 8, phash)
+        assert cache.get('client', 3 << 8) == (3, 0)
+        assert (cache.get('client', 0) is None) == (history < 4)
@@ -0,0 +1,116 @@
+import math
+import time
+
+import pytest
+
+from camera import DEFAULT_PROFILE, CameraProfile, CameraProfileStore, covered_sensor_px
+
+BOX = {'x1': 100.0, 'y1': 100.0, 'x2': 120.0, 'y2': 152.0}
+
+
+def test_default_profile_keeps_the_original_estimate():
+    # 0.8 m housing, 650 px focal length on 1280x720
+    assert DEFAULT_PROFILE.focal_length_px((1280, 720)) == pytest.approx(650.0)
+    assert DEFAULT_PROFILE.distance(BOX, (1280, 720)) == round(0.8 * 650 / 52, 1)
+
+
+@pytest.mark.parametrize('frame_size, expected', [
+    ((1600, 1200), 1600),  # full 4:3 sensor
+    ((1920, 1080), 1920),  # 16:9 crop keeps the long side
+    ((1080, 1080), 1440),  # square crop keeps the short side
+    ((1080, 1920), 1920),  # portrait
+])
+def test_covered_sensor_px(frame_size, expected):
+    assert covered_sensor_px(frame_size, 4 / 3) == pytest.approx(expected)
+
+
+def test_distance_does_not_depend_on_upload_resolution():
+    profile = CameraProfile.from_dict({'hfov_deg': 70})
+    full = profile.distance(BOX, (1920, 1080))
+    half = {k: v / 2 for k, v in BOX.items()}
+    assert profile.distance(half, (960, 540)) == pytest.approx(full, abs=0.1)
+
+
+@pytest.mark.parametrize('fields', [
+    {'focal_length_px': 1000, 'width': 1600, 'height': 1200},
+    {'hfov_deg': 2 * math.degrees(math.atan(0.5 / 0.625))},
+    {'focal_length_mm': 5.0, 'sensor_width_mm': 8.0},
+])
+def test_focal_length_forms_agree(fields):
+    assert CameraProfile.from_dict(fields).focal_ratio == pytest.approx(0.625)
+
+
+def test_35mm_equivalent_is_converted_by_diagonal():
+    # A 4:3 sensor whose diagonal matches 35 mm film: 43.27 mm diagonal -> 34.6 mm long side
+    profile = CameraProfile.from_dict({'focal_length_35mm': 26})
+    long_side = math.hypot(36, 24) * 4 / 5
+    assert profile.focal_ratio == pytest.approx(26 / long_side)
+
+
+def test_housing_orientation_and_aspects():
+    horizontal = CameraProfile(1.0, housing='horizontal', aspects=4)
+    assert horizontal.housing_length_m == 1.05
+    wide = {'x1': 0, 'y1': 0, 'x2': 60, 'y2': 20}
+    assert horizontal.distance(wide, (1600, 1200)) == round(1.05 * 1600 / 60, 1)
+    assert CameraProfile(1.0, housing='auto').distance(wide, (1600, 1200)) == round(0.8 * 1600 / 60, 1)
+    assert CameraProfile(1.0).distance({'x1': 0, 'y1': 5, 'x2': 9, 'y2': 5}, (1600, 1200)) == 0.0
+
+
+@pytest.mark.parametrize('value, message', [
+    ('{not json', 'JSON object'),
+    ('[1, 2]', 'JSON object'),
+    ({}, 'needs focal_length_px'),
+    ({'focal_length_px': 900}, 'width and height'),
+    ({'focal_length_mm': 4}, 'sensor_width_mm'),
+    ({'hfov_deg': 190}, 'between 0 and 180'),
+    ({'hfov_deg': 70, 'housing': 'diagonal'}, 'housing'),
+    ({'hfov_deg': 70, 'aspects': 5}, 'aspects'),
+    ({'focal_length_mm': 4, 'sensor_width_mm': 0}, 'invalid camera profile'),
+    ({'hfov_deg': 70, 'sensor_aspect': '4:0'}, 'positive'),
+    ({'focal_length_mm': 'inf', 'sensor_width_mm': 6}, 'finite'),
+    ({'focal_length_mm': 'inf', 'sensor_width_mm': 'inf'}, 'finite'),
+    ({'hfov_deg': 60, 'sensor_aspect': 'nan'}, 'finite'),
+    ({'hfov_deg': 60, 'sensor_aspect': 'inf:1'}, 'finite'),
+    ({'hfov_deg': 'nan'}, 'between 0 and 180'),
+    ('{"focal_length_px": 1e309, "width": 1280, "height": 720}', 'finite'),
+    ('{"focal_length_px": 900, "width": 1e309, "height": 720}', 'invalid camera profile'),
+    ({'hfov_deg': 60, 'housing_length_m': 'inf'}, 'finite'),
+])
+def test_invalid_profiles_are_rejected(value, message):
+    with pytest.raises(ValueError, match=message):
+        CameraProfile.parse(value)
+
+
+def test_parse_round_trips_through_as_dict():
+    profile = CameraProfile.parse('{"hfov_deg": 66, "sensor_aspect": "16:9", "aspects": 4}')
+    data = profile.as_dict()
+    assert data['hfov_deg'] == 66.0 and data['aspects'] == 4
+    again = CameraProfile.from_dict(data)
+    assert again.focal_ratio == pytest.approx(profile.focal_ratio, rel=1e-4)
+    assert again.sensor_aspect == pytest.approx(16 / 9, rel=1e-4)
+    assert CameraProfile.parse(data).key == again.key
+    assert CameraProfile.from_dict({'hfov_deg': 67}).key != profile.key
+
+
+def test_store_is_a_bounded_lru(monkeypatch):
+    store = CameraProfileStore(max_profiles=2)
+    a, b, c = (CameraProfile(r) for r in (0.5, 0.6, 0.7))
+    store.set('a', a)
+    store.set('b', b)
+    assert store.get('a') is a
+    store.set('c', c)
+    assert store.get('b') is None and store.get('a') is a and len(store) == 2
+    assert store.remove('a') and not store.remove('a')
+
+
+def test_store_entries_expire_after_last_use(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    store = CameraProfileStore(ttl_s=10)
+    store.set('phone', DEFAULT_PROFILE)
+    now[0] = 8
+    assert store.get('phone') is DEFAULT_PROFILE
+    now[0] = 16
+    assert store.get('phone') is DEFAULT_PROFILE
+    now[0] = 27
+    assert store.get('phone') is None and len(store) == 0
@@ -0,0 +1,110 @@
+import os
+
+import numpy as np
+import pytest
+
+from color_index import ColorIndex, ciede2000, rgb_to_lab
+
+SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def palette(n=40, seed=0):
+    rgb = np.random.default_rng(seed).integers(0, 256, size=(n, 3))
+    return ColorIndex([str(i) for i in range(n)], [f'color {i}' for i in range(n)],
+                      [f'#{r:02x}{g:02x}{b:02x}' for r, g, b in rgb], rgb)
+
+
+def brute_force(points, candidates):
+    d = np.sqrt(((points[:, None, :] - candidates[None, :, :]) ** 2).sum(axis=2))
+    return d.argmin(axis=1), d.min(axis=1)
+
+
+def queries(n=500, seed=1):
+    return np.random.default_rng(seed).integers(0, 256, size=(n, 3))
+
+
+def test_rgb_search_matches_brute_force():
+    index = palette()
+    q = queries()
+    indices, distances = index.nearest_batch(q)
+    expected_indices, expected_distances = brute_force(q.astype(float), index.rgb.astype(float))
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances)
+
+
+def test_lab76_search_matches_brute_force_in_lab():
+    index = palette()
+    q = queries()
+    indices, distances = index.nearest_batch(q, 'lab76')
+    expected_indices, expected_distances = brute_force(rgb_to_lab(q), index.lab)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-9)
+
+
+def test_nearest_agrees_with_the_batch_search():
+    index = palette()
+    for rgb in queries(20).tolist():
+        i, d = index.nearest(rgb)
+        indices, distances = index.nearest_batch([rgb])
+        assert (i, pytest.approx(d)) == (indices[0], distances[0])
+
+
+def test_reference_conversions():
+    np.testing.assert_allclose(rgb_to_lab([[255, 255, 255]])[0], [100, 0, 0], atol=1e-3)
+    # Sharma, Wu and Dalal's CIEDE2000 test data, pair 1
+    assert ciede2000(np.array([50, 2.6772, -79.7751]), np.array([50, 0, -82.7485])) == pytest.approx(2.0425, abs=1e-4)
+
+
+def test_empty_index():
+    indices, distances = ColorIndex.empty().nearest_batch([[1, 2, 3]])
+    assert indices.tolist() == [-1] and np.isinf(distances[0])
+
+
+@pytest.mark.parametrize('metric', ['rgb', 'lab76'])
+def test_exact_lookup_table_matches_the_search(metric):
+    index = palette(12)
+    q = queries(2000)
+    expected = index.nearest_batch(q, metric)
+    index.load_lookup_table(bits=8, metric=metric)
+    assert index.lookup_table_status() == {'state': 'ready', 'bits': 8, 'metric': metric}
+    indices, distances = index.nearest_batch(q, metric)
+    np.testing.assert_array_equal(indices, expected[0])
+    np.testing.assert_allclose(distances, expected[1], atol=1e-9)
+
+
+def test_quantized_lookup_table_stays_within_one_cell_of_the_nearest_color():
+    index = palette()
+    q = queries(2000)
+    _, exact = index.nearest_batch(q)
+    index.load_lookup_table(bits=5)
+    _, approximate = index.nearest_batch(q)
+    # A 5-bit cell is 8 levels wide: its center is at most 3.5 levels per channel away
+    assert np.all(approximate <= exact + 2 * np.sqrt(3 * 3.5 ** 2) + 1e-9)
+    assert np.mean(approximate - exact < 1e-9) > 0.9
+
+
+def test_lookup_table_is_cached_and_memory_mapped(tmp_path):
+    index = palette(12)
+    index.load_lookup_table(bits=5, cache_dir=str(tmp_path))
+    path = index.lookup_table_path(str(tmp_path), 5)
+    assert os.path.exists(path)
+
+    reloaded = palette(12)
+    lut = reloaded.load_lookup_table(bits=5, cache_dir=str(tmp_path))
+    assert isinstance(lut.table, np.memmap)
+    q = queries(100)
+    np.testing.assert_array_equal(reloaded.nearest_batch(q)[0], index.nearest_batch(q)[0])
+
+
+def test_compiled_palette_round_trip(tmp_path):
+    csv_path = os.path.join(SERVICE_DIR, 'colors.csv')
+    parsed = ColorIndex.from_csv(csv_path)
+    ColorIndex.load(csv_path, cache_dir=str(tmp_path))
+    compiled = ColorIndex.load(csv_path, cache_dir=str(tmp_path))
+
+    assert isinstance(compiled.rgb, np.memmap)
+    assert len(compiled) == len(parsed)
+    assert list(compiled.names[:5]) == list(parsed.names[:5])
+    assert compiled.record(7) == parsed.record(7)
+    q = queries(200)
+    np.testing.assert_array_equal(compiled.nearest_batch(q)[0], parsed.nearest_batch(q)[0])
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from color_sampling import MAX_REGIONS, dominant_colors, parse_regions, summarize_region
+
+
+def test_rois_and_points_become_clipped_pixel_boxes():
+    regions = parse_regions('[[10, 20, 5, 40], [90, 90, 200, 200]]', [[50, 50]], 100, 100, radius=3)
+    assert regions == [('roi', (5, 20, 10, 40)), ('roi', (90, 90, 100, 100)), ('point', (47, 47, 54, 54))]
+
+
+def test_relative_coordinates_scale_to_the_image():
+    assert parse_regions([[0.25, 0.5, 0.75, 1.0]], None, 200, 100, relative=True) == [('roi', (50, 50, 150, 100))]
+
+
+def test_default_point_radius_is_two_percent_of_the_shorter_side():
+    assert parse_regions(None, '[[500, 500]]', 1000, 1000) == [('point', (480, 480, 521, 521))]
+
+
+@pytest.mark.parametrize('rois, points, message', [
+    ('not json', None, 'JSON list'),
+    ('[[1, 2, 3]]', None, r'\[x1, y1, x2, y2\]'),
+    (None, '[["a", 1]]', r'\[x, y\]'),
+    ('[[true, 0, 5, 5]]', None, r'\[x1, y1, x2, y2\]'),
+    (None, [[False, 1]], r'\[x, y\]'),
+    ('[]', None, 'no regions'),
+    ('[]', '[]', 'no regions'),
+    ([[0, 0, 5, 5]] * (MAX_REGIONS + 1), None, f'at most {MAX_REGIONS}'),
+    ('[[200, 200, 300, 300]]', None, 'outside the 100x100 image'),
+])
+def test_invalid_requests_are_rejected(rois, points, message):
+    with pytest.raises(ValueError, match=message):
+        parse_regions(rois, points, 100, 100)
+
+
+@pytest.mark.parametrize('rois, points', [
+    ('[[0, 0, 1e400, 5]]', None),
+    ('[[0, 0, Infinity, 5]]', None),
+    ('[[NaN, 0, 5, 5]]', None),
+    (None, '[[-Infinity, 5]]'),
+    ([[0, 0, float('inf'), 5]], None),
+])
+def test_non_finite_coordinates_are_rejected(rois, points):
+    with pytest.raises(ValueError, match='finite'):
+        parse_regions(rois, points, 100, 100)
+
+
+def test_relative_coordinates_that_overflow_are_rejected():
+    with pytest.raises(ValueError, match='finite'):
+        parse_regions('[[0, 0, 1e308, 0.5]]', None, 1000, 1000, relative=True)
+
+
+@pytest.mark.parametrize('radius', [float('inf'), float('nan'), -1.0])
+def test_invalid_radius_is_rejected(radius):
+    with pytest.raises(ValueError, match='radius'):
+        parse_regions(None, '[[5, 5]]', 100, 100, radius=radius)
+
+
+def test_dominant_colors_separate_a_two_color_region():
+    pixels = np.array([[250, 10, 10]] * 300 + [[10, 10, 250]] * 100, dtype=np.uint8)
+    centers, shares = dominant_colors(pixels, k=3)
+    np.testing.assert_allclose(centers, [[250, 10, 10], [10, 10, 250]])
+    np.testing.assert_allclose(shares, [0.75, 0.25])
+
+
+def test_dominant_colors_of_nothing():
+    centers, shares = dominant_colors(np.empty((0, 3), dtype=np.uint8))
+    assert centers.shape == (0, 3) and shares.shape == (0,)
+
+
+def test_summarize_region_reports_the_mean_and_clusters_a_downsampled_copy():
+    array = np.zeros((200, 300, 3), dtype=np.uint8)
+    array[:, :150] = (200, 0, 0)
+    array[:, 150:] = (0, 200, 0)
+    mean, centers, shares = summarize_region(Image.fromarray(array), k=2)
+    np.testing.assert_allclose(mean, [100, 100, 0])
+    assert sorted(map(tuple, centers.round())) == [(0.0, 200.0, 0.0), (200.0, 0.0, 0.0)]
+    np.testing.assert_allclose(shares, [0.5, 0.5], atol=0.02)
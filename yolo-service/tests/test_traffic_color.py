@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from traffic_color import (LOOKUP_CHUNK, _pack_sections, analyze_traffic_light_color,
+                           analyze_traffic_light_colors, classify_lights, section_totals)
+
+BULBS = {'red': (255, 30, 30), 'yellow': (255, 200, 0), 'green': (20, 230, 90)}
+
+
+def housing(lit, width=12, height=36, bulb=None):
+    """Dark housing with a bulb in the section of ``lit`` (0 top, 1 middle, 2 bottom)."""
+    light = np.full((height, width, 3), 20, dtype=np.uint8)
+    if lit is not None:
+        section = height // 3
+        light[lit * section + 2:(lit + 1) * section - 2, 2:-2] = bulb or list(BULBS.values())[lit]
+    return light
+
+
+def reference_totals(hsv, starts, areas):
+    """The original per-section boolean masks."""
+    totals = np.zeros(starts.shape, dtype=np.int64)
+    for j in range(len(starts)):
+        for k in range(3):
+            section = hsv[starts[j, k]:starts[j, k] + areas[j, k]].astype(np.int64)
+            h, s, v = section[:, 0], section[:, 1], section[:, 2]
+            hue = [(h < 25) | (h > 230), (h >= 20) & (h <= 60), (h >= 40) & (h <= 130)][k]
+            totals[j, k] = v[hue & (s > 50) & (v > 60)].sum()
+    return totals
+
+
+def random_housings(rng, count, max_width=40):
+    housings = []
+    for _ in range(count):
+        w = int(rng.integers(1, max_width))
+        h = int(rng.integers(0, 3 * w + 3))
+        housings.append(rng.integers(0, 256, size=(h, w, 3), dtype=np.uint8))
+    return housings
+
+
+@pytest.mark.parametrize('count, max_width', [(1, 5), (40, 40), (3, 200)])
+def test_section_totals_match_boolean_masks(count, max_width):
+    rng = np.random.default_rng(count)
+    hsv, starts, areas = _pack_sections(random_housings(rng, count, max_width))
+    np.testing.assert_array_equal(section_totals(hsv, starts), reference_totals(hsv, starts, areas))
+
+
+def test_section_totals_across_chunks():
+    # One section far larger than a chunk, and sections straddling chunk edges
+    rng = np.random.default_rng(7)
+    big = rng.integers(0, 256, size=(3 * 300, 300, 3), dtype=np.uint8)
+    hsv, starts, areas = _pack_sections([big] + random_housings(rng, 200))
+    assert areas[0, 0] > LOOKUP_CHUNK
+    np.testing.assert_array_equal(section_totals(hsv, starts), reference_totals(hsv, starts, areas))
+
+
+def test_empty_sections_score_zero():
+    # Under 3 px tall leaves the top and middle sections empty
+    hsv, starts, areas = _pack_sections([np.full((2, 4, 3), 200, dtype=np.uint8),
+                                         np.full((0, 4, 3), 200, dtype=np.uint8)])
+    assert (areas[:, :2] == 0).all()
+    totals = section_totals(hsv, starts)
+    assert (totals[:, :2] == 0).all() and totals[1, 2] == 0
+
+
+@pytest.mark.parametrize('lit, color', [(0, 'red'), (1, 'yellow'), (2, 'green')])
+def test_classify_lit_section(lit, color):
+    [(result, scores)] = classify_lights([housing(lit)])
+    assert result == color
+    assert scores[color] == max(scores.values()) > 0
+
+
+def test_white_bulb_uses_brightness_fallback():
+    [(color, scores)] = classify_lights([housing(2, bulb=(240, 240, 240))])
+    assert color == 'green' and all(v == 0 for v in scores.values())
+    [(color, _)] = classify_lights([housing(None)])
+    assert color == 'unknown'
+
+
+def test_classify_views_and_empty_housings():
+    frame = np.concatenate([housing(0), housing(2), housing(1)], axis=1)
+    lights = [frame[:, 0:12], frame[:, 12:24], np.zeros((0, 0, 3), dtype=np.uint8), frame[::2, 24:36]]
+    assert [c for c, _ in classify_lights(lights)] == ['red', 'green', 'unknown', 'yellow']
+    assert classify_lights([]) == []
+
+
+def test_analyze_frame_clips_and_skips_boxes():
+    frame = np.zeros((100, 100, 3), dtype=np.uint8)
+    frame[10:46, 10:22] = housing(0)
+    frame[64:100, 90:100] = housing(2)[:, :10]
+    image = Image.fromarray(frame)
+    boxes = [{'x1': 10, 'y1': 10, 'x2': 22, 'y2': 46},
+             {'x1': 90, 'y1': 64, 'x2': 130, 'y2': 120},  # runs off the frame
+             {'x1': 150, 'y1': 150, 'x2': 160, 'y2': 180},  # entirely outside
+             {'x1': 30, 'y1': 30, 'x2': 30, 'y2': 60}]  # zero width
+    results = analyze_traffic_light_colors(image, boxes)
+    assert [c for c, _ in results] == ['red', 'green', 'unknown', 'unknown']
+    assert results == analyze_traffic_light_colors(image, boxes, frame=frame)
+    assert analyze_traffic_light_color(image, boxes[0]) == 'red'
+    assert analyze_traffic_light_colors(image, []) == []
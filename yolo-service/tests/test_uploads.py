@@ -0,0 +1,124 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from uploads import BatchTooLargeError, archive_kind, read_archive, read_image
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 60
+
+
+def tar_bytes(members, mode='w'):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode=mode) as archive:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.DIRTYPE
+                archive.addfile(info)
+            else:
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def zip_bytes(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            if data is None:
+                archive.writestr(name.rstrip('/') + '/', b'')
+            else:
+                archive.writestr(name, data)
+    return buf.getvalue()
+
+
+BUILDERS = {
+    'tar': tar_bytes,
+    'tar.gz': lambda members: tar_bytes(members, 'w:gz'),
+    'zip': zip_bytes,
+}
+
+
+@pytest.mark.parametrize('filename, mimetype, kind', [
+    ('frames.tar', None, 'tar'),
+    ('FRAMES.TAR.GZ', None, 'tar'),
+    ('frames.tgz', 'application/octet-stream', 'tar'),
+    ('frames.zip', None, 'zip'),
+    (None, 'application/x-gzip', 'tar'),
+    (None, 'application/x-zip-compressed', 'zip'),
+    ('photo.jpg', 'image/jpeg', None),
+    (None, None, None),
+])
+def test_archive_kind(filename, mimetype, kind):
+    assert archive_kind(filename, mimetype) == kind
+
+
+@pytest.mark.parametrize('fmt', BUILDERS)
+def test_images_come_back_in_archive_order(fmt):
+    members = [('b.jpg', JPEG + b'b'), ('dir', None), ('notes.txt', b'skip'),
+               ('dir/a.PNG', JPEG + b'a'), ('dir/.hidden.jpg', JPEG), ('c.webp', JPEG + b'c')]
+    items = read_archive(io.BytesIO(BUILDERS[fmt](members)), fmt.split('.')[0], max_images=10)
+    assert items == [('b.jpg', JPEG + b'b'), ('dir/a.PNG', JPEG + b'a'), ('c.webp', JPEG + b'c')]
+
+
+@pytest.mark.parametrize('kind', ['tar', 'zip'])
+def test_too_many_images(kind):
+    data = BUILDERS[kind]([(f'{i}.jpg', JPEG) for i in range(4)])
+    assert len(read_archive(io.BytesIO(data), kind, max_images=4)) == 4
+    with pytest.raises(BatchTooLargeError, match='more than 3 images'):
+        read_archive(io.BytesIO(data), kind, max_images=3)
+
+
+@pytest.mark.parametrize('kind', ['tar', 'zip'])
+def test_byte_limits(kind):
+    data = BUILDERS[kind]([('a.jpg', b'\0' * 100), ('b.jpg', b'\0' * 100), ('big.txt', b'\0' * 1000)])
+    # Skipped members don't count
+    assert len(read_archive(io.BytesIO(data), kind, 10, max_image_bytes=100, max_total_bytes=200)) == 2
+    with pytest.raises(BatchTooLargeError, match='a.jpg is over the 99 byte limit per image'):
+        read_archive(io.BytesIO(data), kind, 10, max_image_bytes=99)
+    with pytest.raises(BatchTooLargeError, match='b.jpg takes the batch over its byte limit'):
+        read_archive(io.BytesIO(data), kind, 10, max_total_bytes=199)
+
+
+def test_zip_bomb_is_rejected_before_inflating(monkeypatch):
+    data = zip_bytes([('bomb.jpg', b'\0' * (8 << 20))])
+    assert len(data) < 64 << 10
+
+    def read(*args):
+        raise AssertionError('member was inflated')
+
+    monkeypatch.setattr(zipfile.ZipFile, 'read', read)
+    with pytest.raises(BatchTooLargeError):
+        read_archive(io.BytesIO(data), 'zip', 10, max_image_bytes=1 << 20)
+
+
+def test_zip_member_lying_about_its_size():
+    data = bytearray(zip_bytes([('a.jpg', b'x' * 5000)]))
+    # Shrink the declared size in the central directory
+    central = data.rindex(b'PK\x01\x02')
+    data[central + 24:central + 28] = (10).to_bytes(4, 'little')
+    with pytest.raises(ValueError, match='unreadable zip archive'):
+        read_archive(io.BytesIO(bytes(data)), 'zip', 10, max_image_bytes=100)
+
+
+@pytest.mark.parametrize('kind, data', [
+    ('zip', b'not a zip'),
+    ('tar', b'not a tar' * 100),
+    ('tar', tar_bytes([('a.jpg', JPEG * 20)], 'w:gz')[:60]),
+])
+def test_unreadable_archives(kind, data):
+    with pytest.raises(ValueError, match=f'unreadable {kind} archive'):
+        read_archive(io.BytesIO(data), kind, 10)
+
+
+def test_read_image_stops_past_the_limit():
+    stream = io.BytesIO(b'\0' * 10_000)
+    with pytest.raises(BatchTooLargeError, match='per image'):
+        read_image(stream, 'a.jpg', max_image_bytes=100)
+    assert stream.tell() == 101
+    with pytest.raises(BatchTooLargeError, match='over its byte limit'):
+        read_image(io.BytesIO(b'\0' * 50), 'a.jpg', max_image_bytes=100, max_total_bytes=49)
+    assert read_image(io.BytesIO(JPEG), 'a.jpg', 100, 100) == JPEG
+    assert read_image(io.BytesIO(JPEG), 'a.jpg') == JPEG
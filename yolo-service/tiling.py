@@ -0,0 +1,55 @@
+"""
+Overlapping tiles for high-resolution (SAHI-style) inference
+
+A distant traffic light in a 4K frame is a few pixels tall after the whole
+frame is letterboxed to the model's input size. Cutting the frame into
+overlapping tiles and running each at the input size zooms in by the tile
+count per side; a light cut by one tile's edge is whole in its neighbour
+when the overlap is at least the light's size.
+
+Signals are mounted above the road, so the tiles can cover just the upper
+part of the frame (``top``); a full-frame pass alongside them still sees
+large, near lights anywhere.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+
+def tile_grid(frame_size: Tuple[int, int], cols: int = 3, rows: int = 2, overlap: float = 0.2,
+              top: float = 1.0) -> List[Box]:
+    """
+    (x1, y1, x2, y2) of ``cols`` x ``rows`` equal tiles, row by row.
+
+    Args:
+        frame_size: (width, height) in pixels
+        overlap: Fraction of a tile's width (height) shared with its neighbour
+        top: Fraction of the frame height, from the top, the tiles cover
+
+    Raises:
+        ValueError: Invalid grid, overlap or coverage
+    """
+    if cols < 1 or rows < 1:
+        raise ValueError(f"tile grid must be at least 1x1, got {cols}x{rows}")
+    if not 0 <= overlap < 1:
+        raise ValueError("tile overlap must be in [0, 1)")
+    if not 0 < top <= 1:
+        raise ValueError("tile coverage must be in (0, 1]")
+    width, height = frame_size
+    height = max(1, round(height * top))
+
+    def spans(length: int, count: int) -> List[Tuple[int, int]]:
+        # count tiles of size t with step t * (1 - overlap) cover the length exactly
+        size = length / (count - (count - 1) * overlap)
+        step = size * (1 - overlap)
+        return [(round(i * step), min(length, round(i * step + size))) for i in range(count)]
+
+    return [(x1, y1, x2, y2) for y1, y2 in spans(height, rows) for x1, x2 in spans(width, cols)]
+
+
+def tile_views(frame: np.ndarray, grid: Sequence[Box]) -> List[np.ndarray]:
+    """Slices of an (H, W, C) frame, one per tile; views, not copies."""
+    return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in grid]
@@ -0,0 +1,231 @@
+"""
+Temporal tracking of traffic lights across video frames
+
+A StreamSession runs full YOLO detection only every ``detect_every`` frames.
+On the frames in between, existing boxes are followed with a small
+template search on a downscaled grayscale copy of the frame, which costs a
+fraction of a forward pass. The per-box color is smoothed with a majority
+vote over the last ``smoothing_window`` frames so the reported signal
+doesn't flicker; a real change is reported after at most
+``smoothing_window // 2 + 1`` frames.
+"""
+
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PIL import Image
+
+from geometry import box_iou
+
+# Longer side of the grayscale copy used for tracking between detections
+TRACKING_FRAME_SIZE = 320
+
+
+class Track:
+    """One traffic light followed across frames"""
+
+    def __init__(self, track_id: int, detection: Dict[str, Any], smoothing_window: int):
+        self.track_id = track_id
+        self.detection = dict(detection)
+        self.colors: deque = deque(maxlen=smoothing_window)
+
+    @property
+    def box(self) -> Dict[str, float]:
+        return self.detection['box']
+
+    def smoothed_color(self) -> str:
+        """Majority vote over recent frames; ties go to the most recent color."""
+        counts = Counter(self.colors)
+        best = max(counts.values())
+        for color in reversed(self.colors):
+            if counts[color] == best:
+                return color
+        return 'unknown'
+
+
+class StreamSession:
+    """Per-client state for a stream of frames"""
+
+    def __init__(self, detect_every: int = 5, smoothing_window: int = 5,
+                 search_radius: int = 8, iou_threshold: float = 0.3, device_id: Optional[str] = None):
+        self.session_id = uuid.uuid4().hex
+        self.device_id = device_id
+        self.detect_every = max(1, int(detect_every))
+        self.smoothing_window = max(1, int(smoothing_window))
+        self.search_radius = max(1, int(search_radius))
+        self.iou_threshold = iou_threshold
+
+        self.lock = threading.Lock()
+        self.frame_index = 0
+        self.last_seen = time.monotonic()
+        self.tracks: List[Track] = []
+        self._next_track_id = 1
+        self._prev_gray: Optional[np.ndarray] = None
+        self._scale = 1.0
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            'session_id': self.session_id,
+            'device_id': self.device_id,
+            'detect_every': self.detect_every,
+            'smoothing_window': self.smoothing_window,
+            'frames': self.frame_index,
+            'tracks': len(self.tracks),
+        }
+
+    def process(self, image: Image.Image,
+                detect: Callable[[Image.Image], List[Dict[str, Any]]],
+                classify: Callable[[Image.Image, List[Dict[str, float]]], List[str]]) -> Dict[str, Any]:
+        """
+        Process one frame.
+
+        Args:
+            image: Decoded RGB frame
+            detect: Returns traffic-light detections (dicts with 'box',
+                'confidence', 'class_id', 'class_name') for a frame
+            classify: Returns the colors of a list of boxes in a frame
+
+        Returns:
+            Dict with the frame index, whether full detection ran, and the
+            tracked detections with raw and smoothed colors
+        """
+        with self.lock:
+            self.last_seen = time.monotonic()
+            gray = self._downscaled_gray(image)
+            full = self.frame_index % self.detect_every == 0
+
+            if full:
+                self._associate(detect(image))
+            elif self._prev_gray is not None and self._prev_gray.shape == gray.shape:
+                self._follow(self._prev_gray, gray, image.size)
+
+            detections = []
+            raw_colors = classify(image, [track.box for track in self.tracks]) if self.tracks else []
+            for track, raw_color in zip(self.tracks, raw_colors):
+                track.colors.append(raw_color)
+                detection = dict(track.detection)
+                detection.update({
+                    'track_id': track.track_id,
+                    'color': track.smoothed_color(),
+                    'raw_color': raw_color,
+                    'tracked': not full,
+                })
+                detections.append(detection)
+
+            self._prev_gray = gray
+            frame_index = self.frame_index
+            self.frame_index += 1
+
+        return {'frame_index': frame_index, 'full_detection': full, 'detections': detections}
+
+    def _downscaled_gray(self, image: Image.Image) -> np.ndarray:
+        width, height = image.size
+        self._scale = min(1.0, TRACKING_FRAME_SIZE / max(width, height))
+        size = (max(1, round(width * self._scale)), max(1, round(height * self._scale)))
+        gray = image.convert('L')
+        if size != gray.size:
+            gray = gray.resize(size, Image.BILINEAR)
+        return np.asarray(gray, dtype=np.float32)
+
+    def _associate(self, detections: List[Dict[str, Any]]) -> None:
+        """Match fresh detections to existing tracks by IoU, keeping color history."""
+        unmatched = list(self.tracks)
+        tracks = []
+        for detection in sorted(detections, key=lambda d: -d.get('confidence', 0.0)):
+            best, best_iou = None, self.iou_threshold
+            for track in unmatched:
+                iou = box_iou(track.box, detection['box'])
+                if iou >= best_iou:
+                    best, best_iou = track, iou
+            if best is not None:
+                unmatched.remove(best)
+                best.detection = dict(detection)
+                tracks.append(best)
+            else:
+                tracks.append(Track(self._next_track_id, detection, self.smoothing_window))
+                self._next_track_id += 1
+        self.tracks = tracks
+
+    def _follow(self, prev: np.ndarray, cur: np.ndarray, frame_size) -> None:
+        """Shift each box to the best template match within the search radius."""
+        scale = self._scale
+        height, width = cur.shape
+        r = self.search_radius
+        for track in self.tracks:
+            box = track.box
+            x1 = int(round(box['x1'] * scale))
+            y1 = int(round(box['y1'] * scale))
+            x2 = int(round(box['x2'] * scale))
+            y2 = int(round(box['y2'] * scale))
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(width, x2), min(height, y2)
+            if x2 - x1 < 2 or y2 - y1 < 2:
+                continue
+
+            template = prev[y1:y2, x1:x2]
+            sx1, sy1 = max(0, x1 - r), max(0, y1 - r)
+            sx2, sy2 = min(width, x2 + r), min(height, y2 + r)
+            windows = sliding_window_view(cur[sy1:sy2, sx1:sx2], template.shape)
+            sad = np.abs(windows - template).sum(axis=(2, 3))
+            dy, dx = np.unravel_index(np.argmin(sad), sad.shape)
+            shift_x = (sx1 + dx - x1) / scale
+            shift_y = (sy1 + dy - y1) / scale
+            if shift_x == 0 and shift_y == 0:
+                continue
+
+            fw, fh = frame_size
+            track.detection['box'] = {
+                'x1': float(min(max(box['x1'] + shift_x, 0.0), fw)),
+                'y1': float(min(max(box['y1'] + shift_y, 0.0), fh)),
+                'x2': float(min(max(box['x2'] + shift_x, 0.0), fw)),
+                'y2': float(min(max(box['y2'] + shift_y, 0.0), fh)),
+            }
+
+
+class StreamSessionStore:
+    """
+    Thread-safe registry of stream sessions with idle expiry
+
+    ``session_class`` builds the sessions; anything with ``session_id`` and
+    ``last_seen`` attributes works (e.g. color_stream.ColorSession).
+    """
+
+    def __init__(self, max_sessions: int = 256, idle_timeout_s: float = 60.0,
+                 session_class: Callable[..., Any] = StreamSession):
+        self.max_sessions = max_sessions
+        self.idle_timeout_s = idle_timeout_s
+        self.session_class = session_class
+        self._sessions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def create(self, **options) -> Any:
+        session = self.session_class(**options)
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                oldest = min(self._sessions.values(), key=lambda s: s.last_seen)
+                del self._sessions[oldest.session_id]
+            self._sessions[session.session_id] = session
+        return session
+
+    def get(self, session_id: str) -> Optional[Any]:
+        with self._lock:
+            self._expire()
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout_s
+        for session_id in [k for k, s in self._sessions.items() if s.last_seen < cutoff]:
+            del self._sessions[session_id]
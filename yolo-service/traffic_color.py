@@ -0,0 +1,234 @@
+"""
+Traffic light color classification
+
+classify_lights() is the scoring kernel: it takes any number of housings
+as RGB arrays (views into a frame are fine) and scores them together. The
+pixels of every housing's top, middle and bottom section are copied once
+into one strip, grouped by section, and converted to HSV in one call. Each
+pixel's score then comes from two table lookups, with no boolean masks or
+masked copies: SECTION_LUT, indexed by the pixel's saturation and hue read
+as one 16-bit value, says whether the pixel counts for its section's color,
+and VALUE_WEIGHT gives its brightness. One segmented sum per section
+follows. analyze_traffic_light_colors() feeds it the boxes of a frame;
+/detect-color uses it for regions that frame a signal.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Section order from the top of the housing down
+SECTION_COLORS = ('red', 'yellow', 'green')
+
+# Minimum normalized section score (mean brightness of matching pixels
+# over the section) for an HSV match
+SCORE_THRESHOLD = 5
+
+# A pixel only scores when its saturation and brightness exceed these,
+# which leaves out the dark housing and washed-out glare
+SATURATION_MIN = 50
+VALUE_MIN = 60
+
+# Fallback: brightest section wins if its peak gray level is above this
+FALLBACK_BRIGHTNESS = 150
+
+Scores = Dict[str, float]
+
+
+def _clip_boxes(boxes: Sequence[Dict[str, float]], size: Tuple[int, int]) -> np.ndarray:
+    width, height = size
+    coords = np.array([[int(b['x1']), int(b['y1']), int(b['x2']), int(b['y2'])] for b in boxes],
+                      dtype=np.int64).reshape(-1, 4)
+    np.clip(coords[:, 0::2], 0, width, out=coords[:, 0::2])
+    np.clip(coords[:, 1::2], 0, height, out=coords[:, 1::2])
+    return coords
+
+
+def _hue_bits() -> np.ndarray:
+    """Bit per section color (1 red, 2 yellow, 4 green) whose hue range contains each H."""
+    # H: 0-255 (where 0 is 0deg, 255 is 360deg)
+    h = np.arange(256)
+    red = (h < 25) | (h > 230)
+    yellow = (h >= 20) & (h <= 60)
+    green = (h >= 40) & (h <= 130)
+    return (red * 1 | yellow * 2 | green * 4).astype(np.uint8)
+
+
+HUE_BITS = _hue_bits()
+
+
+def _section_lut() -> np.ndarray:
+    """(3, 65536) uint8: 0xFF where a pixel with S << 8 | H scores for section k, else 0."""
+    key = np.arange(1 << 16)
+    hue, saturation = key & 0xFF, key >> 8
+    return np.stack([np.where((HUE_BITS[hue] >> k) & 1 & (saturation > SATURATION_MIN), 0xFF, 0)
+                     for k in range(len(SECTION_COLORS))]).astype(np.uint8)
+
+
+# 192 KB, so lookups stay in cache; the mask is ANDed with VALUE_WEIGHT
+SECTION_LUT = _section_lut()
+VALUE_WEIGHT = np.where(np.arange(256) > VALUE_MIN, np.arange(256), 0).astype(np.uint8)
+
+# Pixels scored per chunk. numpy widens a chunk's keys to intp and its
+# weights to int64 for the sum, so this bounds each temporary to 512 KB
+# whatever the number of lights, and keeps the working set in cache
+LOOKUP_CHUNK = 1 << 16
+
+
+def _pack_sections(housings: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The pixels of every housing in one (N, 3) array: all top sections, then
+    all middles, then all bottoms, each row-major.
+
+    Returns:
+        (pixels, starts, areas), where starts and areas are (housings, 3)
+        offsets into the pixels and pixel counts of each section
+    """
+    heights = np.array([h.shape[0] for h in housings], dtype=np.int64)
+    widths = np.array([h.shape[1] for h in housings], dtype=np.int64)
+    section_height = heights // 3
+    rows = np.stack([section_height, section_height, heights - 2 * section_height], axis=1)
+    areas = rows * widths[:, np.newaxis]
+    # Section-major order, so section k of every housing is one contiguous run
+    ends = np.cumsum(areas.T.ravel())
+    starts = (ends - areas.T.ravel()).reshape(3, -1).T
+
+    pixels = np.empty((int(ends[-1]), 3), dtype=np.uint8)
+    for j, housing in enumerate(housings):
+        top = 0
+        for k in range(3):
+            start, count = int(starts[j, k]), int(rows[j, k])
+            if count:
+                # Copies straight from the (possibly strided) view into the strip
+                pixels[start:start + count * widths[j]].reshape(count, int(widths[j]), 3)[...] = \
+                    housing[top:top + count]
+            top += count
+    return pixels, starts, areas
+
+
+def section_totals(hsv: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """
+    Brightness of the scoring pixels summed per section.
+
+    Args:
+        hsv: (N, 3) uint8 HSV pixels of all sections, section-major (every
+            top section, then every middle, then every bottom)
+        starts: (housings, 3) offset of each section in ``hsv``
+
+    Returns:
+        (housings, 3) int64 totals
+    """
+    hsv = np.ascontiguousarray(hsv, dtype=np.uint8)
+    # H and S are adjacent bytes of each pixel: read them as one little-endian
+    # uint16 (S << 8 | H) through a strided view instead of combining channels
+    key = np.ndarray((len(hsv),), dtype='<u2', buffer=hsv, strides=(3,))
+    value = hsv[:, 2]
+    # Section-major, so the starts are sorted
+    flat = starts.T.ravel()
+    totals = np.zeros(len(flat), dtype=np.int64)
+    weights = np.empty(min(LOOKUP_CHUNK, len(hsv)), dtype=np.uint8)
+    bounds = [int(starts[0, k]) for k in range(3)] + [len(hsv)]
+    for k in range(3):
+        for a in range(bounds[k], bounds[k + 1], LOOKUP_CHUNK):
+            b = min(a + LOOKUP_CHUNK, bounds[k + 1])
+            chunk = weights[:b - a]
+            np.take(SECTION_LUT[k], key[a:b], out=chunk)
+            chunk &= np.take(VALUE_WEIGHT, value[a:b])
+            # Partial sums of the section running into the chunk (lo - 1) and
+            # of those starting in it; an empty section shares its start with
+            # the next one and gets 0
+            lo, hi = np.searchsorted(flat, a, 'right'), np.searchsorted(flat, b, 'left')
+            cuts = np.concatenate(([a], flat[lo:hi])) - a
+            partial = np.add.reduceat(chunk, cuts, dtype=np.int64)
+            partial[:-1][cuts[:-1] == cuts[1:]] = 0
+            totals[lo - 1:hi] += partial
+    return totals.reshape(3, -1).T
+
+
+def classify_lights(housings: Sequence[np.ndarray]) -> List[Tuple[str, Scores]]:
+    """
+    Classify traffic light housings by which section is lit.
+
+    Args:
+        housings: (H, W, 3) uint8 RGB arrays, one per light, red section on top
+
+    Returns:
+        One (color, scores) pair per housing, where scores holds the
+        normalized red / yellow / green section scores
+    """
+    results: List[Tuple[str, Scores]] = [('unknown', {c: 0.0 for c in SECTION_COLORS}) for _ in housings]
+    idx = [i for i, h in enumerate(housings) if h.shape[0] and h.shape[1]]
+    if not idx:
+        return results
+
+    pixels, starts, areas = _pack_sections([housings[i] for i in idx])
+    strip = Image.fromarray(pixels[np.newaxis])
+    totals = section_totals(np.asarray(strip.convert('HSV'))[0], starts)
+    # Sections of lights under 3 px tall are empty and score 0
+    scores = np.zeros(totals.shape)
+    np.divide(totals, areas, out=scores, where=areas > 0)
+
+    # Highest section above the threshold wins; ties go to the upper section
+    candidate = np.where(scores > SCORE_THRESHOLD, scores, -np.inf)
+    best = np.argmax(candidate, axis=1)
+    matched = np.isfinite(candidate[np.arange(len(idx)), best])
+
+    gray = None
+    for j, i in enumerate(idx):
+        box_scores = {c: round(float(scores[j, k]), 2) for k, c in enumerate(SECTION_COLORS)}
+        if matched[j]:
+            results[i] = (SECTION_COLORS[best[j]], box_scores)
+            continue
+
+        # Fallback: if no color detected via HSV, look at simple max brightness position
+        if gray is None:
+            gray = np.asarray(strip.convert('L'))[0]
+        # Equal-height sections: the bottom one leaves out the rows left over
+        step = int(areas[j, 0])
+        sections = [gray[starts[j, k]:starts[j, k] + step] for k in range(3)]
+        # Use max brightness instead of mean to find the "bulb"
+        peaks = [int(sec.max()) if sec.size else 0 for sec in sections]
+        brightest = int(np.argmax(peaks))
+        color = SECTION_COLORS[brightest] if peaks[brightest] > FALLBACK_BRIGHTNESS else 'unknown'
+        results[i] = (color, box_scores)
+
+    return results
+
+
+def analyze_traffic_light_colors(image: Image.Image, boxes: Sequence[Dict[str, float]],
+                                 frame: Optional[np.ndarray] = None) -> List[Tuple[str, Scores]]:
+    """
+    Classify every traffic light box in a frame in one pass.
+
+    Args:
+        image: RGB frame
+        boxes: Dicts with x1, y1, x2, y2 in frame pixels
+        frame: ``image`` as an (H, W, 3) uint8 array, if the caller already
+            has one; otherwise only the area covering the boxes is copied
+
+    Returns:
+        One (color, scores) pair per box, where scores holds the normalized
+        red / yellow / green section scores
+    """
+    if not boxes:
+        return []
+    coords = _clip_boxes(boxes, image.size)
+    valid = (coords[:, 2] > coords[:, 0]) & (coords[:, 3] > coords[:, 1])
+    if frame is None and valid.any():
+        # One array for the area covering all boxes; boxes are views into it
+        ox, oy = coords[valid, :2].min(axis=0)
+        frame = np.asarray(image.crop((int(ox), int(oy), int(coords[valid, 2].max()),
+                                       int(coords[valid, 3].max()))))
+        coords = np.where(valid[:, np.newaxis], coords - (ox, oy, ox, oy), 0)
+    empty = np.zeros((0, 0, 3), dtype=np.uint8)
+    return classify_lights([frame[y1:y2, x1:x2] if ok else empty
+                            for (x1, y1, x2, y2), ok in zip(coords.tolist(), valid)])
+
+
+def analyze_traffic_light_color(image: Image.Image, box: Dict[str, float], color_db=None) -> str:
+    """
+    Analyze the color of a detected traffic light using HSV color space
+    to better handle light sources and contrast against the dark casing.
+    """
+    return analyze_traffic_light_colors(image, [box])[0][0]
@@ -0,0 +1,125 @@
+"""
+Multi-image uploads for /detect-batch
+
+A batch arrives either as several multipart file fields or as one tar
+(optionally gzipped) or zip archive, sent as the request body or as a file
+field. Archive members that aren't images are skipped.
+
+Archive members are checked against the size limits by their declared
+uncompressed size before they are read, so a small archive can't inflate
+into gigabytes inside the process.
+"""
+
+import io
+import tarfile
+import zipfile
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+ARCHIVE_MIMETYPES = {
+    'application/x-tar': 'tar',
+    'application/gzip': 'tar',
+    'application/x-gzip': 'tar',
+    'application/x-gtar': 'tar',
+    'application/zip': 'zip',
+    'application/x-zip-compressed': 'zip',
+}
+
+
+class BatchTooLargeError(ValueError):
+    """The upload holds more images, or more image bytes, than the batch limits."""
+
+
+def archive_kind(filename: Optional[str] = None, mimetype: Optional[str] = None) -> Optional[str]:
+    """'tar', 'zip' or None, from a file name or content type."""
+    name = (filename or '').lower()
+    if name.endswith(('.tar', '.tar.gz', '.tgz')):
+        return 'tar'
+    if name.endswith('.zip'):
+        return 'zip'
+    return ARCHIVE_MIMETYPES.get(mimetype or '')
+
+
+def _is_image(name: str) -> bool:
+    base = name.rsplit('/', 1)[-1]
+    return not base.startswith('.') and base.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def check_image_size(name: str, size: int, max_image_bytes: Optional[int] = None,
+                     max_total_bytes: Optional[int] = None) -> None:
+    """
+    Raise if an image of ``size`` bytes is over the per-image limit or the
+    remaining ``max_total_bytes`` of the batch (None: no limit).
+
+    Raises:
+        BatchTooLargeError: Over either limit
+    """
+    if max_image_bytes is not None and size > max_image_bytes:
+        raise BatchTooLargeError(f"{name} is over the {max_image_bytes} byte limit per image")
+    if max_total_bytes is not None and size > max_total_bytes:
+        raise BatchTooLargeError(f"{name} takes the batch over its byte limit")
+
+
+def read_image(stream: BinaryIO, name: str, max_image_bytes: Optional[int] = None,
+               max_total_bytes: Optional[int] = None) -> bytes:
+    """
+    An uploaded image file, reading at most one byte past the limits.
+
+    Raises:
+        BatchTooLargeError: Over the per-image or remaining batch limit
+    """
+    limits = [n for n in (max_image_bytes, max_total_bytes) if n is not None]
+    data = stream.read(min(limits) + 1) if limits else stream.read()
+    check_image_size(name, len(data), max_image_bytes, max_total_bytes)
+    return data
+
+
+def read_archive(stream: BinaryIO, kind: str, max_images: int, max_image_bytes: Optional[int] = None,
+                 max_total_bytes: Optional[int] = None) -> List[Tuple[str, bytes]]:
+    """
+    (member name, bytes) for each image in a tar or zip archive, in archive order.
+
+    Tar archives are read as a stream, so the body never has to be held
+    twice; zip needs its central directory and is buffered first.
+
+    Args:
+        stream: The archive
+        kind: 'tar' or 'zip'
+        max_images: Most images to accept
+        max_image_bytes: Largest uncompressed image, None for no limit
+        max_total_bytes: Most uncompressed image bytes in all, None for no limit
+
+    Raises:
+        BatchTooLargeError: More than ``max_images`` images, or over a byte limit
+        ValueError: The archive can't be read
+    """
+    items: List[Tuple[str, bytes]] = []
+    remaining = max_total_bytes
+
+    def add(name: str, size: int, read: Callable[[], bytes]) -> None:
+        nonlocal remaining
+        if len(items) >= max_images:
+            raise BatchTooLargeError(f"more than {max_images} images in archive")
+        # Checked before reading: the declared size bounds what gets inflated
+        check_image_size(name, size, max_image_bytes, remaining)
+        data = read()
+        if remaining is not None:
+            remaining -= len(data)
+        items.append((name, data))
+
+    try:
+        if kind == 'tar':
+            with tarfile.open(fileobj=stream, mode='r|*') as archive:
+                for member in archive:
+                    if member.isfile() and _is_image(member.name):
+                        add(member.name, member.size, archive.extractfile(member).read)
+        else:
+            with zipfile.ZipFile(io.BytesIO(stream.read())) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and _is_image(info.filename):
+                        # zipfile stops at file_size and fails the CRC check if a member lies about it
+                        add(info.filename, info.file_size, lambda info=info: archive.read(info))
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as e:
+        raise ValueError(f"unreadable {kind} archive: {e}") from e
+    return items
@@ -0,0 +1,208 @@
+"""
+Process pool for inference
+
+Each worker process loads its own model copy with a pinned intra-op thread
+count (and, optionally, its own set of CPU cores) and runs the pixel work
+for a request: decode, detection, color analysis and distance. Tasks take
+the encoded image bytes, so only small payloads cross process boundaries.
+
+The pool bounds how many requests may wait for a worker. Past that,
+submit() raises PoolFullError straight away so the front end can answer
+429 instead of queueing without limit.
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from camera import CameraProfile
+from decode import decode_image
+from logs import configure_logging
+from metrics import Timings
+from pipeline import describe_detections, detect_encoded_batch, detect_traffic_lights
+
+# Thread pools of the math libraries read these once, at import
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+# Per-process state, set by _init_worker
+_service = None
+_adaptive: Optional[Dict[str, Any]] = None
+_tiled: Optional[Dict[str, Any]] = None
+_decoder: Optional[ThreadPoolExecutor] = None
+
+
+class PoolFullError(RuntimeError):
+    """Every worker is busy and the wait queue is full."""
+
+
+def _init_worker(service_options: Dict[str, Any], adaptive: Optional[Dict[str, Any]],
+                 tiled: Optional[Dict[str, Any]], threads: int, warmup: Dict[str, Any], pin_cores: bool,
+                 counter) -> None:
+    global _service, _adaptive, _tiled, _decoder
+    configure_logging()
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    if pin_cores and hasattr(os, 'sched_setaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+        first = index * threads % len(cores)
+        os.sched_setaffinity(0, {cores[(first + i) % len(cores)] for i in range(threads)})
+
+    # Import after the thread variables are set so torch / ONNX Runtime pick them up
+    from detector import OptimizedYOLOService
+
+    _service = OptimizedYOLOService(threads=threads, **service_options)
+    _adaptive = adaptive
+    _tiled = tiled
+    # Batches decode on the worker's own cores
+    _decoder = ThreadPoolExecutor(threads, thread_name_prefix='decode') if threads > 1 else None
+    _service.warmup(**warmup)
+
+
+def _ping() -> Dict[str, Any]:
+    return {'pid': os.getpid(), 'device': _service.device}
+
+
+def detect_task(image_bytes: bytes, conf: float = 0.15, decode_size: Optional[int] = None,
+                camera: Optional[CameraProfile] = None
+                ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, float]]:
+    """
+    Decode, detect and describe one frame; distances use ``camera``.
+
+    Returns:
+        (boxes in decoded-frame pixels, detections in original pixels,
+        seconds per stage)
+    """
+    timings = Timings()
+    with timings.stage('decode'):
+        frame = decode_image(image_bytes, decode_size)
+    with timings.stage('inference'):
+        boxes = detect_traffic_lights(_service, frame.image, conf=conf, adaptive=_adaptive, tiled=_tiled)
+    return boxes, describe_detections(frame.image, boxes, frame.scale, timings, camera), timings.stages
+
+
+def describe_task(image_bytes: bytes, boxes: List[Dict[str, Any]], decode_size: Optional[int] = None,
+                  camera: Optional[CameraProfile] = None) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """Color and distance for known boxes (decoded-frame pixels) on a new frame, plus stage seconds."""
+    timings = Timings()
+    with timings.stage('decode'):
+        frame = decode_image(image_bytes, decode_size)
+    return describe_detections(frame.image, boxes, frame.scale, timings, camera), timings.stages
+
+
+def detect_batch_task(blobs: List[bytes], conf: float = 0.15, decode_size: Optional[int] = None,
+                      camera: Optional[CameraProfile] = None) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """/detect-style results for several uploads run as one model batch, plus stage seconds."""
+    timings = Timings()
+    results = detect_encoded_batch(_service, blobs, conf, decode_size, adaptive=_adaptive,
+                                   executor=_decoder, timings=timings, camera=camera, tiled=_tiled)
+    return results, timings.stages
+
+
+def boxes_task(image_bytes: bytes, conf: float = 0.15,
+               decode_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Traffic-light boxes in decoded-frame pixels, for stream sessions that classify themselves."""
+    frame = decode_image(image_bytes, decode_size)
+    return detect_traffic_lights(_service, frame.image, conf=conf, adaptive=_adaptive, tiled=_tiled)
+
+
+class InferencePool:
+    """
+    Fixed pool of inference worker processes with bounded admission.
+
+    Args:
+        workers: Number of worker processes
+        service_options: OptimizedYOLOService keyword arguments (model_path,
+            backend, imgsz, class_filter)
+        adaptive: detect_adaptive() options, or None for a single full pass
+        tiled: detect_tiled() options, or None
+        threads: Intra-op threads per worker (default: CPU count / workers)
+        max_queue: Requests allowed to wait for a free worker (default: 2 per worker)
+        warmup: OptimizedYOLOService.warmup() options for each worker at start
+        pin_cores: Give each worker its own ``threads`` cores (Linux only)
+    """
+
+    def __init__(self, workers: int, service_options: Dict[str, Any],
+                 adaptive: Optional[Dict[str, Any]] = None, threads: Optional[int] = None,
+                 max_queue: Optional[int] = None, warmup: Optional[Dict[str, Any]] = None,
+                 pin_cores: bool = False, tiled: Optional[Dict[str, Any]] = None):
+        self.workers = workers
+        self.threads = threads or max(1, (os.cpu_count() or 1) // workers)
+        self.max_queue = 2 * workers if max_queue is None else max_queue
+        self.device: Optional[str] = None
+
+        # spawn: workers must not inherit the parent's threads or CUDA state
+        context = multiprocessing.get_context('spawn')
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(service_options, adaptive, tiled, self.threads, warmup or {}, pin_cores,
+                      context.Value('i', 0)),
+        )
+        self._slots = threading.BoundedSemaphore(workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def start(self) -> float:
+        """Start every worker and wait until each has loaded its model. Returns seconds taken."""
+        start = time.time()
+        futures = [self._executor.submit(_ping) for _ in range(self.workers)]
+        self.device = futures[0].result()['device']
+        for future in futures[1:]:
+            future.result()
+        return time.time() - start
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Queue ``fn(*args)`` on a worker, or raise PoolFullError if the queue is full."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolFullError(f"all {self.workers} workers busy and {self.max_queue} requests queued")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if future is None or future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+        self._slots.release()
+
+    def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """Run ``fn(*args)`` on a worker and wait for the result."""
+        return self.submit(fn, *args).result(timeout)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'threads_per_worker': self.threads,
+                'max_queue': self.max_queue,
+                'in_flight': self.in_flight,
+                'queued': max(0, self.in_flight - self.workers),
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }